@@ -0,0 +1,86 @@
+"""
+Download throughput of the thread-pool and asyncio engines against a local
+server that adds a fixed latency to every response.
+
+    python benchmarks/bench_download_engines.py [--images N] [--latency MS] [--concurrency N]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'src'))
+
+from core.image_scraper import ImageScraper
+
+# Smallest valid GIF, standing in for a gallery thumbnail
+THUMBNAIL = (b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00'
+             b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;')
+
+
+def serve_thumbnails(latency):
+    """Serve THUMBNAIL at every path after sleeping latency seconds"""
+    class SlowHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True  # Headers and body are separate writes on a kept-alive socket
+
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/gif')
+            self.send_header('Content-Length', str(len(THUMBNAIL)))
+            self.end_headers()
+            self.wfile.write(THUMBNAIL)
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 4096
+
+    server = Server(('127.0.0.1', 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_engine(engine, urls, concurrency):
+    save_location = tempfile.mkdtemp(prefix=f'bench_{engine}_')
+    scraper = ImageScraper(log_callback=lambda message, level="info": None)
+    scraper.image_urls = urls
+    try:
+        start = time.perf_counter()
+        scraper.start_download('', save_location, engine=engine, max_concurrency=concurrency)
+        elapsed = time.perf_counter() - start
+        # Every thumbnail has the same bytes, so count stored and deduplicated images alike
+        stats = scraper.dedupe_stats
+        return elapsed, stats.get('stored', 0) + stats.get('duplicates', 0)
+    finally:
+        shutil.rmtree(save_location, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=100, help='per-response delay in milliseconds')
+    parser.add_argument('--concurrency', type=int, default=256, help='in-flight requests for the asyncio engine')
+    args = parser.parse_args()
+
+    server = serve_thumbnails(args.latency / 1000)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/thumb/{i}.gif" for i in range(args.images)]
+
+    for engine, concurrency in (('threads', None), ('asyncio', args.concurrency)):
+        elapsed, saved = run_engine(engine, urls, concurrency)
+        print(f"{engine:<8} {saved:6d} images in {elapsed:7.2f} s   {saved / elapsed:8.1f} images/sec")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Clustering time of the near-duplicate index for a large run, using synthetic
+fingerprints with a share of planted near-duplicates.
+
+    python benchmarks/bench_near_duplicates.py [--images N] [--copies FRACTION] [--distance BITS]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'src'))
+
+from core.near_duplicates import cluster_fingerprints
+
+
+def synthetic_fingerprints(images, copies, distance, seed=0):
+    """Random fingerprints where a copies share are originals with up to distance flipped bits"""
+    rng = np.random.default_rng(seed)
+    originals = images - int(images * copies)
+    phashes = rng.integers(0, 2 ** 64, originals, dtype=np.uint64)
+    dhashes = rng.integers(0, 2 ** 64, originals, dtype=np.uint64)
+    sources = rng.integers(0, originals, images - originals)
+    flips = np.zeros(len(sources), dtype=np.uint64)
+    for _ in range(distance // 2):
+        flips |= np.uint64(1) << rng.integers(0, 64, len(sources)).astype(np.uint64)
+    phashes = np.concatenate([phashes, phashes[sources] ^ flips])
+    dhashes = np.concatenate([dhashes, dhashes[sources] ^ flips])
+    return [(f"image_{i}", int(p), int(d), 100, 100) for i, (p, d) in enumerate(zip(phashes, dhashes))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', type=int, default=200000)
+    parser.add_argument('--copies', type=float, default=0.3, help='share of images that are near-duplicates')
+    parser.add_argument('--distance', type=int, default=6, help='Hamming distance treated as a near-duplicate')
+    args = parser.parse_args()
+
+    fingerprints = synthetic_fingerprints(args.images, args.copies, args.distance)
+    start = time.perf_counter()
+    clusters = cluster_fingerprints(fingerprints, args.distance)
+    elapsed = time.perf_counter() - start
+    grouped = sum(len(cluster) for cluster in clusters)
+    print(f"{args.images} fingerprints clustered in {elapsed:.2f} s: "
+          f"{len(clusters)} clusters, {grouped - len(clusters)} near-duplicates to remove")
+
+
+if __name__ == '__main__':
+    main()
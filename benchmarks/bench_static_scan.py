@@ -0,0 +1,87 @@
+"""
+Per-page scan latency: browserless static scan vs headless Chrome,
+measured against the saved debug/page_source.html.
+
+    python benchmarks/bench_static_scan.py [--runs N] [--browser]
+"""
+import argparse
+import functools
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'src'))
+
+from core.image_scraper import ImageScraper
+from core.static_scanner import parse_html
+
+PAGE = os.path.join(ROOT, 'debug', 'page_source.html')
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_repo():
+    """Serve the repository root on an ephemeral local port"""
+    handler = functools.partial(QuietHandler, directory=ROOT)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def time_runs(runs, func):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def report(label, timings, count):
+    print(f"{label:<22} median {statistics.median(timings) * 1000:9.1f} ms   "
+          f"min {min(timings) * 1000:9.1f} ms   images {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--browser', action='store_true', help='also time the headless Chrome scan')
+    args = parser.parse_args()
+
+    with open(PAGE, encoding='utf-8') as f:
+        html = f.read()
+
+    timings, result = time_runs(args.runs, lambda: parse_html(html, 'https://example.com/'))
+    report('parse only', timings, len(result.image_urls))
+
+    server = serve_repo()
+    url = f"http://127.0.0.1:{server.server_address[1]}/debug/page_source.html"
+    quiet = lambda message, level="info": None
+
+    scraper = ImageScraper(log_callback=quiet, scan_mode='static')
+    try:
+        timings, count = time_runs(args.runs, lambda: scraper.scan_webpage(url))
+    finally:
+        scraper.close()
+    report('static scan (HTTP)', timings, count)
+
+    if args.browser:
+        scraper = ImageScraper(log_callback=quiet, scan_mode='browser')
+        try:
+            timings, count = time_runs(min(args.runs, 3), lambda: scraper.scan_webpage(url))
+        finally:
+            scraper.close()
+        report('browser scan', timings, count)
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
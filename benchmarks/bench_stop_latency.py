@@ -0,0 +1,93 @@
+"""
+Time from clearing is_downloading to start_download returning, with every
+download stuck on a large image that a local server trickles out.
+
+    python benchmarks/bench_stop_latency.py [--downloads N] [--wait SECONDS]
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'src'))
+
+from core.image_scraper import ImageScraper
+
+DECLARED_SIZE = 100 * 1024 * 1024
+
+
+def serve_stalled_images():
+    """Serve a JPEG header at every path, then a few bytes every two seconds of a declared 100 MB body"""
+    class StalledHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(DECLARED_SIZE))
+            self.end_headers()
+            try:
+                self.wfile.write(b'\xff\xd8\xff\xe0' + b'\0' * 65536)
+                while True:
+                    time.sleep(2)
+                    self.wfile.write(b'\0' * 512)
+            except OSError:
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 4096
+
+    server = Server(('127.0.0.1', 0), StalledHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_engine(engine, urls, wait):
+    """(seconds to stop, .part files in flight at the stop, .part files left behind)"""
+    save_location = tempfile.mkdtemp(prefix=f'bench_stop_{engine}_')
+    scraper = ImageScraper(log_callback=lambda message, level="info": None)
+    scraper.image_urls = urls
+    run = threading.Thread(target=scraper.start_download, args=('', save_location),
+                           kwargs={'engine': engine, 'max_concurrency': len(urls)}, daemon=True)
+    try:
+        run.start()
+        time.sleep(wait)
+        in_flight = len(glob.glob(os.path.join(save_location, '*.part')))
+        start = time.perf_counter()
+        scraper.is_downloading = False
+        run.join(60)
+        elapsed = time.perf_counter() - start
+        return elapsed, in_flight, len(glob.glob(os.path.join(save_location, '*.part')))
+    finally:
+        scraper.close()
+        shutil.rmtree(save_location, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--downloads', type=int, default=200)
+    parser.add_argument('--wait', type=float, default=3.0, help='seconds to let downloads start')
+    args = parser.parse_args()
+
+    server = serve_stalled_images()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/large_{i}.jpg" for i in range(args.downloads)]
+    print(f"{args.downloads} downloads of a {DECLARED_SIZE // (1024 * 1024)} MB image trickled by a local server")
+    for engine in ('threads', 'asyncio'):
+        elapsed, in_flight, left = run_engine(engine, urls, args.wait)
+        print(f"{engine:>8}: stopped in {elapsed * 1000:.0f}ms with {in_flight} in flight, {left} .part files left")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
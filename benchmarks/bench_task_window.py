@@ -0,0 +1,71 @@
+"""
+Peak memory of a download run against the number of candidate URLs, for the
+windowed submission used by start_download and for submitting every URL up
+front. Downloads are stubbed out so only the scheduling is measured; each
+run gets a fresh process. Unix only (peak RSS comes from getrusage).
+
+    python benchmarks/bench_task_window.py [--counts 10000,50000,200000]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'src'))
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024  # Bytes on macOS, KB elsewhere
+
+
+def skip(img_url, *args):
+    from core.download_results import SkipReason
+
+    return False, SkipReason("Size filter (benchmark)")
+
+
+def run_child(mode, count):
+    from core.image_scraper import ImageScraper
+
+    urls = [f"https://img.example/{i:08d}.jpg" for i in range(count)]
+    baseline = peak_rss_mb()
+    if mode == 'window':
+        scraper = ImageScraper(log_callback=lambda message, level="info": None)
+        scraper.download_image = skip
+        scraper.image_urls = urls
+        with tempfile.TemporaryDirectory() as save_location:
+            scraper.start_download('', save_location)
+    else:
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            future_to_url = {executor.submit(skip, url): url for url in urls}
+            for future in as_completed(future_to_url):
+                future.result()
+    print(f"{peak_rss_mb() - baseline:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--counts', default='10000,50000,200000')
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args.child[0], int(args.child[1]))
+        return
+
+    print(f"{'candidates':>10}  {'windowed MB':>12}  {'all up front MB':>16}")
+    for count in (int(value) for value in args.counts.split(',')):
+        growth = []
+        for mode in ('window', 'upfront'):
+            output = subprocess.run([sys.executable, __file__, '--child', mode, str(count)],
+                                    capture_output=True, text=True, check=True).stdout
+            growth.append(float(output.strip().splitlines()[-1]))
+        print(f"{count:>10}  {growth[0]:>12.1f}  {growth[1]:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+CPU time and stored size of each transcoding profile for a batch of WebP
+images (photos plus a few animations), encoded in this process.
+
+    python benchmarks/bench_transcode_policy.py [--images N] [--size WxH]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+from PIL import Image, ImageFilter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'src'))
+
+from core.transcoding import TRANSCODE_PROFILES, PASSTHROUGH, transcode_image
+
+
+def sample_webps(images, width, height):
+    """Photo-like lossy WebPs, every tenth one animated"""
+    samples = []
+    for i in range(images):
+        noise = Image.effect_noise((width // 8, height // 8), 64).convert('RGB')
+        photo = noise.resize((width, height), Image.BICUBIC).filter(ImageFilter.GaussianBlur(2))
+        out = io.BytesIO()
+        if i % 10 == 0:
+            frames = [photo.rotate(angle) for angle in (0, 5, 10, 15)]
+            frames[0].save(out, 'WEBP', save_all=True, append_images=frames[1:], quality=80)
+        else:
+            photo.save(out, 'WEBP', quality=80)
+        samples.append(out.getvalue())
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', type=int, default=50)
+    parser.add_argument('--size', default='800x600')
+    args = parser.parse_args()
+    width, height = (int(value) for value in args.size.split('x'))
+
+    samples = sample_webps(args.images, width, height)
+    fetched = sum(len(data) for data in samples)
+    for profile in TRANSCODE_PROFILES:
+        start = time.perf_counter()
+        if profile == PASSTHROUGH:
+            stored = fetched
+        else:
+            stored = sum(len(transcode_image(data, 'image/webp', profile)[0]) for data in samples)
+        elapsed = time.perf_counter() - start
+        print(f"{profile:<12} {elapsed * 1000 / len(samples):8.1f} ms/image   "
+              f"{stored / 1024 / 1024:8.2f} MB stored ({stored / fetched:5.1f}x fetched)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+WebDriver commands per scan: per-element get_attribute() calls vs the single
+injected extraction script. Needs a local Chrome.
+
+    python benchmarks/bench_webdriver_commands.py [--images N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'src'))
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+
+from core.extraction import extract_images
+
+PAGE = os.path.join(ROOT, 'debug', 'page_source.html')
+
+
+def count_commands(driver):
+    """Wrap driver.execute so every WebDriver command is counted"""
+    counter = {'commands': 0}
+    execute = driver.execute
+
+    def counting_execute(driver_command, params=None):
+        counter['commands'] += 1
+        return execute(driver_command, params)
+
+    driver.execute = counting_execute
+    return counter
+
+
+def per_element_scan(driver):
+    """The previous approach: find elements, then one round trip per attribute"""
+    urls = set()
+    elements = driver.find_elements(By.CSS_SELECTOR, 'img[src], img[data-src], img[data-lazy-src], '
+                                                     'source[srcset], img[srcset], picture source')
+    for element in elements:
+        for attr in ['src', 'data-src', 'data-lazy-src', 'srcset']:
+            value = element.get_attribute(attr)
+            if value:
+                urls.add(value)
+    return urls
+
+
+def synthetic_page(count):
+    """Write a page with count lazy-loaded images and return its path"""
+    rows = ''.join(f'<img src="https://example.com/{i}.jpg" data-src="https://example.com/{i}@2x.jpg" '
+                   f'srcset="https://example.com/{i}-1x.jpg 1x, https://example.com/{i}-2x.jpg 2x">'
+                   for i in range(count))
+    handle, path = tempfile.mkstemp(suffix='.html')
+    with os.fdopen(handle, 'w') as f:
+        f.write(f'<html><body>{rows}</body></html>')
+    return path
+
+
+def measure(driver, label, scan):
+    counter = count_commands(driver)
+    start = time.perf_counter()
+    found = scan(driver)
+    elapsed = time.perf_counter() - start
+    del driver.execute
+    print(f"{label:<20} commands {counter['commands']:7d}   {elapsed * 1000:9.1f} ms   urls {len(found)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', type=int, default=0, help='use a synthetic page with N images')
+    args = parser.parse_args()
+
+    page = synthetic_page(args.images) if args.images else PAGE
+
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    # Keep the saved page from reaching out to the network
+    options.add_argument('--host-resolver-rules=MAP * ~NOTFOUND')
+    driver = webdriver.Chrome(options=options)
+    try:
+        driver.get('file://' + page)
+        measure(driver, 'per-element', per_element_scan)
+        measure(driver, 'extraction script', lambda d: extract_images(d)[0])
+    finally:
+        driver.quit()
+        if args.images:
+            os.remove(page)
+
+
+if __name__ == '__main__':
+    main()
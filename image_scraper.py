@@ -3,14 +3,12 @@ import os
 import requests
 import base64
 import threading
-import time
+from functools import partial
 from bs4 import BeautifulSoup
 import tkinter as tk
 from tkinter import ttk, filedialog, scrolledtext, messagebox
-from urllib.parse import urljoin, urlparse, parse_qs, urlencode, urlunparse, unquote
-from PIL import Image
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse, unquote
 from io import BytesIO
-import re
 import random
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -20,6 +18,14 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
+# Share the scanner internals that live in the src package
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from core.cancellation import CancelToken
+from core.extraction import extract_images
+from core.content_sniffing import MIME_EXTENSIONS, sniff_response
+from core.page_settle import PageSettleDetector
+from core.transcoding import TranscodeStage, when_done
+
 class RoundedFrame(ttk.Frame):
     def __init__(self, parent, radius=20, padding=15, background=None, **kwargs):
         super().__init__(parent, padding=padding, **kwargs)
@@ -137,7 +143,10 @@ class ImageScraperApp:
         self.root.title("Web Image Scraper")
         self.root.configure(bg='#2b2b2b')
         self.is_downloading = False
+        self.cancel_token = CancelToken()  # Closes the download in flight when Stop is pressed
         self.download_thread = None
+        self.transcoder = TranscodeStage()  # WebP to PNG on a process pool, off the download thread
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Define colors
         self.colors = {
@@ -367,8 +376,9 @@ class ImageScraperApp:
             return
         
         if self.is_downloading:
-            # Stop the download
+            # Stop the download, aborting the one still streaming
             self.is_downloading = False
+            self.cancel_token.cancel()
             self.start_button.config(text="Start Download")
             self.log_message("Stopping download...", "info")
             return
@@ -385,6 +395,7 @@ class ImageScraperApp:
         self.start_button.config(text="Stop Download")
         self.check_button.config(state='disabled')
         self.is_downloading = True
+        self.cancel_token = token = CancelToken()
         
         def download_thread():
             try:
@@ -434,6 +445,22 @@ class ImageScraperApp:
                             image_type = 'png'
                     
                     return image_type
+                
+                converting = []  # Futures of WebP images on the transcode stage, True once saved
+                
+                def save_converted(image_data, filepath, filename, job):
+                    """Write a converted image, or the bytes as fetched if conversion failed"""
+                    try:
+                        data, _ = job.result()
+                    except Exception:
+                        data = image_data
+                    with open(filepath, 'wb') as f:
+                        f.write(data)
+                    if os.path.getsize(filepath) > 100:
+                        self.log_message(f"Downloaded: {filename}", "success")
+                        return True
+                    os.remove(filepath)
+                    return False
 
                 for idx, img_url in enumerate(self.image_sources, 1):
                     if not self.is_downloading:
@@ -444,15 +471,8 @@ class ImageScraperApp:
                         url_lower = img_url.lower()
                         original_url = img_url
                         
-                        # Get image type
-                        content_type = None
-                        try:
-                            head_response = session.head(img_url, timeout=5, allow_redirects=True)
-                            content_type = head_response.headers.get('content-type', '')
-                        except Exception as e:
-                            pass
-                        
-                        img_type = get_image_type(self, img_url, content_type)
+                        # Guess the type from the URL; the GET below sniffs the real type
+                        img_type = get_image_type(self, img_url)
                         
                         # Handle SVG files differently
                         if img_type == 'svg':
@@ -519,61 +539,55 @@ class ImageScraperApp:
                                 )
                                 
                                 if response.status_code == 200:
-                                    # Determine file extension based on content type and URL
-                                    content_type = response.headers.get('content-type', '').lower()
+                                    # Determine file extension from the first bytes of the response
+                                    mime_type, chunks = sniff_response(response)
+                                    if not mime_type:
+                                        # The bytes aren't an image; fetching the same URL again won't change that
+                                        response.close()
+                                        self.log_message(f"Skipped image {idx}: Type filter (not an image: {current_url})", "info")
+                                        break
                                     
-                                    # Determine extension based on content-type first
-                                    if 'webp' in content_type:
+                                    if mime_type == 'image/webp':
                                         ext = '.png'  # Convert WebP to PNG
-                                    elif 'svg' in content_type:
-                                        ext = '.svg'
-                                    elif 'png' in content_type:
-                                        ext = '.png'
-                                    elif 'jpeg' in content_type or 'jpg' in content_type:
-                                        ext = '.jpg'
                                     else:
-                                        # Fallback to URL extension
-                                        if '.webp' in current_url.lower():
-                                            ext = '.png'  # Convert WebP to PNG
-                                        elif '.svg' in current_url.lower() and 'image/svg' in content_type:
-                                            ext = '.svg'  # Only use SVG if content-type confirms it
-                                        elif '.png' in current_url.lower():
-                                            ext = '.png'
-                                        elif '.jpg' in current_url.lower() or '.jpeg' in current_url.lower():
-                                            ext = '.jpg'
-                                        else:
-                                            ext = '.png'  # Default to PNG
+                                        ext = MIME_EXTENSIONS.get(mime_type, '.png')
                                     
                                     filename = f"image_{idx}{ext}"
                                     filepath = os.path.join(save_location, filename)
                                     
                                     # For WebP images, try to convert to PNG if possible
-                                    if 'webp' in content_type:
+                                    if self.transcoder.handles(mime_type):
                                         try:
-                                            from PIL import Image
-                                            import io
+                                            with token.watch(response):
+                                                image_data = b''.join(chunks)
+                                            chunks = [image_data]  # Still available to the direct save below
                                             
-                                            # Load WebP image
-                                            image_data = response.content
-                                            image = Image.open(io.BytesIO(image_data))
-                                            
-                                            # Save as PNG
-                                            image.save(filepath, 'PNG', quality=95)
-                                            if os.path.exists(filepath) and os.path.getsize(filepath) > 100:
-                                                downloaded += 1
-                                                self.log_message(f"Downloaded: {filename}", "success")
-                                                continue
+                                            # Convert on the transcode stage's process pool and move on;
+                                            # the file is written (and counted) once the conversion is done
+                                            job = self.transcoder.submit(image_data, mime_type)
+                                            converting.append(when_done(job, partial(save_converted, image_data,
+                                                                                     filepath, filename)))
+                                            break
                                         except Exception as e:
                                             pass  # Silently fall back to direct save
                                     
                                     # Normal save for non-WebP images or if conversion failed
-                                    with open(filepath, 'wb') as f:
-                                        for chunk in response.iter_content(chunk_size=8192):
-                                            if chunk and self.is_downloading:
-                                                f.write(chunk)
-                                            elif not self.is_downloading:
-                                                break
+                                    try:
+                                        with token.watch(response), open(filepath, 'wb') as f:
+                                            for chunk in chunks:
+                                                if self.is_downloading:
+                                                    f.write(chunk)
+                                                elif not self.is_downloading:
+                                                    break
+                                    except Exception:
+                                        # A read cut off by Stop is not an error
+                                        if not token.cancelled:
+                                            raise
                                     
+                                    if token.cancelled:
+                                        # Don't keep the part written before Stop
+                                        os.remove(filepath)
+                                        break
                                     if os.path.exists(filepath) and os.path.getsize(filepath) > 100:
                                         downloaded += 1
                                         self.log_message(f"Downloaded: {filename}", "success")
@@ -586,16 +600,26 @@ class ImageScraperApp:
                                     failed += 1
                             
                             except Exception as e:
+                                if token.cancelled:
+                                    break
                                 if retry == retry_count - 1:
                                     self.log_message(f"Error downloading image {idx}: {str(e)} for URL: {current_url}", "error")
                                     failed += 1
                             
-                            if retry < retry_count - 1 and self.is_downloading:
-                                time.sleep(1)
+                            if retry < retry_count - 1 and token.wait(1):
+                                break
                     
                     except Exception as e:
                         self.log_message(f"Error processing image {idx}: {str(e)}", "error")
                 
+                # Images still converting were fetched before any stop, so they are kept
+                for saved in converting:
+                    try:
+                        if saved.result():
+                            downloaded += 1
+                    except Exception as e:
+                        self.log_message(f"Error saving converted image: {str(e)}", "error")
+                
                 # Final status update
                 if self.is_downloading:
                     self.log_message(f"Download complete! Successfully downloaded {downloaded} of {total_images} images", "success")
@@ -612,6 +636,13 @@ class ImageScraperApp:
         self.download_thread = threading.Thread(target=download_thread, daemon=True)
         self.download_thread.start()
     
+    def on_close(self):
+        """Stop any download and shut down the worker processes before the window closes"""
+        self.is_downloading = False
+        self.cancel_token.cancel()
+        self.transcoder.close()
+        self.root.destroy()
+
     def download_svg(self, session, img_url, save_location, idx):
         """Dedicated method for downloading SVG files."""
         try:
@@ -721,17 +752,10 @@ class ImageScraperApp:
             
             # Scroll page to load lazy content
             self.log_message("Scrolling page to load dynamic content...")
-            last_height = driver.execute_script("return document.body.scrollHeight")
-            while True:
-                # Scroll down to bottom
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                # Wait to load page
-                time.sleep(2)
-                # Calculate new scroll height and compare with last scroll height
-                new_height = driver.execute_script("return document.body.scrollHeight")
-                if new_height == last_height:
-                    break
-                last_height = new_height
+            settle = PageSettleDetector(driver, page_budget=60)
+            settle.install()
+            steps = settle.scroll_until_settled()
+            self.log_message(f"Scrolled {steps} times in {settle.elapsed():.1f}s", "info")
             
             # Scroll back to top
             driver.execute_script("window.scrollTo(0, 0);")
@@ -750,155 +774,16 @@ class ImageScraperApp:
             """)
             self.log_message(f"Page metrics - Total elements: {metrics['totalElements']}, iFrames: {metrics['iframes']}, Scripts: {metrics['scripts']}", "info")
             
-            # Method 1: Direct img tags
-            images = driver.find_elements(By.TAG_NAME, 'img')
-            self.log_message(f"Found {len(images)} direct <img> tags", "info")
-            
-            # Method 2: Background images with expanded search
-            background_elements = driver.execute_script("""
-                function getBackgroundImages() {
-                    const images = new Set();
-                    const elements = document.getElementsByTagName('*');
-                    
-                    for (const el of elements) {
-                        // Check computed style
-                        const style = window.getComputedStyle(el);
-                        if (style.backgroundImage && style.backgroundImage !== 'none') {
-                            images.add(style.backgroundImage);
-                        }
-                        
-                        // Check inline style
-                        if (el.style.backgroundImage && el.style.backgroundImage !== 'none') {
-                            images.add(el.style.backgroundImage);
-                        }
-                        
-                        // Check data attributes
-                        for (const attr of el.attributes) {
-                            if (attr.name.startsWith('data-') && 
-                                (attr.value.includes('.jpg') || 
-                                 attr.value.includes('.jpeg') || 
-                                 attr.value.includes('.png') || 
-                                 attr.value.includes('.gif') || 
-                                 attr.value.includes('.webp'))) {
-                                images.add(`url(${attr.value})`);
-                            }
-                        }
-                    }
-                    return Array.from(images);
-                }
-                return getBackgroundImages();
-            """)
-            self.log_message(f"Found {len(background_elements)} background images", "info")
-            
-            # Method 3: Picture elements
-            picture_elements = driver.find_elements(By.TAG_NAME, 'picture')
-            self.log_message(f"Found {len(picture_elements)} <picture> elements", "info")
-            
-            # Method 4: SVG images
-            svg_images = driver.find_elements(By.TAG_NAME, 'svg')
-            self.log_message(f"Found {len(svg_images)} SVG elements", "info")
-            
-            # Method 5: Look for images in data attributes
-            data_images = driver.execute_script("""
-                function getDataImages() {
-                    const images = new Set();
-                    const elements = document.getElementsByTagName('*');
-                    
-                    for (const el of elements) {
-                        for (const attr of el.attributes) {
-                            if (attr.name.startsWith('data-') && 
-                                (attr.value.includes('.jpg') || 
-                                 attr.value.includes('.jpeg') || 
-                                 attr.value.includes('.png') || 
-                                 attr.value.includes('.gif') || 
-                                 attr.value.includes('.webp'))) {
-                                images.add(attr.value);
-                            }
-                        }
-                    }
-                    return Array.from(images);
-                }
-                return getDataImages();
-            """)
-            self.log_message(f"Found {len(data_images)} images in data attributes", "info")
+            # Collect every candidate (img/source/srcset, data-* attributes, backgrounds) in one round trip
+            candidates, _ = extract_images(driver)
+            kinds = {}
+            for candidate in candidates:
+                kinds[candidate['kind']] = kinds.get(candidate['kind'], 0) + 1
+            for kind, count in sorted(kinds.items()):
+                self.log_message(f"Found {count} images via {kind}", "info")
             
             # Store all image sources
-            self.image_sources = []
-            
-            # Process direct img tags
-            for img in images:
-                try:
-                    src = img.get_attribute('src')
-                    srcset = img.get_attribute('srcset')
-                    data_src = img.get_attribute('data-src')
-                    data_original = img.get_attribute('data-original')
-                    
-                    if src:
-                        self.log_message(f"Found image with src: {src}", "info")
-                        if not src.startswith(('http://', 'https://', 'data:')):
-                            src = urljoin(url, src)
-                        self.image_sources.append(src)
-                    
-                    if srcset:
-                        self.log_message(f"Found srcset: {srcset}", "info")
-                        for srcset_url in srcset.split(','):
-                            url_part = srcset_url.strip().split(' ')[0]
-                            if not url_part.startswith(('http://', 'https://', 'data:')):
-                                url_part = urljoin(url, url_part)
-                            self.image_sources.append(url_part)
-                    
-                    if data_src:
-                        self.log_message(f"Found data-src: {data_src}", "info")
-                        if not data_src.startswith(('http://', 'https://', 'data:')):
-                            data_src = urljoin(url, data_src)
-                        self.image_sources.append(data_src)
-                    
-                    if data_original:
-                        self.log_message(f"Found data-original: {data_original}", "info")
-                        if not data_original.startswith(('http://', 'https://', 'data:')):
-                            data_original = urljoin(url, data_original)
-                        self.image_sources.append(data_original)
-                        
-                except Exception as e:
-                    self.log_message(f"Error processing image element: {str(e)}", "error")
-            
-            # Process background images
-            for bg in background_elements:
-                try:
-                    url_match = re.search(r'url\(["\']?(.*?)["\']?\)', bg)
-                    if url_match:
-                        bg_url = url_match.group(1)
-                        self.log_message(f"Found background image: {bg_url}", "info")
-                        if not bg_url.startswith(('http://', 'https://', 'data:')):
-                            bg_url = urljoin(url, bg_url)
-                        self.image_sources.append(bg_url)
-                except Exception as e:
-                    self.log_message(f"Error processing background image: {str(e)}", "error")
-            
-            # Process picture elements
-            for picture in picture_elements:
-                try:
-                    sources = picture.find_elements(By.TAG_NAME, 'source')
-                    for source in sources:
-                        srcset = source.get_attribute('srcset')
-                        if srcset:
-                            self.log_message(f"Found picture source: {srcset}", "info")
-                            for srcset_url in srcset.split(','):
-                                url_part = srcset_url.strip().split(' ')[0]
-                                if not url_part.startswith(('http://', 'https://', 'data:')):
-                                    url_part = urljoin(url, url_part)
-                                self.image_sources.append(url_part)
-                except Exception as e:
-                    self.log_message(f"Error processing picture element: {str(e)}", "error")
-            
-            # Process data images
-            for data_img in data_images:
-                try:
-                    if not data_img.startswith(('http://', 'https://', 'data:')):
-                        data_img = urljoin(url, data_img)
-                    self.image_sources.append(data_img)
-                except Exception as e:
-                    self.log_message(f"Error processing data image: {str(e)}", "error")
+            self.image_sources = [candidate['url'] for candidate in candidates]
             
             # Remove duplicates while preserving order
             self.image_sources = list(dict.fromkeys(self.image_sources))
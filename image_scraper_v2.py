@@ -3,18 +3,14 @@ import os
 import requests
 import base64
 import threading
-import time
 from bs4 import BeautifulSoup
 import tkinter as tk
 from tkinter import ttk, filedialog, scrolledtext, messagebox
 from urllib.parse import urljoin, urlparse, parse_qs, urlencode, urlunparse, unquote
-from PIL import Image, UnidentifiedImageError
+from PIL import UnidentifiedImageError
 from io import BytesIO
 import re
 import random
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -27,6 +23,16 @@ import http.client
 http.client._MAXHEADERS = 1000
 from datetime import datetime
 
+# Share the scanner internals that live in the src package
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from core.browser_pool import BrowserPool, default_chrome_options
+from core.cancellation import CancelToken
+from core.content_sniffing import probe_image_type, sniff_response
+from core.page_settle import PageSettleDetector
+from core.resumable import SizeLimitExceeded, download_to_part, part_path, remove_part
+from core.task_window import run_windowed
+from core.transcoding import TranscodeStage, when_done
+
 class RoundedFrame(ttk.Frame):
     def __init__(self, parent, radius=20, padding=15, background=None, **kwargs):
         super().__init__(parent, padding=padding, **kwargs)
@@ -145,7 +151,11 @@ class ImageScraperApp:
         self.root.configure(bg='#2b2b2b')
         self.root.state('zoomed')  # Maximize the window on Windows
         self.is_downloading = False
+        self.cancel_token = CancelToken()  # Closes in-flight downloads when Stop is pressed
         self.download_thread = None
+        self.browser_pool = None  # Warm Chrome drivers reused across scans
+        self.transcoder = TranscodeStage()  # WebP to PNG on a process pool, off the download threads
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Download statistics
         self.download_start_time = None
@@ -473,8 +483,9 @@ class ImageScraperApp:
             return
         
         if self.is_downloading:
-            # Stop the download
+            # Stop the download, aborting the transfers still running
             self.is_downloading = False
+            self.cancel_token.cancel()
             self.start_button.config(text="Start Download")
             self.log_message("Stopping download...", "info")
             return
@@ -489,22 +500,37 @@ class ImageScraperApp:
         # Create the directory if it doesn't exist
         os.makedirs(save_location, exist_ok=True)
         
+        min_bytes, max_bytes = self.get_size_limits()
+        
         # Update button state and text
         self.start_button.config(text="Stop Download")
         self.check_button.config(state='disabled')
         self.is_downloading = True
+        self.cancel_token = CancelToken()
         
         print(f"Starting download thread with {len(self.image_sources)} images")  # Debug print
         
         # Start the download thread
         self.download_thread = threading.Thread(
             target=self.download_thread,
-            args=(save_location,),
+            args=(save_location, min_bytes, max_bytes),
             daemon=True
         )
         self.download_thread.start()
     
-    def download_thread(self, save_location):
+    def get_size_limits(self):
+        """(min bytes, max bytes or None) from the size filter fields, which are in KB"""
+        limits = []
+        for entry, default in ((self.min_size, 0), (self.max_size, None)):
+            value = entry.get().strip()
+            try:
+                limits.append(default if value in ('', entry.placeholder) else int(float(value) * 1024))
+            except ValueError:
+                self.log_message(f"Ignoring invalid size filter: {value}", "warning")
+                limits.append(default)
+        return tuple(limits)
+    
+    def download_thread(self, save_location, min_bytes=0, max_bytes=None):
         """Download thread to handle the image downloads."""
         try:
             os.makedirs(save_location, exist_ok=True)
@@ -529,29 +555,15 @@ class ImageScraperApp:
             # Use ThreadPoolExecutor for parallel downloads
             with ThreadPoolExecutor(max_workers=8) as executor:
                 self.log_message("Starting parallel download with 8 workers", "info")
-                # Submit all download tasks
-                future_to_url = {
-                    executor.submit(
-                        self.download_image, 
-                        session, 
-                        img_url, 
-                        save_location,
-                        idx
-                    ): (idx, img_url) 
-                    for idx, img_url in enumerate(self.image_sources, 1)
-                }
+                # Submit downloads through a sliding window so a huge image list doesn't
+                # become one future per image; stopping drops the ones not started yet
+                fetch = lambda item: self.download_image(session, item[1], save_location, item[0],
+                                                         min_bytes, max_bytes)
+                converting = {}  # Futures of images still on the transcode stage -> index
                 
-                # Process completed downloads
-                for future in concurrent.futures.as_completed(future_to_url):
-                    if not self.is_downloading:
-                        self.log_message("Download process stopped by user", "info")
-                        # Cancel all pending futures
-                        for f in future_to_url:
-                            f.cancel()
-                        executor.shutdown(wait=False)
-                        break
-                        
-                    idx, url = future_to_url[future]
+                def count(idx, future):
+                    """Tally the (success, filename) an image's future resolved to"""
+                    nonlocal downloaded, failed
                     try:
                         success, filename = future.result(timeout=30)
                         if success:
@@ -570,6 +582,24 @@ class ImageScraperApp:
                     # Update progress
                     progress = ((downloaded + failed) / total_images) * 100
                     self.update_progress(progress)
+                
+                for (idx, url), future in run_windowed(executor, fetch, enumerate(self.image_sources, 1), 16,
+                                                       lambda: self.is_downloading):
+                    if not self.is_downloading:
+                        # Downloads that were already running finish but no longer count
+                        continue
+                    
+                    # A WebP image comes back as a future that resolves once it's converted and saved
+                    if future.exception() is None and isinstance(future.result(), concurrent.futures.Future):
+                        converting[future.result()] = idx
+                    else:
+                        count(idx, future)
+                    for job in [job for job in converting if job.done()]:
+                        count(converting.pop(job), job)
+                
+                # Images already fetched are kept even after Stop
+                for job, idx in converting.items():
+                    count(idx, job)
                     
             if self.is_downloading:
                 self.log_message(f"Download complete. Success: {downloaded}, Failed: {failed}, Total: {total_images}", "info")
@@ -585,14 +615,17 @@ class ImageScraperApp:
             self.root.after(0, lambda: self.start_button.config(text="Start Download"))
             self.root.after(0, lambda: self.update_progress(100))
             
-    def download_image(self, session, img_url, save_location, idx):
-        """Download a single image."""
+    def download_image(self, session, img_url, save_location, idx, min_bytes=0, max_bytes=None):
+        """Download a single image, skipping it as soon as it falls outside min_bytes..max_bytes."""
         self.log_message(f"Attempting to download image {idx} from {img_url}", "info")
+        token = self.cancel_token
         
         for retry in range(2):  # Try twice
             try:
                 # Try each URL variation
                 for url in self.get_url_variations(img_url):
+                    if token.cancelled:
+                        return False, None
                     try:
                         self.log_message(f"Trying URL variation: {url}", "debug")
                         response = session.get(
@@ -604,82 +637,107 @@ class ImageScraperApp:
                             headers=self.get_headers(url)
                         )
                         
-                        self.log_message(f"Response status code: {response.status_code}", "debug")
-                        if response.status_code == 200:
-                            # Generate filename from URL
-                            url_hash = hashlib.md5(url.encode()).hexdigest()[:8]
-                            content_type = response.headers.get('content-type', '').lower()
-                            self.log_message(f"Content type: {content_type}", "debug")
+                        # Stop closes this response's socket, so a stalled read doesn't hold up the stop
+                        with token.watch(response):
+                            self.log_message(f"Response status code: {response.status_code}", "debug")
+                            if response.status_code == 200:
+                                # Generate filename from URL
+                                url_hash = hashlib.md5(url.encode()).hexdigest()[:8]
+                                content_type = response.headers.get('content-type', '').lower()
+                                self.log_message(f"Content type: {content_type}", "debug")
                             
-                            # Determine extension from content type or URL
-                            if 'webp' in content_type:
-                                ext = 'png'  # Convert WebP to PNG
-                            elif 'svg' in content_type:
-                                ext = 'svg'
-                            elif 'png' in content_type:
-                                ext = 'png'
-                            elif 'jpeg' in content_type or 'jpg' in content_type:
-                                ext = 'jpg'
-                            else:
-                                # Try to get extension from URL or default to jpg
-                                ext = url.split('.')[-1].lower().split('?')[0]
-                                if ext not in ['jpg', 'jpeg', 'png', 'svg', 'webp']:
+                                # A declared length outside the size filter is skipped before any body bytes
+                                content_length = response.headers.get('content-length', '')
+                                if content_length.isdigit() and (int(content_length) < min_bytes or
+                                                                 (max_bytes is not None and int(content_length) > max_bytes)):
+                                    response.close()
+                                    self.log_message(f"Skipped {url}: size {int(content_length)/1024:.1f}KB is outside the filter", "info")
+                                    return False, None
+                            
+                                # The first bytes decide whether this is an image at all
+                                mime_type, chunks = sniff_response(response, chunk_size=32768)
+                                if not mime_type:
+                                    response.close()
+                                    self.log_message(f"Not an image: {url}", "debug")
+                                    continue
+                            
+                                # Determine extension from the sniffed type
+                                if mime_type == 'image/webp':
+                                    ext = 'png'  # Convert WebP to PNG
+                                elif mime_type == 'image/svg+xml':
+                                    ext = 'svg'
+                                elif mime_type in ('image/png', 'image/gif', 'image/avif'):
+                                    ext = mime_type.split('/')[1]
+                                else:
                                     ext = 'jpg'
                             
-                            filename = f"image_{url_hash}.{ext}"
-                            filepath = os.path.join(save_location, filename)
-                            self.log_message(f"Saving to: {filepath}", "debug")
+                                filename = f"image_{url_hash}.{ext}"
+                                filepath = os.path.join(save_location, filename)
+                                self.log_message(f"Saving to: {filepath}", "debug")
 
-                            # Handle WebP images
-                            if 'webp' in content_type:
+                                # Written to a .part file that is resumed with Range if the connection drops,
+                                # then renamed, so an interrupted run never leaves a truncated image behind.
+                                # Images under min_bytes never reach the disk and ones over max_bytes are cut off
                                 try:
-                                    self.log_message("Converting WebP image to PNG", "debug")
-                                    import io
-                                    image_data = response.content
-                                    image = Image.open(io.BytesIO(image_data))
-                                    image.save(filepath, 'PNG', quality=90)
-                                    if os.path.exists(filepath):
-                                        self.log_message(f"Successfully converted and saved WebP image to {filepath}", "success")
-                                        return True, filename
-                                except Exception as e:
-                                    self.log_message(f"Error converting WebP image: {str(e)}", "error")
-                                    pass
+                                    part = part_path(filepath)
+                                    # WebP is kept in memory and handed to the transcode stage
+                                    target = BytesIO() if self.transcoder.handles(mime_type) else part
+                                    try:
+                                        total_size = download_to_part(session, url, response, chunks, target,
+                                                                      headers=self.get_headers(url), timeout=(3, 10),
+                                                                      cancel_token=token,
+                                                                      min_bytes=min_bytes, max_bytes=max_bytes)
+                                    except SizeLimitExceeded as e:
+                                        remove_part(part)
+                                        self.log_message(f"Skipped {url}: {str(e)}", "info")
+                                        return False, None
+                                    except Exception:
+                                        remove_part(part)
+                                        raise
+                                    if total_size is None:
+                                        remove_part(part)
+                                        self.log_message("Download cancelled by user", "info")
+                                        return False, None
 
-                            # Normal save for non-WebP images or if conversion failed
-                            try:
-                                with open(filepath, 'wb') as f:
-                                    total_size = 0
-                                    for chunk in response.iter_content(chunk_size=32768):
-                                        if chunk:
-                                            total_size += len(chunk)
-                                            f.write(chunk)
-                                        elif not self.is_downloading:
-                                            if os.path.exists(filepath):
-                                                os.remove(filepath)
-                                            self.log_message("Download cancelled by user", "info")
-                                            return False, None
-                                    
+                                    if target is not part:
+                                        # The worker moves on while the image is converted; the file is
+                                        # written once the conversion is done
+                                        self.log_message("Converting WebP image to PNG", "debug")
+                                        data = target.getvalue()
+                                        try:
+                                            job = self.transcoder.submit(data, mime_type)
+                                        except Exception as e:
+                                            job = concurrent.futures.Future()
+                                            job.set_exception(e)
+                                        return when_done(job, lambda job: self._save_converted(
+                                            job, data, filepath, filename, save_location, url_hash))
+                                    os.replace(part, filepath)
                                     self.log_message(f"Written {total_size} bytes to file", "debug")
 
-                                if os.path.exists(filepath):
-                                    actual_size = os.path.getsize(filepath)
-                                    self.log_message(f"File saved successfully. Size: {actual_size} bytes", "success")
-                                    return True, filename
-                                else:
-                                    self.log_message("File not found after writing", "error")
-                            except Exception as e:
-                                self.log_message(f"Error writing file: {str(e)}", "error")
+                                    if os.path.exists(filepath):
+                                        actual_size = os.path.getsize(filepath)
+                                        self.log_message(f"File saved successfully. Size: {actual_size} bytes", "success")
+                                        return True, filename
+                                    else:
+                                        self.log_message("File not found after writing", "error")
+                                except Exception as e:
+                                    self.log_message(f"Error writing file: {str(e)}", "error")
 
                     except requests.exceptions.RequestException as e:
+                        if token.cancelled:
+                            return False, None
                         if retry == 1:  # Only log on last retry
                             self.log_message(f"Network error downloading URL {url}: {str(e)}", "error")
                     except Exception as e:
+                        if token.cancelled:
+                            return False, None
                         if retry == 1:  # Only log on last retry
                             self.log_message(f"Error downloading URL {url}: {str(e)}", "error")
 
-                if retry < 1:  # Small delay between retries
+                if retry < 1:  # Small delay between retries, cut short by Stop
                     self.log_message(f"Retry {retry + 2} for image {idx}", "debug")
-                    time.sleep(0.5)
+                    if token.wait(0.5):
+                        return False, None
 
             except Exception as e:
                 if retry == 1:  # Only log on last retry
@@ -688,6 +746,23 @@ class ImageScraperApp:
         self.log_message(f"Failed to download image {idx} after all attempts", "error")
         return False, None
 
+    def _save_converted(self, job, data, filepath, filename, save_location, url_hash):
+        """Write a converted WebP image, or the original bytes if conversion failed; returns (success, filename)"""
+        try:
+            converted, _ = job.result()
+        except Exception as e:
+            # Keep the original bytes under their own extension
+            self.log_message(f"Error converting WebP image: {str(e)}", "error")
+            converted = data
+            filename = f"image_{url_hash}.webp"
+            filepath = os.path.join(save_location, filename)
+        part = part_path(filepath)
+        with open(part, 'wb') as f:
+            f.write(converted)
+        os.replace(part, filepath)
+        self.log_message(f"File saved successfully. Size: {len(converted)} bytes", "success")
+        return True, filename
+        
     def update_progress(self, value):
         """Update the progress bar and label"""
         self.scan_progress_var.set(value)
@@ -744,34 +819,13 @@ class ImageScraperApp:
     def scan_images(self, url):
         """Scan the webpage for images."""
         driver = None
+        healthy = True
         try:
-            # Configure Chrome options
-            chrome_options = Options()
-            chrome_options.add_argument('--headless')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            chrome_options.add_experimental_option('useAutomationExtension', False)
-            
-            # Add random user agent
-            user_agents = [
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0'
-            ]
-            user_agent = random.choice(user_agents)
-            chrome_options.add_argument(f'--user-agent={user_agent}')
-            
-            # Initialize ChromeDriver using webdriver_manager
-            self.log_message("Initializing Chrome WebDriver...", "info")
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            
-            # Set various timeouts
-            driver.set_page_load_timeout(60)
+            # Lease a warm browser; the driver binary is resolved once per pool, not per scan
+            self.log_message("Acquiring Chrome WebDriver...", "info")
+            pool = self.get_browser_pool()
+            driver = pool.acquire()
+            user_agent = driver.execute_script("return navigator.userAgent")
             driver.implicitly_wait(20)
             
             # Try to load the page directly with Selenium first
@@ -787,14 +841,10 @@ class ImageScraperApp:
                 
                 # Scroll the page to load lazy images
                 self.log_message("Scrolling page to load lazy images...", "info")
-                last_height = driver.execute_script("return document.body.scrollHeight")
-                while True:
-                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(2)
-                    new_height = driver.execute_script("return document.body.scrollHeight")
-                    if new_height == last_height:
-                        break
-                    last_height = new_height
+                settle = PageSettleDetector(driver, page_budget=60)
+                settle.install()
+                steps = settle.scroll_until_settled()
+                self.log_message(f"Scrolled {steps} times in {settle.elapsed():.1f}s", "info")
                 
                 # Get all image elements using JavaScript
                 self.log_message("Searching for images...", "info")
@@ -840,19 +890,24 @@ class ImageScraperApp:
                         abs_url = urljoin(url, src)
                         image_urls.add(abs_url)
                 
-                # Filter and store valid image URLs
-                valid_urls = []
-                session = requests.Session()
-                session.headers.update({'User-Agent': user_agent})
+                # URLs with an image extension are taken as-is; the download sniffs their bytes anyway
+                valid_urls = [img_url for img_url in image_urls if self.get_image_type(img_url)]
+                unknown_urls = [img_url for img_url in image_urls if not self.get_image_type(img_url)]
                 
-                for img_url in image_urls:
+                if unknown_urls:
+                    # Sniff the rest from their first bytes, concurrently
+                    self.log_message(f"Checking {len(unknown_urls)} URLs without an image extension...", "info")
+                    session = requests.Session()
+                    session.headers.update({'User-Agent': user_agent})
                     try:
-                        response = session.head(img_url, timeout=10, allow_redirects=True)
-                        if response.status_code == 200 and 'image' in response.headers.get('content-type', '').lower():
-                            valid_urls.append(img_url)
-                            self.log_message(f"Found valid image: {img_url}", "info")
-                    except Exception as e:
-                        continue
+                        with ThreadPoolExecutor(max_workers=8) as executor:
+                            types = executor.map(lambda img_url: probe_image_type(session, img_url), unknown_urls)
+                            for img_url, mime_type in zip(unknown_urls, types):
+                                if mime_type:
+                                    valid_urls.append(img_url)
+                                    self.log_message(f"Found valid image: {img_url}", "info")
+                    finally:
+                        session.close()
                 
                 if valid_urls:
                     self.image_sources = valid_urls
@@ -867,15 +922,38 @@ class ImageScraperApp:
                 raise
             
         except Exception as e:
+            healthy = False
             self.log_message(f"Error during scanning: {str(e)}", "error")
             raise
         
         finally:
             if driver:
-                try:
-                    driver.quit()
-                except:
-                    pass
+                pool.release(driver, healthy)
+
+    def get_browser_pool(self):
+        """Create the browser pool on first use with a randomly chosen user agent"""
+        if self.browser_pool is None:
+            user_agents = [
+                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
+                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0'
+            ]
+            self.browser_pool = BrowserPool(
+                size=1,
+                options=default_chrome_options(random.choice(user_agents)),
+                driver_path=ChromeDriverManager().install(),
+                page_load_timeout=60
+            )
+        return self.browser_pool
+
+    def on_close(self):
+        """Stop any download and shut down the worker processes before the window closes"""
+        self.is_downloading = False
+        self.cancel_token.cancel()
+        self.transcoder.close()
+        if self.browser_pool is not None:
+            self.browser_pool.close()
+        self.root.destroy()
 
     def get_image_type(self, url):
         """Determine the image type from URL."""
@@ -0,0 +1,293 @@
+import asyncio
+import hashlib
+from urllib.parse import urlparse
+from .content_sniffing import SNIFF_BYTES, detect_image_type
+from .download_results import SkipReason
+from .host_concurrency import THROTTLE_STATUSES, parse_retry_after
+from .http_cache import ResponseCache
+from .http_session import DOWNLOAD_HEADERS
+from .image_header import HEADER_BYTES, image_dimensions
+from .resumable import SizeLimitExceeded, part_path, remove_part
+
+try:
+    import aiohttp
+except ImportError:  # Optional: only the asyncio engine needs it
+    aiohttp = None
+
+# aiohttp can only decode brotli when the brotli package is installed
+ASYNC_HEADERS = dict(DOWNLOAD_HEADERS, **{'Accept-Encoding': 'gzip, deflate'})
+
+
+async def _read_prefix(response, size):
+    """Read up to size leading bytes of a response body"""
+    head = b''
+    while len(head) < size:
+        chunk = await response.content.read(size - len(head))
+        if not chunk:
+            break
+        head += chunk
+    return head
+
+
+async def _body(response, head):
+    """The whole body of response, starting with the head bytes already read"""
+    if head:
+        yield head
+    async for chunk in response.content.iter_chunked(65536):
+        yield chunk
+
+
+async def download_image_async(scraper, session, img_url, save_location, min_size=0, max_size=float('inf'),
+                               allowed_types=None, feedback=None):
+    """Asyncio counterpart of ImageScraper.download_image with the same filters and (success, result) outcome.
+
+    Images handed to the transcode stage return a coroutine for that outcome
+    instead, so the caller can give up its download slot before awaiting it.
+    feedback, a dict like the one ImageScraper._fetch_image returns, is
+    filled in with the outcome, latency and Retry-After for the host limiter.
+    Journal, cache and content store I/O runs in the loop's default executor.
+    """
+    feedback = feedback if feedback is not None else {}
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, scraper._journal_started, img_url)
+    cached = None
+    if scraper.http_cache is not None:
+        cached = await loop.run_in_executor(None, scraper.http_cache.lookup, img_url, save_location)
+    try:
+        headers = dict(ASYNC_HEADERS, **ResponseCache.conditional_headers(cached))
+        started = loop.time()
+        async with session.get(img_url, headers=headers) as response:
+            feedback['latency'] = loop.time() - started
+            if response.status in THROTTLE_STATUSES:
+                feedback['outcome'] = 'throttled'
+                feedback['retry_after'] = parse_retry_after(response.headers.get('Retry-After'))
+            if response.status == 304 and cached:
+                return await loop.run_in_executor(None, scraper._reuse_cached, img_url, cached, min_size, max_size,
+                                                  allowed_types)
+            if response.status >= 400:
+                return False, f"Download error: {response.status} {response.reason} for url: {img_url}"
+
+            # Skip if size filters don't match
+            error = scraper._check_length(response.headers.get('Content-Length'), min_size, max_size)
+            if error:
+                response.close()
+                return False, error
+
+            # Decide the type from the first bytes of the body
+            head = await _read_prefix(response, SNIFF_BYTES)
+            mime_type = detect_image_type(head, response.headers.get('Content-Type'))
+            error = scraper._check_type(mime_type, allowed_types)
+            if error:
+                response.close()
+                return False, error
+
+            # Skip images outside the pixel limits as soon as their header is in
+            if scraper.dimension_filter is not None:
+                dimensions = image_dimensions(head)
+                while dimensions is None and len(head) < HEADER_BYTES:
+                    more = await response.content.read(min(8192, HEADER_BYTES - len(head)))
+                    if not more:
+                        break
+                    head += more
+                    dimensions = image_dimensions(head)
+                error = scraper.dimension_filter.check(dimensions)
+                if error:
+                    response.close()
+                    return False, error
+
+            # Same streaming limits as download_to_part: small bodies stay in memory, big ones are cut off.
+            # Formats that get converted stay in memory entirely for the transcode stage
+            part = part_path(scraper._image_path(img_url, mime_type, save_location))
+            in_memory = scraper.transcoder.handles(mime_type)
+            digest = hashlib.sha256()
+            pending, written, f = [], 0, None
+            try:
+                async for chunk in _body(response, head):
+                    if not scraper.is_downloading:
+                        break
+                    written += len(chunk)
+                    if written > max_size:
+                        response.close()
+                        raise SizeLimitExceeded(f"Size filter while downloading (over {max_size/1024:.1f}KB)")
+                    digest.update(chunk)
+                    if f is None:
+                        pending.append(chunk)
+                        if written >= min_size and not in_memory:
+                            f = open(part, 'wb')
+                            f.writelines(pending)
+                            pending = []
+                    else:
+                        f.write(chunk)
+                if scraper.is_downloading and f is None:
+                    if written < min_size:
+                        raise SizeLimitExceeded(f"Size filter while downloading ({written/1024:.1f}KB)")
+                    if not in_memory:
+                        f = open(part, 'wb')
+            except BaseException:
+                if f is not None:
+                    f.close()
+                remove_part(part)
+                raise
+            if f is not None:
+                f.close()
+            if not scraper.is_downloading:
+                remove_part(part)
+                return False, "Cancelled"
+    except SizeLimitExceeded as e:
+        return False, SkipReason(str(e))
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        # Resets and timeouts say the host is struggling, not that the URL is bad
+        feedback['outcome'] = 'error'
+        return False, f"Download error: {str(e) or type(e).__name__}"
+    except Exception as e:
+        return False, f"Error: {str(e)}"
+
+    if in_memory:
+        return _transcoded(scraper, b''.join(pending), digest.hexdigest(), img_url, mime_type, save_location,
+                           min_size, max_size, response.headers)
+    return await loop.run_in_executor(None, _finish_part, scraper, part, digest.hexdigest(), img_url, save_location,
+                                      min_size, max_size, response.headers, mime_type)
+
+
+def _finish_part(scraper, part, sha256, img_url, save_location, min_size, max_size, headers, mime_type):
+    """Move a downloaded .part file into place and remember its validators (blocking)"""
+    success, result = scraper._finish_download(part, sha256, img_url, save_location, min_size, max_size)
+    if success and scraper.http_cache is not None:
+        scraper.http_cache.store(img_url, headers, result, sha256, mime_type)
+    return success, result
+
+
+async def _transcoded(scraper, data, sha256, img_url, mime_type, save_location, min_size, max_size, headers):
+    """(success, result) of an in-memory image once the transcode stage has encoded and saved it"""
+    # Only a full transcode queue blocks the hand-over, and that happens off the event loop;
+    # the encode itself is awaited without holding any thread
+    job = await asyncio.get_running_loop().run_in_executor(None, scraper._finish_transcode, data, sha256, img_url,
+                                                           mime_type, save_location, min_size, max_size, headers)
+    return await asyncio.wrap_future(job)
+
+
+def _stats_trace(stats):
+    """aiohttp trace hooks feeding requests and new connections into a HostConnectionStats"""
+    trace = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        context.host = urlparse(str(params.url)).netloc.lower()  # Same keys as HostSessionPool
+        stats.record_request(context.host)
+
+    async def on_connection_create_start(session, context, params):
+        context.connect_start = asyncio.get_running_loop().time()
+
+    async def on_connection_create_end(session, context, params):
+        stats.record_connection(context.host, asyncio.get_running_loop().time() - context.connect_start)
+
+    trace.on_request_start.append(on_request_start)
+    trace.on_connection_create_start.append(on_connection_create_start)
+    trace.on_connection_create_end.append(on_connection_create_end)
+    return trace
+
+
+async def _download_all(scraper, urls, save_location, min_size, max_size, allowed_types, concurrency, on_result,
+                        stats, politeness, max_attempts=3):
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = scraper.host_limits
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=10)
+    trace_configs = [_stats_trace(stats)] if stats is not None else None
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=trace_configs) as session:
+        loop = asyncio.get_running_loop()
+
+        async def fetch(img_url):
+            # Throttled URLs are retried once the host's pause is over, like the threaded scheduler does
+            for attempt in range(1, max_attempts + 1):
+                if politeness is not None:
+                    # Wait for the host's token before taking a slot, so a slow host can't hold slots idle.
+                    # The first calls may fetch robots.txt, so they run off the event loop
+                    if not await loop.run_in_executor(None, politeness.allowed, img_url):
+                        return img_url, (False, SkipReason("Disallowed by robots.txt"))
+                    delay = await loop.run_in_executor(None, politeness.delay, img_url)
+                    while delay > 0 and scraper.is_downloading:
+                        await asyncio.sleep(min(delay, 0.25))
+                        delay = politeness.delay(img_url)  # robots.txt is cached by now
+                ticket = None
+                if limits is not None:
+                    # The same per-host windows as the threaded engine: wait while the host is full or paused
+                    ticket = limits.try_acquire(img_url)
+                    while ticket is None and scraper.is_downloading:
+                        await asyncio.sleep(min(limits.next_ready() or 0.25, 0.25))
+                        ticket = limits.try_acquire(img_url)
+                if politeness is not None:
+                    await loop.run_in_executor(None, politeness.consume, img_url)
+                feedback = {'outcome': 'ok', 'latency': None, 'retry_after': None}
+                try:
+                    async with semaphore:
+                        if not scraper.is_downloading:
+                            return img_url, (False, "Cancelled")
+                        outcome = await download_image_async(scraper, session, img_url, save_location,
+                                                             min_size, max_size, allowed_types, feedback)
+                finally:
+                    if ticket is not None:
+                        limits.release(ticket, feedback['outcome'], feedback['latency'], feedback['retry_after'])
+                if asyncio.iscoroutine(outcome):
+                    # Wait for the encode with the download slot and host ticket already given back
+                    outcome = await outcome
+                if feedback['outcome'] != 'throttled' or limits is None or attempt == max_attempts:
+                    return img_url, outcome
+
+        # Only a window of tasks exists at a time, so memory stays flat for very long URL lists.
+        # Waiting on the token as well means a stop cancels stalled transfers instead of waiting them out
+        def deliver(outcome):
+            img_url, (success, result) = outcome
+            if on_result is not None:
+                on_result(img_url, success, result)
+
+        token = scraper.cancel_token
+        stop = asyncio.ensure_future(token.wait_async())
+        urls = iter(urls)
+        pending = set()
+        try:
+            while True:
+                while not token.cancelled and len(pending) < concurrency * 2:
+                    img_url = next(urls, None)
+                    if img_url is None:
+                        break
+                    pending.add(asyncio.ensure_future(fetch(img_url)))
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending | {stop}, return_when=asyncio.FIRST_COMPLETED)
+                pending.discard(stop)
+                # Downloads that finished alongside a stop are still delivered
+                for finished in done - {stop}:
+                    deliver(finished.result())
+                if token.cancelled:
+                    break
+        finally:
+            # Cancelled tasks close their connections and remove their .part files
+            stop.cancel()
+            for task in pending:
+                task.cancel()
+            results = await asyncio.gather(stop, *pending, return_exceptions=True)
+            # Some may have completed before their cancellation landed
+            for outcome in results[1:]:
+                if isinstance(outcome, tuple):
+                    deliver(outcome)
+
+
+def run_async_downloads(scraper, urls, save_location, min_size=0, max_size=float('inf'), allowed_types=None,
+                        concurrency=256, on_result=None, stats=None, politeness=None):
+    """Download urls with up to concurrency requests in flight on one event loop.
+
+    on_result(url, success, result) is called as each download finishes and
+    stats, a HostConnectionStats, collects per-host connection reuse, and
+    politeness, a PolitenessPolicy, paces requests per host. With
+    scraper.host_limits set, each host's requests also stay within its
+    adaptive concurrency window.
+    Stops early when scraper.is_downloading is cleared, which cancels
+    scraper.cancel_token and with it every request in flight.
+    """
+    if aiohttp is None:
+        raise ImportError("The asyncio download engine requires aiohttp (pip install aiohttp)")
+    if politeness is not None:
+        politeness.prefetch(urls)
+    asyncio.run(_download_all(scraper, urls, save_location, min_size, max_size, allowed_types,
+                              concurrency, on_result, stats, politeness))
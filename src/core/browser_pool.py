@@ -0,0 +1,293 @@
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from .http_session import DEFAULT_USER_AGENT
+from .network_capture import enable_performance_logging
+
+try:
+    import psutil
+except ImportError:  # Optional: without it the process tree is read from /proc where there is one
+    psutil = None
+
+MB = 1024 * 1024
+
+
+def default_chrome_options(user_agent=DEFAULT_USER_AGENT, performance_logging=False):
+    """Chrome options shared by every pooled scanner browser"""
+    chrome_options = Options()
+    chrome_options.add_argument('--headless=new')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    chrome_options.add_argument(f'--user-agent={user_agent}')
+    if performance_logging:
+        enable_performance_logging(chrome_options)
+    return chrome_options
+
+
+def _proc_children():
+    """{parent pid: [child pids]} for every process in /proc"""
+    children = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as f:
+                # The command name may contain spaces, so the parent pid is read after its closing parenthesis
+                parent = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(name))
+    return children
+
+
+def process_tree_rss_mb(pid):
+    """Resident memory of pid and all its descendants in MB, or None if it can't be measured"""
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return None
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass  # Exited while being measured
+        return total / MB
+    if not os.path.isdir('/proc'):
+        return None
+    children = _proc_children()
+    pids, total, measured = [pid], 0, False
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    while pids:
+        current = pids.pop()
+        pids.extend(children.get(current, []))
+        try:
+            with open(f'/proc/{current}/statm') as f:
+                total += int(f.read().split()[1]) * page_size
+            measured = True
+        except (OSError, IndexError, ValueError):
+            pass
+    return total / MB if measured else None
+
+
+class PooledBrowser:
+    """A warm Chrome instance plus the bookkeeping used to decide when to recycle it"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.baseline_memory = None
+
+
+class BrowserPool:
+    """Thread-safe pool of warm headless Chrome drivers shared across scans.
+
+    Drivers are reset between jobs and replaced after max_pages scans or once
+    the resident memory of their browser processes (ChromeDriver, Chrome and
+    its renderers) has grown by more than max_memory_growth_mb since their
+    first job. stats() reports how long acquire() callers waited for one.
+    """
+
+    def __init__(self, size=2, max_pages=50, max_memory_growth_mb=256, options=None,
+                 driver_path=None, page_load_timeout=30):
+        if size < 1:
+            raise ValueError("Browser pool size must be at least 1")
+        self.size = size
+        self.max_pages = max_pages
+        self.max_memory_growth_mb = max_memory_growth_mb
+        self.options = options if options is not None else default_chrome_options()
+        self.driver_path = driver_path
+        self.page_load_timeout = page_load_timeout
+        self._idle = []
+        self._leased = {}
+        self._starting = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._stats = {
+            'acquired': 0,
+            'created': 0,
+            'recycled': 0,
+            'acquire_wait_total': 0.0,
+            'acquire_wait_max': 0.0,
+        }
+        atexit.register(self.close)
+
+    def _start_browser(self):
+        service = Service(self.driver_path) if self.driver_path else Service()
+        driver = webdriver.Chrome(service=service, options=self.options)
+        driver.set_page_load_timeout(self.page_load_timeout)
+        return PooledBrowser(driver)
+
+    def warm(self, count=None):
+        """Start browsers up front so the first scans don't pay the startup cost"""
+        count = self.size if count is None else min(count, self.size)
+        with self._condition:
+            missing = count - len(self._idle) - len(self._leased) - self._starting
+            self._starting += max(0, missing)
+        for _ in range(max(0, missing)):
+            browser = None
+            try:
+                browser = self._start_browser()
+            finally:
+                with self._condition:
+                    self._starting -= 1
+                    if browser:
+                        self._stats['created'] += 1
+                        self._idle.append(browser)
+                    self._condition.notify()
+
+    def acquire(self, timeout=None):
+        """Lease a driver, starting a new one if the pool has room"""
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Browser pool is closed")
+                if self._idle:
+                    browser = self._idle.pop()
+                    break
+                if len(self._leased) + self._starting < self.size:
+                    self._starting += 1
+                    browser = None
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Timed out waiting for a pooled browser")
+                self._condition.wait(remaining)
+
+        if browser is None:
+            try:
+                browser = self._start_browser()
+            finally:
+                with self._condition:
+                    self._starting -= 1
+                    if browser is None:
+                        self._condition.notify()
+            with self._condition:
+                self._stats['created'] += 1
+
+        waited = time.monotonic() - start
+        with self._condition:
+            self._leased[id(browser.driver)] = browser
+            self._stats['acquired'] += 1
+            self._stats['acquire_wait_total'] += waited
+            self._stats['acquire_wait_max'] = max(self._stats['acquire_wait_max'], waited)
+        return browser.driver
+
+    def release(self, driver, healthy=True):
+        """Return a driver to the pool, resetting or recycling it as needed"""
+        with self._condition:
+            browser = self._leased.pop(id(driver), None)
+        if browser is None:
+            return
+
+        browser.pages += 1
+        keep = healthy and not self._closed and not self._should_recycle(browser) and self._reset(browser)
+        if keep:
+            with self._condition:
+                self._idle.append(browser)
+                self._condition.notify()
+            return
+
+        self._quit(browser)
+        with self._condition:
+            if not self._closed:
+                self._stats['recycled'] += 1
+            self._condition.notify()
+
+    @contextmanager
+    def browser(self, timeout=None):
+        """Lease a driver for the duration of a with-block"""
+        driver = self.acquire(timeout)
+        healthy = True
+        try:
+            yield driver
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            self.release(driver, healthy)
+
+    def _browser_rss_mb(self, driver):
+        """Resident memory of the driver's whole browser process tree, or None for a remote driver"""
+        process = getattr(getattr(driver, 'service', None), 'process', None)
+        if process is None:
+            return None
+        return process_tree_rss_mb(process.pid)
+
+    def _should_recycle(self, browser):
+        if self.max_pages and browser.pages >= self.max_pages:
+            return True
+        if self.max_memory_growth_mb:
+            rss = self._browser_rss_mb(browser.driver)
+            if rss is not None:
+                if browser.baseline_memory is None:
+                    browser.baseline_memory = rss
+                elif rss - browser.baseline_memory > self.max_memory_growth_mb:
+                    return True
+        return False
+
+    def _reset(self, browser):
+        """Clear cookies, cache and every visited origin's storage and park the browser on about:blank"""
+        driver = browser.driver
+        try:
+            for origin in self._frame_origins(driver):
+                driver.execute_cdp_cmd('Storage.clearDataForOrigin',
+                                       {'origin': origin, 'storageTypes': 'all'})
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+            driver.get('about:blank')
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _frame_origins(driver):
+        """Security origins of the loaded page and all of its frames, iframes included"""
+        origins = set()
+        pending = [driver.execute_cdp_cmd('Page.getFrameTree', {}).get('frameTree', {})]
+        while pending:
+            node = pending.pop()
+            origin = node.get('frame', {}).get('securityOrigin')
+            if origin and origin != 'null' and '://' in origin:
+                origins.add(origin)
+            pending.extend(node.get('childFrames', []))
+        return origins
+
+    def _quit(self, browser):
+        try:
+            browser.driver.quit()
+        except Exception:
+            pass
+
+    def stats(self):
+        """Snapshot of pool counters, including time spent waiting in acquire()"""
+        with self._condition:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+            stats['leased'] = len(self._leased)
+        stats['acquire_wait_avg'] = stats['acquire_wait_total'] / stats['acquired'] if stats['acquired'] else 0.0
+        return stats
+
+    def close(self):
+        """Quit every browser; leased drivers are quit when they are released"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        atexit.unregister(self.close)
+        for browser in idle:
+            self._quit(browser)
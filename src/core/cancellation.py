@@ -0,0 +1,90 @@
+import asyncio
+import socket
+import threading
+from contextlib import contextmanager
+
+# Seconds between checks of the token from the asyncio engine, which a threading.Event can't wake
+POLL_INTERVAL = 0.05
+
+
+def _response_socket(response):
+    """Socket under a streamed requests/urllib3 response, or None once it's released"""
+    raw = getattr(response, 'raw', None)
+    connection = getattr(raw, 'connection', None) or getattr(raw, '_connection', None)
+    sock = getattr(connection, 'sock', None)
+    if sock is None:
+        try:
+            sock = raw._fp.fp.raw._sock
+        except AttributeError:
+            return None
+    return sock
+
+
+def abort_response(response):
+    """Close a streamed response from any thread, waking a read blocked on its socket"""
+    sock = _response_socket(response)
+    if sock is not None:
+        try:
+            # The plain socket call, so a TLS socket isn't torn down under its reader
+            socket.socket.shutdown(sock, socket.SHUT_RDWR)
+        except OSError:
+            pass
+    try:
+        response.close()
+    except Exception:
+        pass
+
+
+class CancelToken:
+    """Stop signal shared by a run's downloads, retries, waits and scroll loops.
+
+    active() works as a should_continue callback. cancel() also aborts every
+    response registered with watch(), so a download blocked on a slow socket
+    stops at once instead of at its read timeout.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._responses = set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def active(self):
+        """True until cancel() is called"""
+        return not self._event.is_set()
+
+    def cancel(self):
+        """Cancel the run and close the sockets of all watched responses"""
+        with self._lock:
+            self._event.set()
+            responses = list(self._responses)
+            self._responses.clear()
+        for response in responses:
+            abort_response(response)
+
+    def wait(self, timeout):
+        """Sleep up to timeout seconds; True if cancelled meanwhile"""
+        return self._event.wait(timeout)
+
+    async def wait_async(self):
+        """Return once the token is cancelled; for asyncio.wait alongside running downloads"""
+        while not self._event.is_set():
+            await asyncio.sleep(POLL_INTERVAL)
+
+    @contextmanager
+    def watch(self, response):
+        """Abort response if the token is cancelled while the block runs"""
+        with self._lock:
+            cancelled = self._event.is_set()
+            if not cancelled:
+                self._responses.add(response)
+        if cancelled:
+            abort_response(response)
+        try:
+            yield response
+        finally:
+            with self._lock:
+                self._responses.discard(response)
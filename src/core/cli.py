@@ -0,0 +1,290 @@
+"""
+Scan web pages and download their images without a GUI.
+
+Progress goes to stdout as JSON lines, one event per line:
+
+    {"event": "page", "url": ..., "images": N}
+    {"event": "image", "page": ..., "url": ..., "success": true, "result": path or reason}
+    {"event": "progress", "page": ..., "percent": N}
+    {"event": "summary", "pages": N, "downloaded": N, ..., "exit_code": N}
+
+Log messages go to stderr as plain text. The exit code is one of the EXIT_*
+values below, so cron jobs and batch schedulers can tell a clean run from a
+partial one.
+
+    python -m src.core https://example.com/gallery -o downloads --types jpg,png
+    python -m src.core -i pages.txt -o downloads --engine asyncio --concurrency 128
+"""
+import argparse
+import errno
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from itertools import chain
+import requests
+from .content_sniffing import TYPE_NAMES
+from .image_header import DimensionFilter
+from .image_scraper import DOWNLOAD_ENGINES, SCAN_MODES, ImageScraper
+from .politeness import PolitenessPolicy
+from .seeding import iter_seed_urls, iter_url_lines
+from .transcoding import TRANSCODE_PROFILES
+
+EXIT_OK = 0  # Every image was downloaded or skipped by a filter
+EXIT_FAILURES = 1  # Some images failed to download
+EXIT_USAGE = 2  # Bad arguments (argparse uses 2 as well)
+EXIT_NO_IMAGES = 3  # Every page was scanned but none had images
+EXIT_ERROR = 4  # A download run aborted with an error
+EXIT_SCAN_FAILED = 5  # A page could not be scanned (fetch or browser error)
+EXIT_INTERRUPTED = 130  # Stopped by SIGINT or SIGTERM
+
+# Log levels in increasing order of importance; success counts as info
+LOG_LEVELS = {'debug': 0, 'info': 1, 'success': 1, 'warning': 2, 'error': 3}
+
+
+class EventWriter:
+    """Writes JSON-line events to stdout and log messages to stderr, from any thread"""
+
+    def __init__(self, out=None, err=None, quiet=False, log_level='warning'):
+        self.out = out or sys.stdout
+        self.err = err or sys.stderr
+        self.quiet = quiet  # Only the summary event
+        self.log_level = LOG_LEVELS[log_level]
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        if self.quiet and event != 'summary':
+            return
+        line = json.dumps(dict(event=event, **fields), default=str)
+        with self._lock:
+            self.out.write(line + '\n')
+            self.out.flush()
+
+    def log(self, message, level="info"):
+        if LOG_LEVELS.get(level, 1) < self.log_level:
+            return
+        with self._lock:
+            self.err.write(f"{level}: {message}\n")
+            self.err.flush()
+
+
+def parse_types(value):
+    """Type filter names from a comma-separated list; jpg and jpeg select each other"""
+    types = set(name.strip().lower().strip('.') for name in value.split(',') if name.strip())
+    unknown = types - set(TYPE_NAMES)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown image types: {', '.join(sorted(unknown))}")
+    if types & {'jpg', 'jpeg'}:
+        types |= {'jpg', 'jpeg'}
+    return sorted(types)
+
+
+def iter_page_urls(urls, sources):
+    """Page URLs given on the command line, then those in each source ('-' reads stdin).
+
+    Every local source is checked before the first URL is yielded, so a
+    mistyped path fails the run before any page is scanned.
+    """
+    for source in sources:
+        if source != '-' and not source.startswith(('http://', 'https://')) and not os.path.isfile(source):
+            raise FileNotFoundError(errno.ENOENT, "no such file", source)
+    yield from chain(urls, chain.from_iterable(iter_url_lines(sys.stdin) if source == '-' else iter_seed_urls(source)
+                                               for source in sources))
+
+
+def input_exit_code(error):
+    """EXIT_USAGE for a URL source that can't be read, EXIT_ERROR for a failed fetch or a malformed sitemap"""
+    if isinstance(error, requests.RequestException):
+        return EXIT_ERROR
+    if isinstance(error, (OSError, UnicodeDecodeError)):
+        return EXIT_USAGE
+    return EXIT_ERROR
+
+
+def run_batch(scraper, pages, save_location, allowed_types=None, min_size=0, max_size=float('inf'),
+              engine='threads', max_concurrency=None, run_id=None, on_event=None, should_continue=None):
+    """Scan each page URL and download its images with scraper; returns a summary dict.
+
+    With run_id, the journaled run is resumed instead and pages is ignored.
+    on_event(event, **fields) receives page, image and progress events, and
+    should_continue() is checked before and after each scan, so a stop never
+    starts another page's downloads. The summary holds the
+    image counts of all pages and an exit_code from the EXIT_* values.
+    An error raised while reading pages ends the batch; it is reported as
+    the summary's input_error rather than raised.
+    """
+    emit = on_event or (lambda event, **fields: None)
+    totals = {'pages': 0, 'pages_without_images': 0, 'images': 0, 'downloaded': 0, 'skipped': 0, 'failed': 0,
+              'cancelled': 0, 'duplicates': 0, 'near_duplicates': 0, 'bytes_saved': 0, 'errors': 0,
+              'scan_errors': 0}
+    run_ids = []
+    input_error = None
+    started = time.monotonic()
+    current = {'page': None, 'percent': -1}
+
+    def on_result(img_url, success, result):
+        emit('image', page=current['page'], url=img_url, success=success, result=result)
+
+    def on_progress(value):
+        # Whole percents only, so a long run doesn't print an event per image twice over
+        percent = int(value)
+        if percent != current['percent']:
+            current['percent'] = percent
+            emit('progress', page=current['page'], percent=percent)
+
+    def download(page_url, resume=None):
+        current['page'], current['percent'] = page_url, -1
+        scraper.start_download(page_url, save_location, allowed_types, min_size, max_size,
+                               engine=engine, max_concurrency=max_concurrency, run_id=resume)
+        summary = scraper.run_summary
+        if not summary:
+            totals['errors'] += 1
+            return
+        for key in ('images', 'downloaded', 'skipped', 'failed', 'cancelled'):
+            totals[key] += summary[key]
+        for key in ('duplicates', 'near_duplicates', 'bytes_saved'):
+            totals[key] += scraper.dedupe_stats.get(key, 0)
+        journaled = resume if resume is not None else scraper.run_id
+        if journaled is not None and journaled not in run_ids:
+            run_ids.append(journaled)
+
+    previous = scraper.result_callback, scraper.progress_callback
+    scraper.result_callback, scraper.progress_callback = on_result, on_progress
+    try:
+        if run_id is not None:
+            download(None, run_id)
+        else:
+            pages = iter(pages)
+            while should_continue is None or should_continue():
+                try:
+                    page_url = next(pages)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    # A missing URL file, an unreachable or malformed sitemap, unreadable stdin
+                    input_error = e
+                    break
+                totals['pages'] += 1
+                found = scraper.scan_webpage(page_url)
+                if scraper.scan_error is not None:
+                    totals['scan_errors'] += 1
+                    emit('page', url=page_url, images=0, error=scraper.scan_error)
+                    continue
+                emit('page', url=page_url, images=found)
+                if should_continue is not None and not should_continue():
+                    break
+                if not found:
+                    totals['pages_without_images'] += 1
+                    continue
+                download(page_url)
+    finally:
+        scraper.result_callback, scraper.progress_callback = previous
+
+    stopped = should_continue is not None and not should_continue()
+    if stopped:
+        exit_code = EXIT_INTERRUPTED
+    elif input_error is not None:
+        exit_code = input_exit_code(input_error)
+    elif totals['errors']:
+        exit_code = EXIT_ERROR
+    elif totals['scan_errors']:
+        exit_code = EXIT_SCAN_FAILED
+    elif totals['failed']:
+        exit_code = EXIT_FAILURES
+    elif not totals['images'] and run_id is None:
+        exit_code = EXIT_NO_IMAGES
+    else:
+        exit_code = EXIT_OK
+    return dict(totals, run_ids=run_ids, elapsed=round(time.monotonic() - started, 3), stopped=stopped,
+                input_error=None if input_error is None else str(input_error), exit_code=exit_code)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m src.core', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('urls', nargs='*', metavar='URL', help='pages to scan')
+    parser.add_argument('-i', '--input', action='append', default=[], metavar='FILE',
+                        help="file of page URLs (one per line or JSONL), a sitemap path or URL, or '-' for stdin; "
+                             "may be repeated")
+    parser.add_argument('-o', '--output', default='downloads', help='folder to save images to (default: downloads)')
+
+    filters = parser.add_argument_group('filters')
+    filters.add_argument('--types', type=parse_types, help=f"comma-separated types ({', '.join(TYPE_NAMES)})")
+    filters.add_argument('--min-size', type=float, default=0, metavar='KB')
+    filters.add_argument('--max-size', type=float, metavar='KB')
+    filters.add_argument('--min-width', type=int, default=0, metavar='PX')
+    filters.add_argument('--min-height', type=int, default=0, metavar='PX')
+    filters.add_argument('--max-width', type=int, metavar='PX')
+    filters.add_argument('--max-height', type=int, metavar='PX')
+
+    run = parser.add_argument_group('downloading')
+    run.add_argument('--engine', choices=DOWNLOAD_ENGINES, default='threads')
+    run.add_argument('--concurrency', type=int, metavar='N',
+                     help='parallel downloads (default: 10 threads or 256 asyncio requests)')
+    run.add_argument('--scan-mode', choices=SCAN_MODES, default='auto')
+    run.add_argument('--adaptive', action='store_true', help='grow and shrink concurrency per host')
+    run.add_argument('--polite', action='store_true', help='honor robots.txt')
+    run.add_argument('--rate', type=float, metavar='REQ/S', help='requests per second per host (implies --polite)')
+    run.add_argument('--transcode', choices=TRANSCODE_PROFILES, help='how WebP is stored (default: fast, as PNG)')
+    run.add_argument('--near-duplicates', type=int, metavar='BITS',
+                     help='keep only the largest of images within this perceptual hash distance')
+
+    state = parser.add_argument_group('state')
+    state.add_argument('--journal', metavar='PATH', help='record runs in this journal so they can be resumed')
+    state.add_argument('--resume', metavar='RUN_ID', help='resume a journaled run instead of scanning')
+    state.add_argument('--http-cache', metavar='PATH', help='revalidate previously saved images with this cache')
+
+    output = parser.add_argument_group('output')
+    output.add_argument('-q', '--quiet', action='store_true', help='print only the summary event')
+    output.add_argument('-v', '--verbose', action='count', default=0, help='log info (-v) or debug (-vv) to stderr')
+    return parser
+
+
+def build_scraper(args, log_callback=None):
+    """ImageScraper configured from parsed command-line arguments"""
+    dimension_filter = None
+    if args.min_width or args.min_height or args.max_width is not None or args.max_height is not None:
+        dimension_filter = DimensionFilter(args.min_width, args.min_height, args.max_width, args.max_height)
+    politeness = PolitenessPolicy(rate=args.rate) if args.polite or args.rate else None
+    return ImageScraper(log_callback=log_callback, scan_mode=args.scan_mode, adaptive_concurrency=args.adaptive,
+                        politeness=politeness, journal=args.journal, near_duplicate_distance=args.near_duplicates,
+                        http_cache=args.http_cache, dimension_filter=dimension_filter,
+                        transcode_policy=args.transcode)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.urls and not args.input and args.resume is None:
+        parser.error("give at least one URL, --input or --resume")
+    if args.resume is not None and args.journal is None:
+        parser.error("--resume needs --journal")
+
+    events = EventWriter(quiet=args.quiet, log_level=('warning', 'info', 'debug')[min(args.verbose, 2)])
+    scraper = build_scraper(args, events.log)
+    stop = threading.Event()
+
+    def handle_signal(signum, frame):
+        # Finish promptly: in-flight downloads are cancelled and left resumable in the journal
+        events.log(f"Received signal {signum}, stopping", "warning")
+        stop.set()
+        scraper.is_downloading = False
+
+    handled = (signal.SIGINT, signal.SIGTERM)
+    previous = {}
+    if threading.current_thread() is threading.main_thread():
+        for signum in handled:
+            previous[signum] = signal.signal(signum, handle_signal)
+    try:
+        summary = run_batch(scraper, iter_page_urls(args.urls, args.input), args.output, args.types,
+                            args.min_size * 1024, float('inf') if args.max_size is None else args.max_size * 1024,
+                            args.engine, args.concurrency, args.resume, events.emit, lambda: not stop.is_set())
+    finally:
+        scraper.close()
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+    if summary['input_error'] is not None:
+        events.log(f"Could not read page URLs: {summary['input_error']}", "error")
+    events.emit('summary', **summary)
+    return summary['exit_code']
@@ -0,0 +1,128 @@
+import requests
+
+# Enough leading bytes to recognize every supported format
+SNIFF_BYTES = 512
+
+# File extension written for each sniffed type
+MIME_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'image/avif': '.avif',
+    'image/svg+xml': '.svg',
+}
+
+# Filter names used by the GUIs mapped to the type they select
+TYPE_NAMES = {
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'webp': 'image/webp',
+    'avif': 'image/avif',
+    'svg': 'image/svg+xml',
+}
+
+AVIF_BRANDS = (b'avif', b'avis')
+
+# Types sniff_image_type recognizes by their bytes; a Content-Type naming one of these is never taken on trust
+SNIFFABLE_TYPES = frozenset(MIME_EXTENSIONS)
+
+
+def sniff_image_type(data):
+    """Image MIME type from the leading bytes of a file, or None if it isn't a known image"""
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if data.startswith((b'GIF87a', b'GIF89a')):
+        return 'image/gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[4:8] == b'ftyp':
+        # ISO-BMFF: major brand plus compatible brands inside the ftyp box
+        box_size = int.from_bytes(data[:4], 'big')
+        brands = data[8:min(box_size, len(data))]
+        if any(brands[i:i + 4] in AVIF_BRANDS for i in range(0, len(brands) - 3, 4)):
+            return 'image/avif'
+        return None
+    text = data.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    if text.startswith((b'<svg', b'<?xml', b'<!doctype svg', b'<!--')) and b'<svg' in text:
+        return 'image/svg+xml'
+    return None
+
+
+def header_image_type(content_type):
+    """Normalized image MIME type from a Content-Type header, or None"""
+    mime_type = (content_type or '').split(';', 1)[0].strip().lower()
+    if mime_type == 'image/jpg':
+        return 'image/jpeg'
+    return mime_type if mime_type.startswith('image/') else None
+
+
+def detect_image_type(head, content_type):
+    """Image MIME type of a body from its leading bytes, or None if it isn't an image.
+
+    The Content-Type header only counts for formats without a signature the
+    sniffer knows (BMP, TIFF, icons, ...); a body claiming to be JPEG, PNG
+    and so on whose bytes say otherwise, such as an HTML error page, is not
+    an image.
+    """
+    mime_type = sniff_image_type(head)
+    if mime_type:
+        return mime_type
+    mime_type = header_image_type(content_type)
+    if mime_type in SNIFFABLE_TYPES:
+        return None
+    return mime_type
+
+
+def allowed_mime_types(allowed_types):
+    """MIME types selected by a list of filter names like ['jpg', 'png']"""
+    return set(TYPE_NAMES.get(name.lower().strip('.'), f"image/{name.lower().strip('.')}") for name in allowed_types)
+
+
+def sniff_response(response, chunk_size=8192):
+    """Read just enough of a streamed response to sniff it.
+
+    Returns (mime_type, chunks) where chunks yields the whole body, starting
+    with the bytes already read. The type comes from the magic number (see
+    detect_image_type); mime_type is None if the body isn't an image.
+    """
+    chunks = response.iter_content(chunk_size=chunk_size)
+    head = b''
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= SNIFF_BYTES:
+            break
+    mime_type = detect_image_type(head, response.headers.get('Content-Type'))
+
+    def body():
+        if head:
+            yield head
+        for chunk in chunks:
+            if chunk:
+                yield chunk
+
+    return mime_type, body()
+
+
+def probe_image_type(session, url, timeout=(5, 10), headers=None):
+    """Sniff a URL's type from its first bytes with a ranged GET; returns None if it isn't an image"""
+    request_headers = dict(headers or {})
+    request_headers['Range'] = f'bytes=0-{SNIFF_BYTES - 1}'
+    try:
+        response = session.get(url, headers=request_headers, stream=True, timeout=timeout, allow_redirects=True)
+    except requests.exceptions.RequestException:
+        return None
+    try:
+        if response.status_code not in (200, 206):
+            return None
+        mime_type, _ = sniff_response(response, chunk_size=SNIFF_BYTES)
+        return mime_type
+    except requests.exceptions.RequestException:
+        return None
+    finally:
+        # Servers that ignore Range would otherwise send the whole file
+        response.close()
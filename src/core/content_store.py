@@ -0,0 +1,87 @@
+import json
+import os
+import re
+import threading
+import time
+
+MANIFEST_NAME = 'manifest.jsonl'
+
+HASH_NAME_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def content_hash(path):
+    """SHA-256 a content-addressed file is named after, or None for other files"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return stem if HASH_NAME_RE.match(stem) else None
+
+
+class ContentStore:
+    """Saves downloads under the SHA-256 of their bytes.
+
+    A file is named <sha256><ext> in root, so the same image found at several
+    URLs (or in an earlier run) is stored once. Every stored URL gets a line in
+    root/manifest.jsonl saying which file holds its bytes, and duplicates only
+    get that line.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        self.stored = 0
+        self.duplicates = 0
+        self.bytes_stored = 0
+        self.bytes_saved = 0
+        self.near_duplicates = 0
+        self.near_duplicate_bytes = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, sha256, ext):
+        return os.path.join(self.root, sha256 + ext)
+
+    def store(self, temp_path, sha256, ext, url=None):
+        """Move a finished temp file into place under its hash; returns (path, duplicate)"""
+        path = self.path_for(sha256, ext)
+        try:
+            # Linking fails if the name exists, so two threads racing on the same bytes can't both win
+            os.link(temp_path, path)
+            duplicate = False
+        except FileExistsError:
+            duplicate = True
+        except OSError:
+            # Filesystems without hardlinks
+            duplicate = os.path.exists(path)
+            if not duplicate:
+                os.replace(temp_path, path)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+        size = os.path.getsize(path)
+        with self._lock:
+            if duplicate:
+                self.duplicates += 1
+                self.bytes_saved += size
+            else:
+                self.stored += 1
+                self.bytes_stored += size
+            self._append_manifest({'url': url, 'file': os.path.basename(path), 'sha256': sha256,
+                                   'bytes': size, 'duplicate': duplicate, 'time': time.time()})
+        return path, duplicate
+
+    def _append_manifest(self, entry):
+        with open(self.manifest_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+
+    def record_near_duplicate(self, path, kept, size):
+        """Note that path was deleted as a smaller near-duplicate of kept"""
+        with self._lock:
+            self.near_duplicates += 1
+            self.near_duplicate_bytes += size
+            self._append_manifest({'file': os.path.basename(path), 'near_duplicate_of': os.path.basename(kept),
+                                   'bytes': size, 'removed': True, 'time': time.time()})
+
+    def stats(self):
+        """{stored, duplicates, bytes_stored, bytes_saved, near_duplicates, near_duplicate_bytes} so far"""
+        with self._lock:
+            return {'stored': self.stored, 'duplicates': self.duplicates,
+                    'bytes_stored': self.bytes_stored, 'bytes_saved': self.bytes_saved,
+                    'near_duplicates': self.near_duplicates, 'near_duplicate_bytes': self.near_duplicate_bytes}
@@ -0,0 +1,243 @@
+import queue
+import threading
+from collections import OrderedDict, deque
+from urllib.parse import urlparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from .browser_pool import BrowserPool
+from .image_scraper import ImageScraper
+from .url_utils import normalize_url, same_origin, url_fingerprint
+
+# File extensions that are never HTML pages worth scanning
+NON_PAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.avif', '.pdf', '.zip',
+                       '.mp4', '.mp3', '.css', '.js', '.json', '.xml')
+
+
+class UrlFrontier:
+    """FIFO of (url, depth) that admits each normalized URL only once"""
+
+    def __init__(self):
+        self._queue = deque()
+        self._seen = set()  # 8-byte fingerprints keep memory flat on big sites
+
+    def add(self, url, depth):
+        fingerprint = url_fingerprint(url)
+        if fingerprint in self._seen:
+            return False
+        self._seen.add(fingerprint)
+        self._queue.append((normalize_url(url), depth))
+        return True
+
+    def pop(self):
+        return self._queue.popleft()
+
+    def __len__(self):
+        return len(self._queue)
+
+    @property
+    def seen_count(self):
+        return len(self._seen)
+
+
+class HostFairFrontier(UrlFrontier):
+    """Frontier that rotates between hosts so one large host can't starve the others.
+
+    Seed URLs are pulled lazily from an iterator, keeping at most buffer_size
+    of them in memory at a time.
+    """
+
+    def __init__(self, seeds=None, buffer_size=1000):
+        super().__init__()
+        self._hosts = OrderedDict()  # host -> deque of (url, depth)
+        self._buffered = 0
+        self._seeds = iter(seeds) if seeds is not None else None
+        self.buffer_size = buffer_size
+
+    def add(self, url, depth):
+        fingerprint = url_fingerprint(url)
+        if fingerprint in self._seen:
+            return False
+        self._seen.add(fingerprint)
+        url = normalize_url(url)
+        self._hosts.setdefault(urlparse(url).netloc, deque()).append((url, depth))
+        self._buffered += 1
+        return True
+
+    def _refill(self):
+        while self._seeds is not None and self._buffered < self.buffer_size:
+            try:
+                url = next(self._seeds)
+            except StopIteration:
+                self._seeds = None
+                break
+            if url.startswith(('http://', 'https://')):
+                self.add(url, 0)
+
+    def pop(self):
+        self._refill()
+        host, urls = next(iter(self._hosts.items()))
+        item = urls.popleft()
+        del self._hosts[host]
+        if urls:
+            self._hosts[host] = urls  # Back of the rotation
+        self._buffered -= 1
+        return item
+
+    def __len__(self):
+        self._refill()
+        return self._buffered
+
+
+class SiteCrawler:
+    """Crawls same-origin pages from a start URL and downloads their images as pages finish.
+
+    Pages are scanned by a bounded pool of ImageScraper workers sharing one
+    BrowserPool. Each finished page's new images go straight to a download
+    thread driving ImageScraper.start_download, so downloading overlaps the crawl.
+    Passing seeds (for example core.seeding.iter_seed_urls(...)) instead of a
+    start URL scans those pages with per-host fair scheduling. A shared
+    core.politeness.PolitenessPolicy applies rate limits and robots.txt to
+    both scanning and downloading.
+    """
+
+    def __init__(self, start_url, save_location, max_depth=1, max_pages=20, workers=2,
+                 allowed_types=None, min_size=0, max_size=float('inf'), scan_mode='auto',
+                 log_callback=None, browser_pool=None, seeds=None, politeness=None):
+        if start_url and not start_url.startswith(('http://', 'https://')):
+            start_url = 'https://' + start_url
+        self.start_url = start_url
+        self.save_location = save_location
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.workers = workers
+        self.allowed_types = allowed_types
+        self.min_size = min_size
+        self.max_size = max_size
+        self.scan_mode = scan_mode
+        self.log_callback = log_callback if log_callback else print
+        self.browser_pool = browser_pool
+        self.politeness = politeness  # One PolitenessPolicy paces both page scans and image downloads
+        self.frontier = HostFairFrontier(seeds) if seeds is not None else UrlFrontier()
+        self.is_running = False
+        self.pages_scanned = 0
+        self.images_queued = 0
+        self._seen_images = set()
+        self._local = threading.local()
+        self._scrapers = []
+        self._scrapers_lock = threading.Lock()
+        self._downloads = queue.Queue()
+        self.downloader = ImageScraper(log_callback=self.log_callback, politeness=politeness)
+
+    def log(self, message, level="info"):
+        self.log_callback(message, level)
+
+    def _worker_log(self, message, level="info"):
+        # Per-page progress chatter from the workers would drown the crawl log
+        if level in ("warning", "error"):
+            self.log(message, level)
+
+    def _scraper(self):
+        """ImageScraper owned by the current worker thread"""
+        scraper = getattr(self._local, 'scraper', None)
+        if scraper is None:
+            scraper = ImageScraper(log_callback=self._worker_log, scan_mode=self.scan_mode,
+                                   browser_pool=self.browser_pool, politeness=self.politeness)
+            self._local.scraper = scraper
+            with self._scrapers_lock:
+                self._scrapers.append(scraper)
+        return scraper
+
+    def _scan_page(self, url):
+        scraper = self._scraper()
+        scraper.scan_webpage(url)
+        return list(scraper.image_urls), dict(scraper.image_candidates), list(scraper.page_links)
+
+    def _is_page_link(self, link, page_url):
+        path = link.split('?', 1)[0].split('#', 1)[0].lower()
+        return same_origin(link, page_url) and not path.endswith(NON_PAGE_EXTENSIONS)
+
+    def _download_loop(self):
+        """Download each finished page's images while the crawl continues"""
+        while True:
+            batch = self._downloads.get()
+            if batch is None:
+                return
+            page_url, image_urls, candidates = batch
+            if not self.is_running:
+                continue
+            self.downloader.image_urls = image_urls
+            self.downloader.image_candidates = candidates
+            self.downloader.start_download(page_url, self.save_location, self.allowed_types,
+                                           self.min_size, self.max_size)
+
+    def stop(self):
+        """Stop scheduling pages and abort the current download batch"""
+        self.is_running = False
+        self.downloader.is_downloading = False
+
+    def run(self):
+        """Crawl until the frontier is empty or a limit is hit; returns a summary dict"""
+        self.is_running = True
+        owns_pool = self.browser_pool is None and self.scan_mode != 'static'
+        if owns_pool:
+            self.browser_pool = BrowserPool(size=self.workers)
+        if self.start_url:
+            self.frontier.add(self.start_url, 0)
+        download_thread = threading.Thread(target=self._download_loop, daemon=True)
+        download_thread.start()
+        submitted = 0
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                in_flight = {}
+                while self.is_running:
+                    while len(self.frontier) and len(in_flight) < self.workers and submitted < self.max_pages:
+                        url, depth = self.frontier.pop()
+                        in_flight[executor.submit(self._scan_page, url)] = (url, depth)
+                        submitted += 1
+                    if not in_flight:
+                        break
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        url, depth = in_flight.pop(future)
+                        try:
+                            image_urls, candidates, links = future.result()
+                        except Exception as e:
+                            self.log(f"Error scanning {url}: {str(e)}", "error")
+                            continue
+                        self.pages_scanned += 1
+
+                        new_images = []
+                        for image_url in image_urls:
+                            fingerprint = url_fingerprint(image_url)
+                            if fingerprint not in self._seen_images:
+                                self._seen_images.add(fingerprint)
+                                new_images.append(image_url)
+                        if new_images:
+                            self.images_queued += len(new_images)
+                            self._downloads.put((url, new_images, candidates))
+
+                        added = 0
+                        if depth < self.max_depth:
+                            for link in links:
+                                if self._is_page_link(link, url) and self.frontier.add(link, depth + 1):
+                                    added += 1
+                        self.log(f"Scanned {url} (depth {depth}): {len(new_images)} new images, {added} new pages", "info")
+        finally:
+            self._downloads.put(None)
+            download_thread.join()
+            for scraper in self._scrapers:
+                scraper.close()  # Leaves the shared browser pool to the owns_pool check below
+            self.downloader.close()
+            if owns_pool:
+                self.browser_pool.close()
+                self.browser_pool = None
+            self.is_running = False
+
+        summary = {
+            'pages_scanned': self.pages_scanned,
+            'pages_discovered': self.frontier.seen_count,
+            'images_queued': self.images_queued,
+        }
+        self.log(f"Crawl complete: {self.pages_scanned} pages scanned, {self.images_queued} images queued", "success")
+        return summary
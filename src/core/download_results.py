@@ -0,0 +1,8 @@
+class SkipReason(str):
+    """Result message of an image left out on purpose (size, type, dimension or robots.txt filter).
+
+    It reads as a plain string in logs, the journal and callbacks; the type
+    alone marks the result as a skip rather than a failure.
+    """
+
+    __slots__ = ()
@@ -0,0 +1,78 @@
+# Collects every image candidate on the page in a single WebDriver round trip.
+# Each candidate carries the URL, where it came from, and the element's
+# position plus rendered and declared size. The current scroll height is
+# returned alongside so scroll loops don't need a second command.
+# arguments[0] turns off the getComputedStyle() walk, which is the slow part
+# on big pages and redundant when backgrounds come from network capture.
+EXTRACT_IMAGES_SCRIPT = r"""
+const includeBackgrounds = arguments[0] !== false;
+const seen = new Set();
+const images = [];
+const IMAGE_EXT = /\.(jpe?g|png|gif|webp|avif|svg|bmp|tiff?)(\?|#|$)/i;
+const CSS_URL = /url\(\s*['"]?([^'")]+)['"]?\s*\)/g;
+
+function add(value, kind, el) {
+    if (!value) return;
+    value = value.trim();
+    if (!value || value.startsWith('data:')) return;
+    let url;
+    try {
+        url = new URL(value, document.baseURI).href;
+    } catch (e) {
+        return;
+    }
+    if (!/^https?:/.test(url) || seen.has(url)) return;
+    seen.add(url);
+    const rect = el.getBoundingClientRect();
+    images.push({
+        url: url,
+        kind: kind,
+        tag: el.tagName.toLowerCase(),
+        x: Math.round(rect.left + window.scrollX),
+        y: Math.round(rect.top + window.scrollY),
+        width: Math.round(rect.width),
+        height: Math.round(rect.height),
+        declaredWidth: el.getAttribute('width'),
+        declaredHeight: el.getAttribute('height'),
+        naturalWidth: el.naturalWidth || null,
+        naturalHeight: el.naturalHeight || null
+    });
+}
+
+function addSrcset(value, kind, el) {
+    if (!value) return;
+    value.split(',').forEach(part => add(part.trim().split(/\s+/)[0], kind, el));
+}
+
+document.querySelectorAll('img, source').forEach(el => {
+    add(el.getAttribute('src'), 'src', el);
+    addSrcset(el.getAttribute('srcset'), 'srcset', el);
+    if (el.currentSrc) add(el.currentSrc, 'src', el);
+});
+
+for (const el of document.querySelectorAll('*')) {
+    for (const attr of el.attributes) {
+        if (attr.name.startsWith('data-') &&
+            (/^data-(lazy-)?src(set)?$|^data-original$/.test(attr.name) || IMAGE_EXT.test(attr.value))) {
+            if (attr.name.endsWith('srcset')) {
+                addSrcset(attr.value, attr.name, el);
+            } else {
+                add(attr.value, attr.name, el);
+            }
+        }
+    }
+    if (!includeBackgrounds) continue;
+    const bg = window.getComputedStyle(el).backgroundImage;
+    if (bg && bg !== 'none') {
+        for (const match of bg.matchAll(CSS_URL)) add(match[1], 'background', el);
+    }
+}
+
+return {images: images, scrollHeight: document.body ? document.body.scrollHeight : 0};
+"""
+
+
+def extract_images(driver, include_backgrounds=True):
+    """Run the extraction script and return (candidates, scroll height)"""
+    result = driver.execute_script(EXTRACT_IMAGES_SCRIPT, include_backgrounds) or {}
+    return result.get('images', []), result.get('scrollHeight', 0)
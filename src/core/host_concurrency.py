@@ -0,0 +1,138 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# Responses that mean "slow down" rather than "this URL is broken"
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+    return max(retry_at - (now if now is not None else time.time()), 0.0)
+
+
+class HostWindow:
+    """Concurrency window and health of one host"""
+
+    def __init__(self, limit):
+        self.limit = float(limit)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.baseline_latency = None
+        self.completed = 0
+        self.throttled = 0
+        self.errors = 0
+
+
+class HostConcurrencyController:
+    """Per-host AIMD concurrency limits for downloads.
+
+    Each host starts with initial parallel requests. Every healthy response
+    grows its window by about one request per window's worth of successes;
+    429/503, connection errors and latency spikes halve it. Retry-After
+    pauses the host entirely. Responses to requests sent before the last
+    decrease don't shrink the window again, so one burst of errors counts once.
+    """
+
+    def __init__(self, initial=4, min_limit=1, max_limit=64, decrease=0.5, latency_factor=3.0,
+                 default_backoff=5.0):
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease = decrease
+        self.latency_factor = latency_factor  # Latency above baseline * factor counts as congestion
+        self.default_backoff = default_backoff  # Pause after 429/503 without a Retry-After
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _window(self, host):
+        window = self._hosts.get(host)
+        if window is None:
+            window = self._hosts[host] = HostWindow(self.initial)
+        return window
+
+    @staticmethod
+    def host_of(url):
+        return urlparse(url).netloc.lower()
+
+    def try_acquire(self, url):
+        """Reserve a slot for url's host; returns a ticket, or None if the host is full or paused"""
+        host = self.host_of(url)
+        now = time.monotonic()
+        with self._lock:
+            window = self._window(host)
+            if now < window.blocked_until or window.in_flight >= int(window.limit):
+                return None
+            window.in_flight += 1
+            return host, now
+
+    def release(self, ticket, outcome='ok', latency=None, retry_after=None):
+        """Return a slot and adjust the host's window.
+
+        outcome is 'ok' for any answer from a healthy server (including 404s),
+        'throttled' for 429/503 and 'error' for resets and timeouts.
+        """
+        host, started = ticket
+        now = time.monotonic()
+        with self._lock:
+            window = self._window(host)
+            window.in_flight -= 1
+
+            if outcome == 'ok' and latency is not None and window.baseline_latency is not None \
+                    and window.completed >= 5 and latency > window.baseline_latency * self.latency_factor:
+                outcome = 'slow'
+
+            if outcome == 'ok':
+                window.completed += 1
+                window.limit = min(window.limit + 1.0 / window.limit, self.max_limit)
+                if latency is not None:
+                    # Slow-moving average so one fast response doesn't redefine normal
+                    if window.baseline_latency is None:
+                        window.baseline_latency = latency
+                    else:
+                        window.baseline_latency += (latency - window.baseline_latency) * 0.1
+                return
+
+            if outcome == 'throttled':
+                window.throttled += 1
+                pause = retry_after if retry_after is not None else self.default_backoff
+                window.blocked_until = max(window.blocked_until, now + pause)
+            elif outcome == 'error':
+                window.errors += 1
+
+            if started >= window.last_decrease:
+                window.limit = max(window.limit * self.decrease, self.min_limit)
+                window.last_decrease = now
+
+    def next_ready(self):
+        """Seconds until the earliest paused host may send again (0 if none is paused)"""
+        now = time.monotonic()
+        with self._lock:
+            waits = [window.blocked_until - now for window in self._hosts.values() if window.blocked_until > now]
+        return min(waits) if waits else 0.0
+
+    def stats(self):
+        """{host: {limit, in_flight, completed, throttled, errors, baseline_ms}}"""
+        with self._lock:
+            return {
+                host: {
+                    'limit': int(window.limit),
+                    'in_flight': window.in_flight,
+                    'completed': window.completed,
+                    'throttled': window.throttled,
+                    'errors': window.errors,
+                    'baseline_ms': round(window.baseline_latency * 1000, 1) if window.baseline_latency else None,
+                }
+                for host, window in self._hosts.items()
+            }
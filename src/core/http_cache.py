@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import threading
+import time
+from .url_utils import normalize_url
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    sha256 TEXT,
+    content_type TEXT,
+    path TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    stored REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_used ON responses (used);
+"""
+
+
+class ResponseCache:
+    """Persistent validators of downloaded images for conditional re-downloads.
+
+    For each normalized URL it keeps the ETag and Last-Modified of the
+    response, the content hash, the image type as downloaded (a transcoded
+    WebP is saved under another extension) and where the file was saved. A later run
+    sends them as If-None-Match / If-Modified-Since and reuses the saved file
+    on 304. Entries are evicted least recently used once there are more than
+    max_entries or their files add up to more than max_bytes, and dropped
+    after max_age seconds without use. Only metadata is evicted, never files.
+    """
+
+    def __init__(self, path, max_entries=200000, max_bytes=None, max_age=30 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.revalidated = 0  # 304s answered from the cache since this object was created
+        self.bytes_reused = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(responses)')]
+        if 'content_type' not in columns:
+            # Caches written before the type was kept
+            self._conn.execute('ALTER TABLE responses ADD COLUMN content_type TEXT')
+        self._lock = threading.Lock()
+        self.evict()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def lookup(self, url, save_location=None):
+        """{etag, last_modified, sha256, content_type, path, bytes} for url, or None.
+
+        Entries whose file is gone, that are past max_age, or (with
+        save_location) whose file lives in another folder don't count.
+        """
+        key = normalize_url(url)
+        row = self._execute('SELECT etag, last_modified, sha256, content_type, path, bytes, used FROM responses WHERE url = ?',
+                            (key,)).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, sha256, content_type, path, size, used = row
+        if time.time() - used > self.max_age or not os.path.isfile(path):
+            self._execute('DELETE FROM responses WHERE url = ?', (key,))
+            return None
+        if save_location is not None and \
+                os.path.dirname(os.path.abspath(path)) != os.path.abspath(save_location):
+            return None
+        return {'etag': etag, 'last_modified': last_modified, 'sha256': sha256, 'content_type': content_type,
+                'path': path, 'bytes': size}
+
+    @staticmethod
+    def conditional_headers(entry):
+        """If-None-Match / If-Modified-Since headers revalidating entry"""
+        headers = {}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def hit(self, url, entry):
+        """Count a 304 for url and mark its entry recently used"""
+        self._execute('UPDATE responses SET used = ? WHERE url = ?', (time.time(), normalize_url(url)))
+        with self._lock:
+            self.revalidated += 1
+            self.bytes_reused += entry['bytes']
+
+    def store(self, url, headers, path, sha256=None, content_type=None):
+        """Remember the validators of a fresh download; responses without any are not cached.
+
+        content_type is the type the image was downloaded as, which a 304
+        is filtered by instead of the saved file's extension.
+        """
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        now = time.time()
+        self._execute('INSERT OR REPLACE INTO responses '
+                      '(url, etag, last_modified, sha256, content_type, path, bytes, stored, used) '
+                      'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                      (normalize_url(url), etag, last_modified, sha256, content_type, os.path.abspath(path),
+                       os.path.getsize(path), now, now))
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones beyond the size limits"""
+        with self._lock:
+            self._conn.execute('DELETE FROM responses WHERE used < ?', (time.time() - self.max_age,))
+            count, total = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM responses').fetchone()
+            excess = count - self.max_entries if self.max_entries else 0
+            if excess > 0:
+                self._conn.execute('DELETE FROM responses WHERE url IN '
+                                   '(SELECT url FROM responses ORDER BY used LIMIT ?)', (excess,))
+                total = self._conn.execute('SELECT COALESCE(SUM(bytes), 0) FROM responses').fetchone()[0]
+            if self.max_bytes and total > self.max_bytes:
+                # Walk from the oldest until enough bytes are dropped
+                cutoff, dropped = None, 0
+                for used, size in self._conn.execute('SELECT used, bytes FROM responses ORDER BY used'):
+                    dropped += size
+                    cutoff = used
+                    if total - dropped <= self.max_bytes:
+                        break
+                if cutoff is not None:
+                    self._conn.execute('DELETE FROM responses WHERE used <= ?', (cutoff,))
+
+    def stats(self):
+        """{entries, revalidated, bytes_reused}"""
+        entries = self._execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        with self._lock:
+            return {'entries': entries, 'revalidated': self.revalidated, 'bytes_reused': self.bytes_reused}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
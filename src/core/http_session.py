@@ -0,0 +1,144 @@
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Custom headers to avoid blocks when fetching images
+DOWNLOAD_HEADERS = {
+    'User-Agent': DEFAULT_USER_AGENT,
+    'Accept': 'image/webp,image/*,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Pragma': 'no-cache',
+    'Cache-Control': 'no-cache',
+}
+
+
+def create_session(pool_size=10, user_agent=DEFAULT_USER_AGENT):
+    """Create a requests session with a connection pool sized for pool_size workers"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        pool_block=False
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'User-Agent': user_agent})
+    return session
+
+
+class HostConnectionStats:
+    """Thread-safe per-host counters for requests, new connections and handshake time"""
+
+    def __init__(self):
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host):
+        return self._hosts.setdefault(host, {'requests': 0, 'connections': 0, 'handshake_seconds': 0.0})
+
+    def record_request(self, host):
+        with self._lock:
+            self._host(host)['requests'] += 1
+
+    def record_connection(self, host, seconds):
+        """Count a newly opened connection and its TCP (and TLS) setup time"""
+        with self._lock:
+            stats = self._host(host)
+            stats['connections'] += 1
+            stats['handshake_seconds'] += seconds
+
+    def summary(self):
+        """{host: {requests, connections, reuse_ratio, handshake_ms}} where reuse_ratio is the share of
+        requests that ran on an already open connection"""
+        with self._lock:
+            summary = {}
+            for host, stats in self._hosts.items():
+                requests_made = stats['requests']
+                reused = max(requests_made - stats['connections'], 0)
+                summary[host] = {
+                    'requests': requests_made,
+                    'connections': stats['connections'],
+                    'reuse_ratio': round(reused / requests_made, 3) if requests_made else 0.0,
+                    'handshake_ms': round(stats['handshake_seconds'] * 1000, 1),
+                }
+            return summary
+
+
+def _timed_pool_classes(host, stats):
+    """urllib3 pool classes whose connections report their setup time to stats"""
+    def timed(connection_cls):
+        class TimedConnection(connection_cls):
+            def connect(self):
+                start = time.perf_counter()
+                super().connect()
+                stats.record_connection(host, time.perf_counter() - start)
+        return TimedConnection
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = timed(HTTPConnection)
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = timed(HTTPSConnection)
+
+    return {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+
+class StatsAdapter(HTTPAdapter):
+    """HTTPAdapter that records requests and new connections for one host"""
+
+    def __init__(self, host, stats, **kwargs):
+        self.host = host
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = _timed_pool_classes(self.host, self.stats)
+
+    def send(self, request, *args, **kwargs):
+        self.stats.record_request(self.host)
+        return super().send(request, *args, **kwargs)
+
+
+class HostSessionPool:
+    """One pooled requests session per host for the lifetime of a download run.
+
+    Each host gets its own keep-alive pool sized to the number of workers, so
+    a busy CDN can't evict another host's warm connections.
+    """
+
+    def __init__(self, pool_size=10, headers=None):
+        self.pool_size = pool_size
+        self.headers = headers or DOWNLOAD_HEADERS
+        self.stats = HostConnectionStats()
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """Session for url's host, created on first use"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = StatsAdapter(host, self.stats, pool_connections=1, pool_maxsize=self.pool_size,
+                                       pool_block=False)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update(self.headers)
+                self._sessions[host] = session
+            return session
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
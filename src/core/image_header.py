@@ -0,0 +1,109 @@
+import struct
+from .download_results import SkipReason
+
+# Leading bytes searched for the pixel size; JPEGs with large EXIF blocks put it further in
+HEADER_BYTES = 65536
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, ...) carrying the frame size
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _jpeg_dimensions(data):
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # Fill byte
+            i += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:  # No length field
+            i += 2
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return width, height
+        i += 2 + struct.unpack('>H', data[i + 2:i + 4])[0]
+    return None
+
+
+def image_dimensions(data):
+    """(width, height) from the leading bytes of a raster image, or None if not (yet) known"""
+    if data.startswith(b'\xff\xd8'):
+        return _jpeg_dimensions(data)
+    if data.startswith(b'\x89PNG\r\n\x1a\n') and len(data) >= 24:
+        return struct.unpack('>II', data[16:24])
+    if data[:6] in (b'GIF87a', b'GIF89a') and len(data) >= 10:
+        return struct.unpack('<HH', data[6:10])
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP' and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', data[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            b0, b1, b2, b3 = data[21:25]
+            return 1 + (b0 | (b1 & 0x3F) << 8), 1 + (b1 >> 6 | b2 << 2 | (b3 & 0x0F) << 10)
+        if chunk == b'VP8X':
+            return 1 + int.from_bytes(data[24:27], 'little'), 1 + int.from_bytes(data[27:30], 'little')
+        return None
+    if data[:2] == b'BM' and len(data) >= 26:
+        width, height = struct.unpack('<ii', data[18:26])
+        return width, abs(height)
+    if data[4:8] == b'ftyp':
+        # AVIF/HEIF keep the size in the image spatial extents property
+        pos = data.find(b'ispe')
+        if pos != -1 and len(data) >= pos + 16:
+            return struct.unpack('>II', data[pos + 8:pos + 16])
+    return None
+
+
+def peek_dimensions(chunks, limit=HEADER_BYTES):
+    """Read chunks until the image size is known or limit bytes are in.
+
+    Returns ((width, height) or None, chunks) where the returned chunks still
+    yield the whole body, starting with the bytes already read.
+    """
+    chunks = iter(chunks)
+    head = b''
+    dimensions = None
+    for chunk in chunks:
+        head += chunk
+        dimensions = image_dimensions(head)
+        if dimensions or len(head) >= limit:
+            break
+
+    def body():
+        if head:
+            yield head
+        for chunk in chunks:
+            if chunk:
+                yield chunk
+
+    return dimensions, body()
+
+
+class DimensionFilter:
+    """Pixel width, height and aspect-ratio (width / height) limits; None means unlimited"""
+
+    def __init__(self, min_width=0, min_height=0, max_width=None, max_height=None, min_aspect=None,
+                 max_aspect=None):
+        self.min_width = min_width
+        self.min_height = min_height
+        self.max_width = max_width
+        self.max_height = max_height
+        self.min_aspect = min_aspect
+        self.max_aspect = max_aspect
+
+    def check(self, dimensions):
+        """Reason to skip an image of dimensions, or None (also for an unknown size)"""
+        if not dimensions:
+            return None
+        width, height = dimensions
+        aspect = width / height if height else 0
+        if width < self.min_width or height < self.min_height \
+                or (self.max_width is not None and width > self.max_width) \
+                or (self.max_height is not None and height > self.max_height) \
+                or (self.min_aspect is not None and aspect < self.min_aspect) \
+                or (self.max_aspect is not None and aspect > self.max_aspect):
+            return SkipReason(f"Dimension filter ({width}x{height})")
+        return None
@@ -1,30 +1,129 @@
 import os
+import queue
 import requests
 import hashlib
 import random
+import threading
 import time
-from PIL import Image
+from collections import OrderedDict, deque
 from io import BytesIO
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import concurrent.futures
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
-from selenium.webdriver.chrome.service import Service
+from .async_download import run_async_downloads
+from .browser_pool import BrowserPool, default_chrome_options
+from .cancellation import CancelToken
+from .content_store import ContentStore, content_hash
+from .download_results import SkipReason
+from .near_duplicates import find_near_duplicates
+from .content_sniffing import (MIME_EXTENSIONS, SNIFF_BYTES, allowed_mime_types, header_image_type, sniff_image_type,
+                               sniff_response)
+from .extraction import extract_images
+from .http_cache import ResponseCache
+from .image_header import peek_dimensions
+from .host_concurrency import THROTTLE_STATUSES, HostConcurrencyController, parse_retry_after
+from .http_session import DOWNLOAD_HEADERS, HostConnectionStats, HostSessionPool, create_session
+from .network_capture import drain_performance_log, parse_network_log
+from .page_settle import PageSettleDetector
+from .resource_blocking import ResourceBlocker
+from .resumable import PART_SUFFIX, SizeLimitExceeded, download_to_part, part_path, remove_part
+from .run_journal import RunJournal
+from .static_scanner import scan_static
+from .task_window import run_windowed
+from .transcoding import TranscodeStage, when_done
+
+# Scan modes: "auto" tries plain HTTP first and falls back to Chrome when the
+# page needs JavaScript, "static" never starts a browser, "browser" always does
+SCAN_MODES = ('auto', 'static', 'browser')
+
+# Download engines: "threads" runs download_image on a small thread pool,
+# "asyncio" drives hundreds of concurrent fetches from one event loop
+DOWNLOAD_ENGINES = ('threads', 'asyncio')
 
 class ImageScraper:
-    def __init__(self, log_callback=None, progress_callback=None):
+    def __init__(self, log_callback=None, progress_callback=None, scan_mode='auto',
+                 browser_pool=None, pool_size=1, max_pages_per_browser=50, max_browser_memory_growth_mb=256,
+                 scan_time_budget=30, capture_network=False, block_resources=False, block_allowlist=None,
+                 adaptive_concurrency=False, politeness=None, journal=None,
+                 near_duplicate_distance=None, http_cache=None, dimension_filter=None, transcoder=None,
+                 transcode_policy=None):
+        if scan_mode not in SCAN_MODES:
+            raise ValueError(f"Invalid scan mode: {scan_mode}")
         self.log_callback = log_callback if log_callback else print
         self.progress_callback = progress_callback
-        self.is_downloading = False
+        self.scan_mode = scan_mode
+        # Stops the current run's streams, retries and scroll loop; a new one is made for every run
+        self.cancel_token = CancelToken()
+        self._downloading = False
         self.driver = None
+        self.session = None  # Pooled HTTP session for browserless scans
+        # Warm Chrome instances; pass a shared BrowserPool to run scans from several scrapers concurrently
+        self._owns_browser_pool = browser_pool is None  # A pool passed in is shared with other scanners
+        self.browser_pool = browser_pool
+        self.pool_size = pool_size
+        self.max_pages_per_browser = max_pages_per_browser
+        self.max_browser_memory_growth_mb = max_browser_memory_growth_mb
+        self._pool_lock = threading.Lock()
+        self.scan_time_budget = scan_time_budget  # Seconds a browser scan may spend waiting and scrolling
+        # Record every image/* response from the DevTools network log and merge it with the DOM results
+        self.capture_network = capture_network
+        # Block fonts, media, trackers and image bytes while scanning; allowlisted hosts load normally
+        self.resource_blocker = ResourceBlocker(allowlist=block_allowlist) if block_resources else None
+        self.scan_stats = {}  # Blocked requests and bytes transferred during the last browser scan (not bytes avoided)
+        self.blocked_image_urls = set()  # Image URLs recorded during the scan without fetching their bytes
         self.image_urls = []  # Store image URLs
+        self.image_candidates = {}  # Element details per URL from the last browser scan
+        self.page_links = []  # Links found on the last scanned page
         self.filtered_urls = []  # Store filtered URLs
+        self.download_sessions = None  # Per-host keep-alive sessions for the current download run
+        self.download_stats = {}  # Per-host connection reuse from the last download run
+        self.content_store = None  # Hash-named storage of the current save location
+        self.dedupe_stats = {}  # Duplicates and bytes saved in the last download run
+        # After a run, keep only the largest of images whose perceptual hashes are within this many bits (needs numpy)
+        self.near_duplicate_distance = near_duplicate_distance
+        # Grow or shrink parallel downloads per host from its responses instead of using a fixed worker count
+        self.host_limits = HostConcurrencyController() if adaptive_concurrency else None
+        # Shared PolitenessPolicy pacing page scans and downloads per host (rate limits and robots.txt)
+        self.politeness = politeness
+        # RunJournal (or a path to one) recording every download run so interrupted runs can be resumed
+        self._owns_journal = isinstance(journal, str)
+        self.journal = RunJournal(journal) if self._owns_journal else journal
+        self.run_id = None  # ID of the last journaled run
+        # Process pool that re-encodes formats such as WebP from memory, so download threads only fetch.
+        # transcode_policy maps formats to 'passthrough', 'fast' or 'archival' (see core.transcoding)
+        self._owns_transcoder = transcoder is None
+        self.transcoder = TranscodeStage(policy=transcode_policy) if transcoder is None else transcoder
+        self.transcode_stats = {}  # Queue depth and encode time per format, kept across runs
+        # DimensionFilter checked against the image header before the rest of the body is fetched
+        self.dimension_filter = dimension_filter
+        # ResponseCache (or a path to one) so repeat runs revalidate saved images instead of fetching them again
+        self._owns_http_cache = isinstance(http_cache, str)
+        self.http_cache = ResponseCache(http_cache) if self._owns_http_cache else http_cache
+        self._journal_run = None  # Run being journaled right now
+        # Called with each newly discovered image URL during a scan; scan_and_download uses it to start downloads early
+        self.candidate_sink = None
+        self.scan_error = None  # Why the last scan failed, or None if it ran (even if it found nothing)
+        # Called with (url, success, path or reason) as each image of a download run finishes
+        self.result_callback = None
+        self.run_summary = {}  # Image counts of the last download run
         self._last_scanned_url = None
         
+    @property
+    def is_downloading(self):
+        """True while a run is going; setting it to False cancels the run's downloads in flight"""
+        return self._downloading
+        
+    @is_downloading.setter
+    def is_downloading(self, value):
+        if value and not self._downloading:
+            self.cancel_token = CancelToken()
+        elif not value:
+            self.cancel_token.cancel()
+        self._downloading = value
+        
     def log(self, message, level="info"):
         """Log a message using the callback if available"""
         if self.log_callback:
@@ -54,6 +153,44 @@ class ImageScraper:
         except Exception as e:
             raise ValueError(f"Invalid URL: {str(e)}")
             
+    def get_session(self):
+        """Return the shared HTTP session, creating it on first use"""
+        if self.session is None:
+            self.session = create_session()
+        return self.session
+        
+    def get_browser_pool(self):
+        """Return the browser pool, creating it on first use"""
+        with self._pool_lock:
+            if self.browser_pool is None:
+                self.browser_pool = BrowserPool(
+                    size=self.pool_size,
+                    max_pages=self.max_pages_per_browser,
+                    max_memory_growth_mb=self.max_browser_memory_growth_mb,
+                    options=default_chrome_options(performance_logging=self._uses_network_log())
+                )
+            return self.browser_pool
+        
+    def _uses_network_log(self):
+        return self.capture_network or self.resource_blocker is not None
+        
+    def close(self):
+        """Release the HTTP session and quit pooled browsers, leaving shared resources passed in open"""
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+        if self.browser_pool is not None and self._owns_browser_pool:
+            self.browser_pool.close()
+            self.browser_pool = None
+        if self.journal is not None and self._owns_journal:
+            self.journal.close()
+            self.journal = None
+        if self.http_cache is not None and self._owns_http_cache:
+            self.http_cache.close()
+            self.http_cache = None
+        if self._owns_transcoder:
+            self.transcoder.close()
+            
     def scan_webpage(self, url):
         """Scan webpage for images"""
         if not url:
@@ -63,25 +200,85 @@ class ImageScraper:
         if not url.startswith(('http://', 'https://')):
             url = 'https://' + url
             
-        self.log("Starting browser...", "info")
+        self.image_candidates = {}
+        self.page_links = []
+        self.scan_error = None
+        if not self.is_downloading:
+            # A scan on its own; inside a run it stops with the run's token
+            self.cancel_token = CancelToken()
+        if self.politeness is not None:
+            if not self.politeness.allowed(url):
+                self.image_urls = []
+                self.log("Page is disallowed by robots.txt", "warning")
+                return 0
+            self.politeness.wait(url)
+        if self.scan_mode != 'browser':
+            image_urls = self._scan_static(url)
+            if image_urls is not None:
+                return self._store_scan_results(image_urls)
+                
+        return self._scan_with_browser(url)
         
-        # Configure Chrome options for better compatibility
-        chrome_options = Options()
-        chrome_options.add_argument('--headless=new')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+    def _store_scan_results(self, image_urls):
+        """Store scanned URLs and report how many were found"""
+        self.image_urls = list(image_urls)
+        total_images = len(self.image_urls)
+        
+        if total_images > 0:
+            self.log(f"Successfully found {total_images} total images", "success")
+        else:
+            self.log("No images found on the webpage", "warning")
+        
+        return total_images
+        
+    def _scan_static(self, url):
+        """Scan server-rendered HTML without a browser; return None when Chrome is needed"""
+        self.log("Fetching page HTML...", "info")
+        try:
+            result = scan_static(self.get_session(), url)
+        except requests.exceptions.RequestException as e:
+            if self.scan_mode == 'static':
+                self.log(f"Error scanning webpage: {str(e)}", "error")
+                self.scan_error = str(e)
+                return []
+            self.log(f"Static fetch failed ({str(e)}), falling back to browser", "info")
+            return None
+        
+        if result.needs_javascript and self.scan_mode == 'auto':
+            self.log(f"Page needs JavaScript ({result.needs_javascript}), falling back to browser", "info")
+            return None
+        
+        self.page_links = result.links
+        self._emit_candidates(result.image_urls)
+        return result.image_urls
+            
+    def _emit_candidates(self, image_urls):
+        """Hand newly discovered image URLs to the candidate sink, if any"""
+        if self.candidate_sink is not None:
+            for image_url in image_urls:
+                self.candidate_sink(image_url)
+            
+    def _scan_with_browser(self, url):
+        """Scan webpage for images with headless Chrome"""
+        pool = self.get_browser_pool()
+        driver = None
+        healthy = True
+        blocking = False
+        self.scan_stats = {}
+        self.blocked_image_urls = set()
         
         try:
-            # Start browser with optimized settings
-            service = Service()
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            driver.set_page_load_timeout(30)
+            # Lease a warm browser; only the first scan pays the startup cost
+            self.log("Starting browser...", "info")
+            driver = pool.acquire()
+            
+            if self._uses_network_log():
+                # Drop events left over from the browser's previous job
+                drain_performance_log(driver)
+            if self.resource_blocker is not None:
+                blocking = self.resource_blocker.apply(driver, url)
+                if not blocking:
+                    self.log("Site is allowlisted, loading all resources", "info")
             
             self.log("Loading webpage...", "info")
             driver.get(url)
@@ -91,229 +288,556 @@ class ImageScraper:
                 EC.presence_of_element_located((By.TAG_NAME, "body"))
             )
             
-            # Additional wait for dynamic content
-            time.sleep(2)
+            # Wait for dynamic content to go quiet rather than for a fixed time
+            settle = PageSettleDetector(driver, page_budget=self.scan_time_budget,
+                                        should_continue=self.cancel_token.active)
+            settle.install()
+            settle.wait()
             
             self.log("Scanning for images...", "info")
             
-            # Collect image URLs with multiple methods
-            image_urls = set()
-            
-            # Method 1: Direct img tags
-            selectors = [
-                'img[src]',
-                'img[data-src]',
-                'img[data-lazy-src]',
-                'source[srcset]',
-                'img[srcset]',
-                'picture source'
-            ]
-            
-            elements = driver.find_elements(By.CSS_SELECTOR, ', '.join(selectors))
-            for element in elements:
-                try:
-                    for attr in ['src', 'data-src', 'data-lazy-src', 'srcset']:
-                        value = element.get_attribute(attr)
-                        if value:
-                            if attr == 'srcset':
-                                # Handle srcset format
-                                urls = [url.strip().split(' ')[0] for url in value.split(',')]
-                                image_urls.update(url for url in urls if url.startswith(('http://', 'https://')))
-                            else:
-                                if value.startswith(('http://', 'https://')):
-                                    image_urls.add(value)
-                except:
-                    continue
+            # Candidate details keyed by URL, in discovery order
+            image_urls = {}
             
-            # Method 2: Background images
-            try:
-                script = """
-                    return Array.from(document.querySelectorAll('*')).map(el => {
-                        const style = window.getComputedStyle(el);
-                        const bg = style.backgroundImage;
-                        if (bg && bg !== 'none') {
-                            const matches = bg.match(/url\\(['"]?([^'"\\)]+)['"]?\\)/g) || [];
-                            return matches.map(m => m.match(/url\\(['"]?([^'"\\)]+)['"]?\\)/)[1]);
-                        }
-                        return [];
-                    }).flat();
-                """
-                bg_images = driver.execute_script(script)
-                image_urls.update(url for url in bg_images if url.startswith(('http://', 'https://')))
-            except:
-                pass
-            
-            # Method 3: Scroll and scan
-            last_height = driver.execute_script("return document.body.scrollHeight")
+            def add_candidates(candidates):
+                new_urls = []
+                for candidate in candidates:
+                    if candidate['url'] not in image_urls:
+                        image_urls[candidate['url']] = candidate
+                        new_urls.append(candidate['url'])
+                self._emit_candidates(new_urls)
+            
+            # Collect candidates (attributes, srcsets, backgrounds, geometry) in one round trip
+            # Network capture already sees background images, so skip the computed-style walk
+            include_backgrounds = not self.capture_network
+            candidates, last_height = extract_images(driver, include_backgrounds)
+            add_candidates(candidates)
+            
+            # Scroll and scan
             scroll_attempts = 0
             max_scrolls = 5
             
-            while scroll_attempts < max_scrolls:
-                # Scroll down
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(1)
+            while scroll_attempts < max_scrolls and not settle.expired() and self.cancel_token.active():
+                # Scroll down and wait for lazy content to settle
+                settle.wait(scroll=True)
                 
-                # Get new images
-                elements = driver.find_elements(By.TAG_NAME, 'img')
-                for element in elements:
-                    try:
-                        for attr in ['src', 'data-src', 'srcset']:
-                            value = element.get_attribute(attr)
-                            if value and value.startswith(('http://', 'https://')):
-                                image_urls.add(value)
-                    except:
-                        continue
+                # Get new images and the new page height
+                candidates, new_height = extract_images(driver, include_backgrounds)
+                add_candidates(candidates)
                 
                 # Check if we've reached the bottom
-                new_height = driver.execute_script("return document.body.scrollHeight")
                 if new_height == last_height:
                     break
                     
                 last_height = new_height
                 scroll_attempts += 1
             
-            # Store results
-            self.image_urls = list(image_urls)
-            total_images = len(self.image_urls)
-            
-            if total_images > 0:
-                self.log(f"Successfully found {total_images} total images", "success")
-            else:
-                self.log("No images found on the webpage", "warning")
+            # Merge images seen on the wire (CSS image-set, pseudo-elements, JS preloads, fetch-to-blob)
+            if self._uses_network_log():
+                network_images, self.scan_stats = parse_network_log(drain_performance_log(driver))
+                self.blocked_image_urls = set(image_url for image_url, record in network_images.items()
+                                              if record.get('blocked'))
+                if blocking:
+                    blocked = ', '.join(f"{count} {category}" for category, count in sorted(self.scan_stats['blocked'].items()))
+                    self.log(f"Blocked {blocked or 'no requests'}; scan transferred "
+                             f"{self.scan_stats['transferred_bytes']/1024:.1f}KB", "info")
+                added = 0
+                for image_url, record in network_images.items():
+                    if image_url in image_urls:
+                        image_urls[image_url].update((key, value) for key, value in record.items() if key != 'kind')
+                    else:
+                        image_urls[image_url] = record
+                        self._emit_candidates([image_url])
+                        added += 1
+                self.log(f"Network capture saw {len(network_images)} image requests ({added} not in the DOM)", "info")
             
-            return total_images
+            # Store results
+            self.page_links = driver.execute_script("return Array.from(document.links, a => a.href)") or []
+            self.image_candidates = image_urls
+            return self._store_scan_results(image_urls)
             
         except Exception as e:
+            healthy = False
             self.log(f"Error scanning webpage: {str(e)}", "error")
+            self.image_urls = []
+            self.scan_error = str(e)
             return 0
         finally:
-            try:
-                driver.quit()
-            except:
-                pass
+            if driver is not None:
+                if blocking:
+                    self.resource_blocker.clear(driver)
+                pool.release(driver, healthy)
+                self._report_pool_stats(pool)
+                
+    def _report_pool_stats(self, pool):
+        """Log how long scans waited for a pooled browser and how often browsers were replaced"""
+        stats = pool.stats()
+        self.log(f"Browser pool: {stats['acquired']} scans, {stats['created']} browsers started, "
+                 f"{stats['recycled']} recycled; waited {stats['acquire_wait_avg']*1000:.0f}ms on average "
+                 f"(max {stats['acquire_wait_max']*1000:.0f}ms) for a browser", "debug")
                 
-    def convert_webp_to_png(self, webp_path):
-        """Convert WebP image to PNG format"""
+    def download_image(self, img_url, save_location, min_size=0, max_size=float('inf'), allowed_types=None):
+        """Download a single image with optimized handling.
+        
+        Returns (success, path or reason), or a Future of it for an image
+        still on the transcode stage (see _record_outcome).
+        """
+        outcome, _ = self._fetch_image(img_url, save_location, min_size, max_size, allowed_types)
+        return outcome
+        
+    def _fetch_image(self, img_url, save_location, min_size=0, max_size=float('inf'), allowed_types=None):
+        """(download_image's outcome, feedback for the host scheduler: {'outcome', 'latency', 'retry_after'})"""
+        feedback = {'outcome': 'ok', 'latency': None, 'retry_after': None}
+        token = self.cancel_token
+        self._journal_started(img_url)
         try:
-            from PIL import Image
-            import io
-            
-            # Read WebP file
-            with Image.open(webp_path) as img:
-                # Create PNG path
-                png_path = os.path.splitext(webp_path)[0] + '.png'
+            # Get image with stream enabled, reusing the run's connection to this host when there is one
+            http = self.download_sessions.get(img_url) if self.download_sessions is not None else requests
+            cached = self.http_cache.lookup(img_url, save_location) if self.http_cache is not None else None
+            if token.cancelled:
+                return (False, "Cancelled"), feedback
+            started = time.monotonic()
+            response = http.get(img_url, headers=dict(DOWNLOAD_HEADERS, **ResponseCache.conditional_headers(cached)),
+                                stream=True, timeout=10)
+            feedback['latency'] = time.monotonic() - started
+            # Cancelling the run closes this response's socket, so no read below outlives a stop
+            with token.watch(response):
+                if response.status_code == 304 and cached:
+                    response.close()
+                    return self._reuse_cached(img_url, cached, min_size, max_size, allowed_types), feedback
+                if response.status_code in THROTTLE_STATUSES:
+                    feedback['outcome'] = 'throttled'
+                    feedback['retry_after'] = parse_retry_after(response.headers.get('Retry-After'))
+                if response.status_code >= 400:
+                    response.close()
+                response.raise_for_status()
                 
-                # Convert to RGB if necessary (for transparency)
-                if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
-                    img = img.convert('RGBA')
-                else:
-                    img = img.convert('RGB')
+                # Skip if size filters don't match
+                error = self._check_length(response.headers.get('Content-Length'), min_size, max_size)
+                if error:
+                    response.close()
+                    return (False, error), feedback
+                
+                # Decide the type from this response's own bytes rather than a separate HEAD
+                mime_type, chunks = sniff_response(response)
                 
-                # Save as PNG
-                img.save(png_path, 'PNG')
+                # Skip if not an image, dropping the connection instead of reading the rest
+                error = self._check_type(mime_type, allowed_types)
+                if error:
+                    response.close()
+                    return (False, error), feedback
                 
-                # Remove original WebP file
-                os.remove(webp_path)
+                # Skip images outside the pixel limits as soon as their header is in
+                if self.dimension_filter is not None:
+                    dimensions, chunks = peek_dimensions(chunks)
+                    error = self.dimension_filter.check(dimensions)
+                    if error:
+                        response.close()
+                        return (False, error), feedback
+                
+                # Download to a .part file, resuming dropped connections and hashing as it goes.
+                # Bodies below min_size stay in memory and ones past max_size are cut off mid-stream
+                # Formats that get converted are kept in memory for the transcode stage instead
+                part = part_path(self._image_path(img_url, mime_type, save_location))
+                target = BytesIO() if self.transcoder.handles(mime_type) else part
+                try:
+                    downloaded = download_to_part(http, img_url, response, chunks, target, DOWNLOAD_HEADERS,
+                                                  timeout=10, hash_content=True, min_bytes=min_size,
+                                                  max_bytes=None if max_size == float('inf') else max_size,
+                                                  cancel_token=token)
+                except Exception:
+                    remove_part(part)
+                    raise
+                if downloaded is None:
+                    remove_part(part)
+                    return (False, "Cancelled"), feedback
+                _, sha256 = downloaded
                 
-                return png_path
+                if target is not part:
+                    # The worker moves on while the image is converted; the file is saved when it's done
+                    return self._finish_transcode(target.getvalue(), sha256, img_url, mime_type, save_location,
+                                                  min_size, max_size, response.headers), feedback
+                success, result = self._finish_download(part, sha256, img_url, save_location, min_size, max_size)
+                if success and self.http_cache is not None:
+                    self.http_cache.store(img_url, response.headers, result, sha256, mime_type)
+                return (success, result), feedback
+            
+        except SizeLimitExceeded as e:
+            return (False, SkipReason(str(e))), feedback
         except Exception as e:
-            self.log(f"Error converting WebP to PNG: {str(e)}", "error")
-            return webp_path
-
-    def download_image(self, img_url, save_location, min_size=0, max_size=float('inf')):
-        """Download a single image with optimized handling"""
-        try:
-            # Custom headers to avoid blocks
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'image/webp,image/*,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Pragma': 'no-cache',
-                'Cache-Control': 'no-cache',
-            }
-            
-            # Get image with stream enabled
-            response = requests.get(img_url, headers=headers, stream=True, timeout=10)
-            response.raise_for_status()
-            
-            # Check content type and size
-            content_type = response.headers.get('Content-Type', '').lower()
-            content_length = int(response.headers.get('Content-Length', 0))
-            
-            # Skip if not an image
-            if not content_type.startswith('image/'):
-                return False, "Not an image"
-            
-            # Skip if size filters don't match
-            if content_length:
-                if content_length < min_size:
-                    return False, f"Too small ({content_length/1024:.1f}KB)"
-                if content_length > max_size:
-                    return False, f"Too large ({content_length/1024:.1f}KB)"
-            
-            # Determine file extension
-            ext = None
-            is_webp = False
-            # First try content type
-            if 'image/jpeg' in content_type or 'image/jpg' in content_type:
-                ext = '.jpg'
-            elif 'image/png' in content_type:
-                ext = '.png'
-            elif 'image/webp' in content_type:
-                ext = '.png'  # We'll convert WebP to PNG
-                is_webp = True
-            elif 'image/svg+xml' in content_type:
-                ext = '.svg'
-            
-            # If no extension from content type, try URL
-            if not ext:
-                url_path = urlparse(img_url).path.lower()
-                if url_path.endswith('.webp'):
-                    ext = '.png'  # Convert WebP to PNG
-                    is_webp = True
-                elif url_path.endswith(('.jpg', '.jpeg', '.png', '.svg')):
-                    ext = os.path.splitext(url_path)[1]
-                else:
-                    ext = '.jpg'  # Default to jpg
-            
-            # Generate unique filename
-            timestamp = int(time.time() * 1000)
-            random_num = random.randint(1000, 9999)
-            filename = f"image_{timestamp}_{random_num}{'.webp' if is_webp else ext}"
-            filepath = os.path.join(save_location, filename)
-            
-            # Download and save
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            
-            # Convert WebP to PNG if needed
-            if is_webp:
-                filepath = self.convert_webp_to_png(filepath)
-            
-            # Verify file size after download
-            actual_size = os.path.getsize(filepath)
-            if min_size <= actual_size <= max_size:
-                self.log(f"Downloaded: {os.path.basename(filepath)} ({actual_size/1024:.1f}KB)", "success")
-                return True, filepath
-            else:
-                os.remove(filepath)
-                return False, f"Size filter after download ({actual_size/1024:.1f}KB)"
+            if token.cancelled:
+                # Whatever the aborted read raised, the image is just left for the next run
+                return (False, "Cancelled"), feedback
+            if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                              requests.exceptions.ChunkedEncodingError)):
+                # Resets and timeouts say the host is struggling, not that the URL is bad
+                feedback['outcome'] = 'error'
+                return (False, f"Download error: {str(e)}"), feedback
+            if isinstance(e, requests.exceptions.RequestException):
+                return (False, f"Download error: {str(e)}"), feedback
+            return (False, f"Error: {str(e)}"), feedback
             
-        except requests.exceptions.RequestException as e:
-            return False, f"Download error: {str(e)}"
+    def _journal_started(self, img_url):
+        """Mark img_url in flight in the journaled run, if any"""
+        if self._journal_run is not None:
+            self.journal.mark_in_flight(self._journal_run, img_url)
+            
+    def _journal_result(self, img_url, success, result, skipped):
+        """Record a finished download in the journaled run, if any"""
+        run_id = self._journal_run
+        if run_id is None:
+            return
+        if success:
+            self.journal.mark_done(run_id, img_url, result, content_hash(result))
+        elif result == "Cancelled":
+            self.journal.mark_pending(run_id, img_url)
+        elif skipped:
+            self.journal.mark_skipped(run_id, img_url, result)
+        else:
+            self.journal.mark_failed(run_id, img_url, result)
+            
+    def _is_skip(self, result):
+        """True if a download result is a filter decision rather than a failure"""
+        return isinstance(result, SkipReason)
+        
+    def _check_length(self, content_length, min_size, max_size):
+        """Reason to skip based on the Content-Length header, or None"""
+        content_length = int(content_length) if content_length and content_length.isdigit() else 0
+        if content_length:
+            if content_length < min_size:
+                return SkipReason(f"Too small ({content_length/1024:.1f}KB)")
+            if content_length > max_size:
+                return SkipReason(f"Too large ({content_length/1024:.1f}KB)")
+        return None
+        
+    def _check_type(self, mime_type, allowed_types):
+        """Reason to skip based on the sniffed type, or None"""
+        if not mime_type:
+            return "Not an image"
+        if allowed_types and mime_type not in allowed_mime_types(allowed_types):
+            return SkipReason(f"Type filter ({mime_type})")
+        return None
+        
+    def _reuse_cached(self, img_url, cached, min_size, max_size, allowed_types):
+        """(success, path or reason) for an image the server says is unchanged since it was saved"""
+        mime_type = cached['content_type']
+        if mime_type is None:
+            # Cached before types were kept: the saved bytes are the best evidence left
+            try:
+                with open(cached['path'], 'rb') as f:
+                    mime_type = sniff_image_type(f.read(SNIFF_BYTES))
+            except OSError:
+                mime_type = None
+        error = self._check_type(mime_type, allowed_types) if allowed_types else None
+        if error:
+            return False, error
+        if not min_size <= cached['bytes'] <= max_size:
+            return False, SkipReason(f"Size filter after download ({cached['bytes']/1024:.1f}KB)")
+        self.http_cache.hit(img_url, cached)
+        self.log(f"Not modified: {os.path.basename(cached['path'])}", "success")
+        return True, cached['path']
+        
+    def _report_transcode_stats(self):
+        """Keep and log the transcode stage's queue depth and encode times"""
+        self.transcode_stats = self.transcoder.stats()
+        for mime_type, format_stats in sorted(self.transcode_stats['formats'].items()):
+            self.log(f"Transcoded {mime_type}: {format_stats['jobs']} images, "
+                     f"{format_stats['encode_ms_avg']}ms average encode, {format_stats['failures']} failed, "
+                     f"peak queue {self.transcode_stats['peak_queue_depth']}", "debug")
+        
+    def _report_cache_stats(self, before):
+        """Log how many images the response cache revalidated since the before snapshot"""
+        if self.http_cache is None:
+            return
+        self.http_cache.evict()
+        after = self.http_cache.stats()
+        revalidated = after['revalidated'] - before.get('revalidated', 0)
+        if revalidated:
+            reused = after['bytes_reused'] - before.get('bytes_reused', 0)
+            self.log(f"{revalidated} images were unchanged, skipping {reused/1024:.1f}KB of transfer", "info")
+        
+    def _image_path(self, img_url, mime_type, save_location):
+        """Unique temporary file path for a downloaded image of mime_type"""
+        ext = MIME_EXTENSIONS.get(mime_type)
+        if not ext:
+            url_ext = os.path.splitext(urlparse(img_url).path.lower())[1]
+            ext = url_ext if url_ext in ('.jpg', '.jpeg', '.png', '.gif', '.svg', '.avif', '.bmp') else '.jpg'
+        
+        # Generate unique filename
+        timestamp = int(time.time() * 1000)
+        random_num = random.randint(1000, 9999)
+        return os.path.join(save_location, f"image_{timestamp}_{random_num}{ext}")
+        
+    def _content_store(self, save_location):
+        """ContentStore for save_location, reusing the current run's one"""
+        store = self.content_store
+        if store is None or store.root != save_location:
+            store = self.content_store = ContentStore(save_location)
+        return store
+        
+    def _finish_transcode(self, data, sha256, img_url, mime_type, save_location, min_size, max_size, headers=None):
+        """Convert a download held in memory on the transcode stage, then save it like _finish_download.
+        
+        Returns a Future of (success, path or reason) right away; the file is
+        written once the conversion is done, named after the SHA-256 of the
+        converted bytes like every other stored file. sha256 is the hash of
+        data, kept when conversion fails. headers are the response's, for the
+        HTTP cache.
+        """
+        filepath = self._image_path(img_url, mime_type, save_location)
+        
+        def save(job):
+            try:
+                try:
+                    converted, ext = job.result()
+                    path = os.path.splitext(filepath)[0] + ext
+                    stored_sha256 = hashlib.sha256(converted).hexdigest()
+                except Exception as e:
+                    # Keep the original bytes
+                    self.log(f"Error converting {mime_type}: {str(e)}", "error")
+                    converted, path, stored_sha256 = data, filepath, sha256
+                part = part_path(path)
+                with open(part, 'wb') as f:
+                    f.write(converted)
+                success, result = self._finish_download(part, stored_sha256, img_url, save_location,
+                                                        min_size, max_size)
+                if success and headers is not None and self.http_cache is not None:
+                    self.http_cache.store(img_url, headers, result, stored_sha256, mime_type)
+                return success, result
+            except Exception as e:
+                return False, f"Error: {str(e)}"
+        
+        try:
+            job = self.transcoder.submit(data, mime_type)
         except Exception as e:
-            return False, f"Error: {str(e)}"
+            job = concurrent.futures.Future()
+            job.set_exception(e)
+        return when_done(job, save)
+        
+    def _record_outcome(self, img_url, outcome, record, transcoding):
+        """Record a download's (success, result) now, or keep its Future in transcoding until the image is saved"""
+        if isinstance(outcome, concurrent.futures.Future):
+            transcoding[outcome] = img_url
+        else:
+            record(img_url, *outcome)
+        
+    def _record_transcoded(self, transcoding, record, wait=False):
+        """Record the images in transcoding that have been saved; with wait, all of them"""
+        if wait:
+            concurrent.futures.wait(transcoding)
+        for job in [job for job in transcoding if job.done()]:
+            record(transcoding.pop(job), *job.result())
+        
+    def _finish_download(self, part, sha256, img_url, save_location, min_size, max_size):
+        """Apply the size filter to a finished download and store it under sha256.
+        
+        part is the downloaded temp file and sha256 the hash of the bytes
+        fetched; returns (success, path or reason).
+        """
+        ext = os.path.splitext(part[:-len(PART_SUFFIX)])[1]
+        
+        # Verify file size after download
+        actual_size = os.path.getsize(part)
+        if not min_size <= actual_size <= max_size:
+            os.remove(part)
+            return False, SkipReason(f"Size filter after download ({actual_size/1024:.1f}KB)")
+        
+        filepath, duplicate = self._content_store(save_location).store(part, sha256, ext, img_url)
+        if duplicate:
+            self.log(f"Duplicate of {os.path.basename(filepath)}: {img_url}", "info")
+        else:
+            self.log(f"Downloaded: {os.path.basename(filepath)} ({actual_size/1024:.1f}KB)", "success")
+        return True, filepath
+        
+    def remove_near_duplicates(self, paths, store=None):
+        """Delete all but the highest-resolution image of each near-duplicate cluster in paths.
+        
+        Returns the paths that were kept out of those clusters.
+        """
+        try:
+            distance = 6 if self.near_duplicate_distance is None else self.near_duplicate_distance
+            clusters = find_near_duplicates(sorted(set(paths)), distance)
+        except Exception as e:
+            self.log(f"Near-duplicate check failed: {str(e)}", "error")
+            return []
+        for kept, *copies in clusters:
+            for path in copies:
+                size = os.path.getsize(path)
+                os.remove(path)
+                if store is not None:
+                    store.record_near_duplicate(path, kept, size)
+                self.log(f"Near-duplicate of {os.path.basename(kept)}: removed {os.path.basename(path)}", "debug")
+        return [cluster[0] for cluster in clusters]
+        
+    def _report_dedupe_stats(self, store, paths=None):
+        """Run the near-duplicate stage if enabled, then keep and log how much the run deduplicated"""
+        if self.near_duplicate_distance is not None and paths:
+            self.remove_near_duplicates(paths, store)
+        self.dedupe_stats = store.stats()
+        if self.dedupe_stats['near_duplicates']:
+            self.log(f"Removed {self.dedupe_stats['near_duplicates']} near-duplicate images, "
+                     f"saving {self.dedupe_stats['near_duplicate_bytes']/1024:.1f}KB", "info")
+        if self.dedupe_stats['duplicates']:
+            self.log(f"Deduplicated {self.dedupe_stats['duplicates']} images, "
+                     f"saving {self.dedupe_stats['bytes_saved']/1024:.1f}KB", "info")
 
-    def start_download(self, url, save_location, allowed_types=None, min_size=0, max_size=float('inf')):
-        """Start downloading images with parallel processing"""
+    def _download_scheduled(self, urls, save_location, min_size, max_size, allowed_types, workers, record,
+                            max_attempts=3):
+        """Thread-pool downloads dispatched per host.
+        
+        Hosts take turns, and a URL is only started once its host has a free
+        concurrency slot and a politeness token. Throttled URLs retry after
+        the host's pause.
+        """
+        limits = self.host_limits
+        politeness = self.politeness
+        pending = OrderedDict()  # host -> deque of (url, attempt)
+        for img_url in urls:
+            pending.setdefault(urlparse(img_url).netloc.lower(), deque()).append((img_url, 1))
+        if politeness is not None:
+            politeness.prefetch(urls)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = {}
+            transcoding = {}
+            
+            def dispatch(host):
+                """Start the host's next URL; returns seconds to wait if it can't go yet, else None"""
+                host_queue = pending[host]
+                img_url, attempt = host_queue[0]
+                if politeness is not None:
+                    if not politeness.allowed(img_url):
+                        host_queue.popleft()
+                        record(img_url, False, SkipReason("Disallowed by robots.txt"))
+                        return None
+                    delay = politeness.delay(img_url)
+                    if delay > 0:
+                        return delay
+                ticket = None
+                if limits is not None:
+                    ticket = limits.try_acquire(img_url)
+                    if ticket is None:
+                        return limits.next_ready() or 0.25
+                if politeness is not None:
+                    politeness.consume(img_url)
+                host_queue.popleft()
+                future = executor.submit(self._fetch_image, img_url, save_location,
+                                         min_size, max_size, allowed_types)
+                in_flight[future] = (img_url, attempt, ticket)
+                return None
+            
+            while self.is_downloading and (pending or in_flight):
+                # Round-robin: one URL per ready host per pass, until workers are busy or no host is ready
+                wake = 0.25
+                started = True
+                while started and pending and len(in_flight) < workers:
+                    started = False
+                    for host in list(pending):
+                        if len(in_flight) >= workers:
+                            break
+                        delay = dispatch(host)
+                        if delay is None:
+                            started = True
+                        else:
+                            wake = min(wake, delay)
+                        if not pending[host]:
+                            del pending[host]
+                
+                self._record_transcoded(transcoding, record)
+                if not in_flight:
+                    # Every remaining host is paused or out of tokens
+                    if pending:
+                        time.sleep(max(wake, 0.01))
+                    continue
+                
+                done, _ = concurrent.futures.wait(in_flight, timeout=max(wake, 0.01),
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    img_url, attempt, ticket = in_flight.pop(future)
+                    outcome, feedback = future.result()
+                    if ticket is not None:
+                        limits.release(ticket, feedback['outcome'], feedback['latency'], feedback['retry_after'])
+                    if feedback['outcome'] == 'throttled' and limits is not None and attempt < max_attempts:
+                        pending.setdefault(urlparse(img_url).netloc.lower(), deque()).append((img_url, attempt + 1))
+                        continue
+                    self._record_outcome(img_url, outcome, record, transcoding)
+            
+            # Record downloads that were already running when the run was stopped
+            for future, (img_url, attempt, ticket) in in_flight.items():
+                outcome, feedback = future.result()
+                if ticket is not None:
+                    limits.release(ticket, feedback['outcome'], feedback['latency'], feedback['retry_after'])
+                self._record_outcome(img_url, outcome, record, transcoding)
+            self._record_transcoded(transcoding, record, wait=True)
+        self._report_host_limits()
+        
+    def _report_host_limits(self):
+        """Log each host's adaptive concurrency window, if the run used them"""
+        if self.host_limits is not None:
+            for host, host_stats in sorted(self.host_limits.stats().items()):
+                self.log(f"{host}: concurrency window {host_stats['limit']}, {host_stats['throttled']} throttled, "
+                         f"{host_stats['errors']} errors", "debug")
+            
+    def _close_download_sessions(self):
+        if self.download_sessions is not None:
+            self.download_sessions.close()
+            self.download_sessions = None
+            
+    def _report_connection_stats(self, stats):
+        """Keep and log per-host connection reuse for the finished run"""
+        self.download_stats = stats.summary()
+        for host, host_stats in sorted(self.download_stats.items()):
+            self.log(f"{host}: {host_stats['requests']} requests over {host_stats['connections']} connections "
+                     f"({host_stats['reuse_ratio']:.0%} reused, {host_stats['handshake_ms']:.0f}ms connecting)", "debug")
+            
+    def _matches_type(self, img_url, allowed_types):
+        """False only when the URL is already known to be another type; unknown URLs are sniffed on download"""
+        # Check URL extension
+        url_path = urlparse(img_url).path.lower()
+        if any(url_path.endswith(f'.{ext}') for ext in allowed_types):
+            return True
+        known_type = header_image_type(self.image_candidates.get(img_url, {}).get('content_type'))
+        if known_type:
+            # Content type already captured from the network log
+            return known_type in allowed_mime_types(allowed_types)
+        if os.path.splitext(url_path)[1] in MIME_EXTENSIONS.values():
+            # Extension of a type that wasn't selected
+            return False
+        return True
+            
+    def start_download(self, url, save_location, allowed_types=None, min_size=0, max_size=float('inf'),
+                       engine='threads', max_concurrency=None, run_id=None):
+        """Start downloading images with parallel processing.
+        
+        engine picks the download engine from DOWNLOAD_ENGINES; max_concurrency
+        caps parallel fetches (10 threads or 256 asyncio requests by default).
+        With a journal every run is recorded under self.run_id, and passing
+        run_id resumes that run: finished and filtered images are skipped,
+        the rest are retried with the run's original filters.
+        """
+        if engine not in DOWNLOAD_ENGINES:
+            raise ValueError(f"Invalid download engine: {engine}")
+        self.run_summary = {}
         try:
             self.is_downloading = True
             
-            if not self.image_urls:
+            if run_id is not None:
+                if self.journal is None:
+                    self.log("Resuming a run needs a journal", "error")
+                    return
+                run = self.journal.run_info(run_id)
+                if run is None:
+                    self.log(f"Unknown run: {run_id}", "error")
+                    return
+                options = run['options']
+                save_location = save_location or run['save_location']
+                allowed_types = allowed_types or options.get('allowed_types')
+                min_size = min_size or options.get('min_size') or 0
+                if max_size == float('inf') and options.get('max_size') is not None:
+                    max_size = options['max_size']
+                self.filtered_urls = self.journal.resumable_urls(run_id)
+                self.log(f"Resuming run {run_id}: {len(self.filtered_urls)} images left", "info")
+            elif not self.image_urls:
                 self.log("No images found. Please scan the webpage first.", "error")
                 return
             
@@ -323,66 +847,270 @@ class ImageScraper:
             # Filter URLs by file type
             if allowed_types:
                 allowed_types = set(ext.lower().strip('.') for ext in allowed_types)
-                self.filtered_urls = []
-                for img_url in self.image_urls:
-                    # Check URL extension
-                    url_path = urlparse(img_url).path.lower()
-                    if any(url_path.endswith(f'.{ext}') for ext in allowed_types):
-                        self.filtered_urls.append(img_url)
-                    else:
-                        # If no extension in URL, try to get content type
-                        try:
-                            response = requests.head(img_url, timeout=5, allow_redirects=True)
-                            content_type = response.headers.get('Content-Type', '').lower()
-                            if any(f'image/{ext}' in content_type for ext in allowed_types):
-                                self.filtered_urls.append(img_url)
-                        except:
-                            continue
-            else:
-                self.filtered_urls = self.image_urls.copy()
+            if run_id is None:
+                if allowed_types:
+                    self.filtered_urls = [img_url for img_url in self.image_urls
+                                          if self._matches_type(img_url, allowed_types)]
+                else:
+                    self.filtered_urls = self.image_urls.copy()
             
             total_images = len(self.filtered_urls)
             if total_images == 0:
-                self.log("No images match the selected file types", "warning")
+                self.run_summary = {'images': 0, 'downloaded': 0, 'failed': 0, 'skipped': 0, 'cancelled': 0}
+                if run_id is not None:
+                    self.log(f"Run {run_id} is already complete", "success")
+                else:
+                    self.log("No images match the selected file types", "warning")
                 return
             
+            if self.journal is not None:
+                if run_id is None:
+                    options = {
+                        'allowed_types': sorted(allowed_types) if allowed_types else None,
+                        'min_size': min_size,
+                        'max_size': None if max_size == float('inf') else max_size,
+                    }
+                    run_id = self.journal.create_run(self.filtered_urls, url, os.path.abspath(save_location), options)
+                    self.log(f"Journaling run {run_id}", "info")
+                self.run_id = self._journal_run = run_id
+            
             self.log(f"Starting download of {total_images} images", "info")
+            store = self.content_store = ContentStore(save_location)
+            cache_before = self.http_cache.stats() if self.http_cache is not None else {}
             
             # Download images in parallel
-            downloaded = failed = skipped = 0
-            with ThreadPoolExecutor(max_workers=min(10, total_images)) as executor:
-                future_to_url = {
-                    executor.submit(
-                        self.download_image, 
-                        url, 
-                        save_location,
-                        min_size,
-                        max_size
-                    ): url for url in self.filtered_urls
-                }
+            counts = {'downloaded': 0, 'failed': 0, 'skipped': 0}
+            # What images blocked during the scan cost to fetch here. Not what blocking saved the scan:
+            # a blocked request never gets a response, so the browser never learns its size
+            blocked_image_bytes_downloaded_later = 0
+            saved_paths = set()
+            
+            def record(img_url, success, result):
+                nonlocal blocked_image_bytes_downloaded_later
+                skipped = self._is_skip(result)
+                self._journal_result(img_url, success, result, skipped)
+                if self.result_callback is not None:
+                    self.result_callback(img_url, success, result)
+                if result == "Cancelled":
+                    # Stopped mid-transfer; neither a failure nor progress
+                    return
+                if success:
+                    counts['downloaded'] += 1
+                    saved_paths.add(result)
+                    if img_url in self.blocked_image_urls:
+                        blocked_image_bytes_downloaded_later += os.path.getsize(result)
+                elif skipped:
+                    counts['skipped'] += 1
+                    self.log(f"Skipped: {result}", "info")
+                else:
+                    counts['failed'] += 1
+                    self.log(f"Failed: {result}", "error")
                 
-                for future in as_completed(future_to_url):
-                    if not self.is_downloading:
-                        break
-                    
-                    success, result = future.result()
-                    if success:
-                        downloaded += 1
-                    elif "Size filter" in str(result):
-                        skipped += 1
-                        self.log(f"Skipped: {result}", "info")
-                    else:
-                        failed += 1
-                        self.log(f"Failed: {result}", "error")
-                    
-                    # Update progress
-                    progress = ((downloaded + failed + skipped) / total_images) * 100
-                    self.update_progress(progress)
+                # Update progress
+                progress = (sum(counts.values()) / total_images) * 100
+                self.update_progress(progress)
+            
+            if engine == 'asyncio':
+                stats = HostConnectionStats()
+                run_async_downloads(self, self.filtered_urls, save_location, min_size, max_size,
+                                    allowed_types, max_concurrency or 256, record, stats, self.politeness)
+                self._report_connection_stats(stats)
+                self._report_host_limits()
+            elif self.host_limits is not None or self.politeness is not None:
+                workers = min(max_concurrency or (self.host_limits.max_limit if self.host_limits else 10), total_images)
+                self.download_sessions = HostSessionPool(pool_size=workers)
+                self._download_scheduled(self.filtered_urls, save_location, min_size, max_size,
+                                         allowed_types, workers, record)
+                self._report_connection_stats(self.download_sessions.stats)
+            else:
+                workers = min(max_concurrency or 10, total_images)
+                self.download_sessions = HostSessionPool(pool_size=workers)
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    # A sliding window of submissions keeps memory flat for very long URL lists;
+                    # once stopped, queued downloads are dropped and running ones still recorded
+                    fetch = lambda img_url: self.download_image(img_url, save_location, min_size, max_size,
+                                                                allowed_types)
+                    transcoding = {}
+                    for img_url, future in run_windowed(executor, fetch, self.filtered_urls, workers * 2,
+                                                        lambda: self.is_downloading):
+                        self._record_outcome(img_url, future.result(), record, transcoding)
+                        self._record_transcoded(transcoding, record)
+                    self._record_transcoded(transcoding, record, wait=True)
+                self._report_connection_stats(self.download_sessions.stats)
+            
+            downloaded, failed, skipped = counts['downloaded'], counts['failed'], counts['skipped']
+            # Images stopped mid-transfer or never started count as cancelled
+            self.run_summary = dict(counts, images=total_images, cancelled=total_images - sum(counts.values()))
+            self._report_dedupe_stats(store, saved_paths)
+            self._report_cache_stats(cache_before)
+            self._report_transcode_stats()
             
             # Final status
             self.log(f"Download complete: {downloaded} downloaded, {skipped} skipped, {failed} failed", "success")
+            if blocked_image_bytes_downloaded_later:
+                self.log(f"Downloaded {blocked_image_bytes_downloaded_later/1024:.1f}KB of images "
+                         f"the scan blocked", "info")
+            
+        except Exception as e:
+            self.log(f"Error during download: {str(e)}", "error")
+        finally:
+            self._journal_run = None
+            self._close_download_sessions()
+            self.is_downloading = False
+            
+    def scan_and_download(self, url, save_location, allowed_types=None, min_size=0, max_size=float('inf'),
+                          max_workers=10, queue_size=100):
+        """Scan a webpage and download its images as they are discovered.
+        
+        The scan feeds a bounded queue of candidate URLs that download workers
+        drain while the page is still loading and scrolling. When the queue is
+        full the scan waits, so a slow download side can't pile up unbounded
+        work. URLs whose host has no politeness token yet are set aside per
+        host, so one slow host doesn't hold up the others. Returns the number
+        of images downloaded.
+        """
+        candidates = queue.Queue(maxsize=queue_size)
+        done_scanning = object()
+        self.is_downloading = True
+        
+        def sink(image_url):
+            # Block while the downloaders catch up, but give up once the run is stopped
+            while self.is_downloading:
+                try:
+                    candidates.put(image_url, timeout=0.2)
+                    return
+                except queue.Full:
+                    continue
+        
+        def scan():
+            try:
+                self.scan_webpage(url)
+            except Exception as e:
+                self.log(f"Error scanning webpage: {str(e)}", "error")
+            finally:
+                self.candidate_sink = None
+                while True:
+                    try:
+                        candidates.put(done_scanning, timeout=0.2)
+                        return
+                    except queue.Full:
+                        if not self.is_downloading:
+                            return
+        
+        downloaded = failed = skipped = 0
+        saved_paths = set()
+        transcoding = {}  # Futures of images still being converted -> URL
+        
+        def tally(image_url, success, result):
+            nonlocal downloaded, failed, skipped
+            if success:
+                downloaded += 1
+                saved_paths.add(result)
+            elif result == "Cancelled":
+                return
+            elif self._is_skip(result):
+                skipped += 1
+                self.log(f"Skipped: {result}", "info")
+            else:
+                failed += 1
+                self.log(f"Failed: {result}", "error")
+        
+        try:
+            os.makedirs(save_location, exist_ok=True)
+            if allowed_types:
+                allowed_types = set(ext.lower().strip('.') for ext in allowed_types)
+            self.download_sessions = HostSessionPool(pool_size=max_workers)
+            store = self.content_store = ContentStore(save_location)
+            cache_before = self.http_cache.stats() if self.http_cache is not None else {}
+            self.candidate_sink = sink
+            scan_thread = threading.Thread(target=scan, daemon=True)
+            scan_thread.start()
+            
+            seen = set()
+            queued = 0
+            scanning = True
+            in_flight = {}
+            deferred = OrderedDict()  # host -> deque of URLs waiting for a politeness token
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                def submit(image_url):
+                    if self.politeness is not None:
+                        self.politeness.consume(image_url)
+                    in_flight[executor.submit(self.download_image, image_url, save_location,
+                                              min_size, max_size, allowed_types)] = image_url
+                
+                while self.is_downloading and (scanning or in_flight or deferred):
+                    # Hosts take turns starting their oldest deferred URL once their token is in
+                    wake = 0.25
+                    for host in list(deferred):
+                        if len(in_flight) >= max_workers * 2:
+                            break
+                        delay = self.politeness.delay(deferred[host][0])
+                        if delay > 0:
+                            wake = min(wake, delay)
+                            continue
+                        submit(deferred[host].popleft())
+                        if not deferred[host]:
+                            del deferred[host]
+                    
+                    # Keep at most two downloads per worker submitted; the rest waits in the queue
+                    waiting = sum(len(host_queue) for host_queue in deferred.values())
+                    while scanning and len(in_flight) < max_workers * 2 and waiting < queue_size:
+                        try:
+                            image_url = candidates.get(timeout=min(wake, 0.05 if in_flight or deferred else 0.2))
+                        except queue.Empty:
+                            break
+                        if image_url is done_scanning:
+                            scanning = False
+                            break
+                        if image_url in seen:
+                            continue
+                        seen.add(image_url)
+                        if allowed_types and not self._matches_type(image_url, allowed_types):
+                            continue
+                        if self.politeness is not None:
+                            if not self.politeness.allowed(image_url):
+                                continue
+                            host = urlparse(image_url).netloc.lower()
+                            # Behind the host's earlier URLs, or until its next token
+                            if host in deferred or self.politeness.delay(image_url) > 0:
+                                deferred.setdefault(host, deque()).append(image_url)
+                                queued += 1
+                                waiting += 1
+                                continue
+                        queued += 1
+                        submit(image_url)
+                    if not in_flight:
+                        if deferred and not scanning:
+                            time.sleep(max(wake, 0.01))
+                        continue
+                    
+                    finished, _ = concurrent.futures.wait(in_flight, timeout=0.05,
+                                                          return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in finished:
+                        self._record_outcome(in_flight.pop(future), future.result(), tally, transcoding)
+                    self._record_transcoded(transcoding, tally)
+                    
+                    # The total grows while the scan runs, so progress is relative to what's known so far
+                    if queued:
+                        self.update_progress(((downloaded + failed + skipped) / queued) * 100)
+                
+                if not self.is_downloading:
+                    for future in in_flight:
+                        future.cancel()
+            self._record_transcoded(transcoding, tally, wait=True)
+            
+            scan_thread.join()
+            self._report_connection_stats(self.download_sessions.stats)
+            self._report_dedupe_stats(store, saved_paths)
+            self._report_cache_stats(cache_before)
+            self._report_transcode_stats()
+            self.log(f"Scan and download complete: {downloaded} downloaded, {skipped} skipped, {failed} failed", "success")
+            return downloaded
             
         except Exception as e:
             self.log(f"Error during download: {str(e)}", "error")
+            return downloaded
         finally:
+            self.candidate_sink = None
+            self._close_download_sessions()
             self.is_downloading = False
@@ -0,0 +1,176 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # Optional: only the near-duplicate stage needs it
+    np = None
+
+HASH_BITS = 64
+BATCH_SIZE = 256  # Images fingerprinted per worker task
+BLOCK_SIZE = 1024  # Rows compared at once inside one index bucket
+
+
+def _dct_matrix(size):
+    """Orthonormal DCT-II matrix, so D @ X @ D.T is the 2-D DCT of X"""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2.0 / size)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+def _pack_bits(bits):
+    """(n, 64) booleans to n uint64 hashes, first bit most significant"""
+    return np.packbits(bits.reshape(len(bits), -1), axis=1).view('>u8').ravel().astype(np.uint64)
+
+
+def hash_pixels(phash_pixels, dhash_pixels):
+    """pHash and dHash of a batch of grayscale images.
+
+    phash_pixels has shape (n, 32, 32) and dhash_pixels (n, 8, 9); returns two
+    arrays of n uint64 hashes.
+    """
+    dct = _dct_matrix(phash_pixels.shape[1])
+    # Low 8x8 frequencies compared with their median, leaving out the DC term
+    low = (dct @ phash_pixels @ dct.T)[:, :8, :8].reshape(len(phash_pixels), 64)
+    median = np.median(low[:, 1:], axis=1)
+    phashes = _pack_bits(low > median[:, None])
+    # Each pixel compared with its right neighbour
+    dhashes = _pack_bits(dhash_pixels[:, :, 1:] > dhash_pixels[:, :, :-1])
+    return phashes, dhashes
+
+
+def _load_pixels(path):
+    """((32, 32), (8, 9)) grayscale arrays and the original (width, height) of an image, or None"""
+    from PIL import Image
+    try:
+        with Image.open(path) as img:
+            size = img.size
+            img.draft('L', (64, 64))  # JPEGs decode at reduced scale, which is most of the cost
+            gray = img.convert('L')
+            return (np.asarray(gray.resize((32, 32), Image.BILINEAR), dtype=np.float64),
+                    np.asarray(gray.resize((9, 8), Image.BILINEAR), dtype=np.int16), size)
+    except Exception:
+        return None
+
+
+def fingerprint_batch(paths):
+    """[(path, phash, dhash, width, height)] for the paths that are readable raster images"""
+    loaded = [(path, pixels) for path, pixels in ((path, _load_pixels(path)) for path in paths) if pixels]
+    if not loaded:
+        return []
+    phashes, dhashes = hash_pixels(np.stack([pixels[0] for _, pixels in loaded]),
+                                   np.stack([pixels[1] for _, pixels in loaded]))
+    return [(path, int(phash), int(dhash), pixels[2][0], pixels[2][1])
+            for (path, pixels), phash, dhash in zip(loaded, phashes, dhashes)]
+
+
+def fingerprint_files(paths, workers=None, batch_size=BATCH_SIZE):
+    """Fingerprint images in batches across a process pool (inline for a single batch)"""
+    if np is None:
+        raise ImportError("Near-duplicate detection requires numpy (pip install numpy)")
+    paths = list(paths)
+    batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+    if len(batches) <= 1:
+        return fingerprint_batch(paths)
+    fingerprints = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for batch in executor.map(fingerprint_batch, batches):
+            fingerprints.extend(batch)
+    return fingerprints
+
+
+def _popcount(values):
+    """Set bits per element of a uint64 array"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return np.unpackbits(values.view(np.uint8).reshape(values.shape + (8,)), axis=-1).sum(axis=-1)
+
+
+class HammingIndex:
+    """Multi-index hashing over 64-bit hashes.
+
+    The hash is cut into max_distance + 1 chunks. Two hashes within
+    max_distance bits of each other must agree exactly on at least one chunk,
+    so only hashes sharing a chunk value are compared, vectorized per bucket.
+    """
+
+    def __init__(self, hashes, max_distance=6):
+        self.hashes = np.asarray(hashes, dtype=np.uint64)
+        self.max_distance = max_distance
+        chunks = max_distance + 1
+        bounds = [HASH_BITS * i // chunks for i in range(chunks + 1)]
+        self.chunks = [(bounds[i], bounds[i + 1] - bounds[i]) for i in range(chunks)]
+
+    def pairs(self):
+        """Yield (i, j) index arrays of every pair within max_distance, possibly repeated"""
+        for start, width in self.chunks:
+            shift = np.uint64(HASH_BITS - start - width)
+            keys = (self.hashes >> shift) & np.uint64((1 << width) - 1)
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            edges = np.flatnonzero(np.diff(sorted_keys)) + 1
+            for bucket in np.split(order, edges):
+                if len(bucket) < 2:
+                    continue
+                bucket_hashes = self.hashes[bucket]
+                for row in range(0, len(bucket), BLOCK_SIZE):
+                    rows = bucket_hashes[row:row + BLOCK_SIZE]
+                    distances = _popcount(rows[:, None] ^ bucket_hashes[None, :])
+                    i, j = np.nonzero(distances <= self.max_distance)
+                    i += row
+                    keep = i < j
+                    if keep.any():
+                        yield bucket[i[keep]], bucket[j[keep]]
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _find(parents, i):
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+
+def cluster_fingerprints(fingerprints, max_distance=6, dhash_distance=None):
+    """Groups of near-duplicate fingerprints, each sorted best (largest) first.
+
+    Candidates come from a HammingIndex on pHash and are confirmed with dHash
+    (within dhash_distance, twice max_distance by default). Singletons are
+    left out.
+    """
+    if len(fingerprints) < 2:
+        return []
+    dhash_distance = max_distance * 2 if dhash_distance is None else dhash_distance
+    # Identical fingerprints (resaved copies, blank placeholders) are merged up front
+    # so they don't flood the index with pairs
+    both = np.array([(fp[1], fp[2]) for fp in fingerprints], dtype=np.uint64)
+    unique, inverse = np.unique(both, axis=0, return_inverse=True)
+    phashes, dhashes = unique[:, 0], unique[:, 1]
+    parents = list(range(len(unique)))
+    for i, j in HammingIndex(phashes, max_distance).pairs():
+        confirmed = _popcount(dhashes[i] ^ dhashes[j]) <= dhash_distance
+        for a, b in zip(i[confirmed].tolist(), j[confirmed].tolist()):
+            root_a, root_b = _find(parents, a), _find(parents, b)
+            if root_a != root_b:
+                parents[root_b] = root_a
+
+    groups = {}
+    for fingerprint, i in zip(fingerprints, inverse.ravel().tolist()):
+        groups.setdefault(_find(parents, i), []).append(fingerprint)
+    # Highest resolution first; the larger file breaks ties
+    return [sorted(group, key=lambda fp: (fp[3] * fp[4], _file_size(fp[0])), reverse=True)
+            for group in groups.values() if len(group) > 1]
+
+
+def find_near_duplicates(paths, max_distance=6, workers=None):
+    """Clusters of near-duplicate image paths, each with the highest-resolution image first"""
+    fingerprints = fingerprint_files(paths, workers)
+    return [[fp[0] for fp in group] for group in cluster_fingerprints(fingerprints, max_distance)]
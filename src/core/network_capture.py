@@ -0,0 +1,101 @@
+import json
+
+
+def enable_performance_logging(chrome_options):
+    """Ask ChromeDriver to record DevTools network events in the performance log"""
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return chrome_options
+
+
+def drain_performance_log(driver):
+    """Return and clear the buffered performance log entries"""
+    try:
+        return driver.get_log('performance')
+    except Exception:
+        return []
+
+
+# DevTools resource types reported for blocked requests
+BLOCKED_CATEGORIES = {'Image': 'images', 'Font': 'fonts', 'Media': 'media'}
+# Error of requests failed by resource-type interception, which carry no blockedReason
+BLOCKED_ERROR = 'net::ERR_BLOCKED_BY_CLIENT'
+
+
+def parse_network_log(entries):
+    """Summarize a batch of performance log entries.
+
+    Returns ({url: record} for every image request, stats). Image records
+    carry the URL, content type, size in bytes, HTTP status and request
+    timing in milliseconds; images blocked during the scan are included
+    without a content type. Stats count blocked requests per category and
+    the bytes actually transferred. They can't say how many bytes blocking
+    avoided: a blocked request fails before any response, so the log holds
+    no Content-Length or encodedDataLength for it.
+    """
+    requests = {}
+    stats = {'blocked': {}, 'transferred_bytes': 0}
+    for entry in entries:
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, TypeError, ValueError):
+            continue
+        method = message.get('method')
+        params = message.get('params', {})
+        request_id = params.get('requestId')
+        if not request_id:
+            continue
+
+        if method == 'Network.requestWillBeSent':
+            record = requests.setdefault(request_id, {})
+            record['started'] = params.get('timestamp')
+            record['request_url'] = params.get('request', {}).get('url')
+            record['type'] = params.get('type')
+        elif method == 'Network.responseReceived':
+            response = params.get('response', {})
+            mime_type = (response.get('mimeType') or '').lower()
+            if not mime_type.startswith('image/'):
+                continue
+            headers = {name.lower(): value for name, value in response.get('headers', {}).items()}
+            record = requests.setdefault(request_id, {})
+            record.update({
+                'url': response.get('url'),
+                'content_type': mime_type,
+                'content_length': int(headers['content-length']) if headers.get('content-length', '').isdigit() else None,
+                'status': response.get('status'),
+            })
+        elif method == 'Network.loadingFinished':
+            record = requests.setdefault(request_id, {})
+            record['finished'] = params.get('timestamp')
+            record['encoded_length'] = params.get('encodedDataLength')
+            stats['transferred_bytes'] += int(params.get('encodedDataLength') or 0)
+        elif method == 'Network.loadingFailed' and (params.get('blockedReason') or
+                                                    params.get('errorText') == BLOCKED_ERROR):
+            record = requests.setdefault(request_id, {})
+            record['blocked'] = True
+            category = BLOCKED_CATEGORIES.get(params.get('type'), 'other')
+            stats['blocked'][category] = stats['blocked'].get(category, 0) + 1
+
+    images = {}
+    for record in requests.values():
+        if record.get('blocked') and record.get('type') == 'Image':
+            # The URL was recorded; its bytes were never fetched
+            url = record.get('request_url')
+            if url and url.startswith(('http://', 'https://')):
+                images[url] = {'url': url, 'kind': 'network', 'blocked': True}
+            continue
+        url = record.get('url')
+        if not url or not url.startswith(('http://', 'https://')) or 'content_type' not in record:
+            continue
+        if record.get('content_length') is None and record.get('encoded_length'):
+            record['content_length'] = int(record['encoded_length'])
+        if record.get('started') is not None and record.get('finished') is not None:
+            record['duration_ms'] = round((record['finished'] - record['started']) * 1000, 1)
+        images[url] = {
+            'url': url,
+            'kind': 'network',
+            'content_type': record['content_type'],
+            'content_length': record.get('content_length'),
+            'status': record.get('status'),
+            'duration_ms': record.get('duration_ms'),
+        }
+    return images, stats
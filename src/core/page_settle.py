@@ -0,0 +1,141 @@
+import time
+from selenium.common.exceptions import WebDriverException
+
+# Records the time of the last DOM mutation and the number of fetch/XHR
+# requests still in flight. Safe to run more than once per document.
+INSTALL_SCRIPT = r"""
+if (!window.__settle) {
+    const state = window.__settle = {lastMutation: performance.now(), pending: 0};
+    const touch = () => { state.lastMutation = performance.now(); };
+    const finish = () => { state.pending = Math.max(0, state.pending - 1); touch(); };
+    new MutationObserver(touch).observe(document, {
+        childList: true, subtree: true, attributes: true,
+        attributeFilter: ['src', 'srcset', 'style', 'class']
+    });
+    if (window.fetch) {
+        const fetch = window.fetch;
+        window.fetch = function() {
+            state.pending++;
+            return fetch.apply(this, arguments).finally(finish);
+        };
+    }
+    const send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        state.pending++;
+        this.addEventListener('loadend', finish, {once: true});
+        return send.apply(this, arguments);
+    };
+}
+"""
+
+# Optionally scrolls to the bottom, then resolves as soon as the page has been
+# quiet for quietMs: no DOM mutations, no pending fetch/XHR, fonts loaded and
+# every image near the viewport complete. Gives up after timeoutMs.
+WAIT_SCRIPT = r"""
+const quietMs = arguments[0], timeoutMs = arguments[1], scroll = arguments[2];
+const done = arguments[arguments.length - 1];
+const state = window.__settle || {lastMutation: 0, pending: 0};
+const start = performance.now();
+if (scroll) {
+    window.scrollTo(0, document.body.scrollHeight);
+    state.lastMutation = start;
+}
+
+function pendingImages() {
+    const limit = window.innerHeight * 2;
+    let pending = 0;
+    for (const img of document.images) {
+        if (img.complete) continue;
+        const rect = img.getBoundingClientRect();
+        if (rect.bottom >= -limit && rect.top <= limit) pending++;
+    }
+    return pending;
+}
+
+function check() {
+    const now = performance.now();
+    const quiet = now - state.lastMutation >= quietMs &&
+        state.pending <= 0 &&
+        document.readyState === 'complete' &&
+        (!document.fonts || document.fonts.status === 'loaded') &&
+        pendingImages() === 0;
+    if (quiet || now - start >= timeoutMs) {
+        done({settled: quiet, elapsed: now - start,
+              scrollHeight: document.body ? document.body.scrollHeight : 0});
+    } else {
+        setTimeout(check, 50);
+    }
+}
+check();
+"""
+
+
+class PageSettleDetector:
+    """Waits for a page to go quiet instead of sleeping for a fixed time.
+
+    Every wait is capped at step_timeout seconds and all waits on a page share
+    page_budget seconds, so infinite-scroll pages stop once the budget is spent.
+    With should_continue, waits run in short slices and the page counts as
+    expired as soon as it returns False.
+    """
+
+    def __init__(self, driver, quiet_ms=300, step_timeout=5.0, page_budget=30.0, should_continue=None,
+                 slice_timeout=0.25):
+        self.driver = driver
+        self.quiet_ms = quiet_ms
+        self.step_timeout = step_timeout
+        self.should_continue = should_continue
+        self.slice_timeout = slice_timeout
+        self.started = time.monotonic()
+        self.deadline = self.started + page_budget
+
+    def install(self):
+        """Start watching mutations and requests on the current document"""
+        self.driver.set_script_timeout(self.step_timeout + 5)
+        self.driver.execute_script(INSTALL_SCRIPT)
+
+    def remaining(self):
+        return max(0.0, self.deadline - time.monotonic())
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def cancelled(self):
+        return self.should_continue is not None and not self.should_continue()
+
+    def expired(self):
+        return self.remaining() <= 0 or self.cancelled()
+
+    def wait(self, scroll=False):
+        """Wait until the page settles; returns (settled, scroll height)"""
+        deadline = time.monotonic() + min(self.step_timeout, self.remaining())
+        result = {}
+        while not self.cancelled():
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            if self.should_continue is not None:
+                # The quiet state lives in the page, so waiting in slices settles just the same
+                timeout = min(timeout, self.slice_timeout)
+            try:
+                result = self.driver.execute_async_script(
+                    WAIT_SCRIPT, self.quiet_ms, int(timeout * 1000), scroll)
+            except WebDriverException:
+                # Navigation or a script timeout; the caller decides whether to continue
+                return False, None
+            if result.get('settled', False) or self.should_continue is None:
+                break
+            scroll = False
+        return result.get('settled', False), result.get('scrollHeight')
+
+    def scroll_until_settled(self, max_steps=50):
+        """Scroll to the bottom until the page stops growing or the budget runs out"""
+        _, last_height = self.wait()
+        steps = 0
+        while steps < max_steps and not self.expired():
+            _, height = self.wait(scroll=True)
+            steps += 1
+            if height is None or height == last_height:
+                break
+            last_height = height
+        return steps
@@ -0,0 +1,254 @@
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import requests
+from .http_session import create_session
+
+ROBOTS_USER_AGENT = 'WebImageScraper'
+
+# Request-rate units from the robots.txt extension ("1/10s", "30/1m")
+RATE_UNITS = {'s': 1, 'm': 60, 'h': 3600}
+
+
+class TokenBucket:
+    """Allows rate requests per second on average with bursts of up to burst"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now=None):
+        """Seconds until a token is available (0 if one is available now)"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self, now=None):
+        """Take a token; the bucket may go into debt, which delays the next requests"""
+        self._refill(time.monotonic() if now is None else now)
+        self.tokens -= 1
+
+
+def _compile_pattern(pattern):
+    """Regex for a robots.txt path pattern with * wildcards and an optional $ anchor"""
+    anchored = pattern.endswith('$')
+    if anchored:
+        pattern = pattern[:-1]
+    regex = '.*'.join(re.escape(part) for part in pattern.split('*'))
+    return re.compile(regex + ('$' if anchored else ''))
+
+
+class RobotsRules:
+    """The robots.txt group that applies to one user agent, compiled for fast matching"""
+
+    def __init__(self, rules=None, crawl_delay=None, request_rate=None):
+        # (pattern length, allow, compiled pattern); the longest matching pattern wins
+        self.rules = sorted(rules or [], key=lambda rule: -rule[0])
+        self.crawl_delay = crawl_delay
+        self.request_rate = request_rate  # Requests per second
+
+    @classmethod
+    def parse(cls, text, user_agent=ROBOTS_USER_AGENT):
+        groups = []  # (agents, lines)
+        agents, lines, in_rules = [], [], False
+        for raw in text.splitlines():
+            line = raw.split('#', 1)[0].strip()
+            if ':' not in line:
+                continue
+            field, value = (part.strip() for part in line.split(':', 1))
+            field = field.lower()
+            if field == 'user-agent':
+                if in_rules:
+                    groups.append((agents, lines))
+                    agents, lines, in_rules = [], [], False
+                agents.append(value.lower())
+            elif agents:
+                in_rules = True
+                lines.append((field, value))
+        if agents:
+            groups.append((agents, lines))
+
+        # The most specific group naming us, else the * group
+        token = user_agent.lower()
+        chosen, chosen_length = None, -1
+        for agents, group_lines in groups:
+            for agent in agents:
+                length = 0 if agent == '*' else len(agent) if agent in token else -1
+                if length > chosen_length:
+                    chosen, chosen_length = group_lines, length
+        if chosen is None:
+            return cls()
+
+        rules, crawl_delay, request_rate = [], None, None
+        for field, value in chosen:
+            if field in ('allow', 'disallow'):
+                if value:
+                    rules.append((len(value), field == 'allow', _compile_pattern(value)))
+            elif field == 'crawl-delay':
+                try:
+                    crawl_delay = float(value)
+                except ValueError:
+                    pass
+            elif field == 'request-rate':
+                match = re.match(r'(\d+)\s*/\s*(\d+)\s*([smh]?)', value.lower())
+                if match and int(match.group(2)):
+                    seconds = int(match.group(2)) * RATE_UNITS.get(match.group(3) or 's', 1)
+                    request_rate = int(match.group(1)) / seconds
+        return cls(rules, crawl_delay, request_rate)
+
+    def allowed(self, url):
+        parsed = urlparse(url)
+        path = (parsed.path or '/') + (f'?{parsed.query}' if parsed.query else '')
+        if path == '/robots.txt':
+            return True
+        for _, allow, pattern in self.rules:
+            if pattern.match(path):
+                return allow
+        return True
+
+    def rate(self):
+        """Requests per second the site asks for, or None"""
+        rates = [rate for rate in (self.request_rate, 1 / self.crawl_delay if self.crawl_delay else None) if rate]
+        return min(rates) if rates else None
+
+
+class HostRule:
+    """Politeness settings for one host (and its subdomains)"""
+
+    def __init__(self, rate=None, burst=1, respect_robots=True):
+        self.rate = rate  # Requests per second; None means no limit beyond robots.txt
+        self.burst = burst
+        self.respect_robots = respect_robots
+
+
+class PolitenessPolicy:
+    """Per-host request pacing shared by the scanner and the downloader.
+
+    Each host gets a token bucket at the slowest of its configured rate and
+    the Crawl-delay / Request-rate from its robots.txt. robots.txt is fetched
+    once per host and cached for robots_ttl seconds. rules maps a host (or
+    parent domain) to a HostRule that overrides the defaults.
+    """
+
+    def __init__(self, rate=None, burst=1, rules=None, respect_robots=True, robots_ttl=3600,
+                 user_agent=ROBOTS_USER_AGENT, session=None):
+        self.default_rule = HostRule(rate, burst, respect_robots)
+        self.rules = {host.lower().lstrip('.'): rule for host, rule in (rules or {}).items()}
+        self.robots_ttl = robots_ttl
+        self.user_agent = user_agent
+        self.session = session
+        self._robots = {}  # origin -> (expires, RobotsRules)
+        self._robots_locks = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def rule_for(self, host):
+        host = host.split(':', 1)[0]
+        while host:
+            if host in self.rules:
+                return self.rules[host]
+            host = host.partition('.')[2]
+        return self.default_rule
+
+    def _fetch_robots(self, origin):
+        session = self.session or create_session()
+        try:
+            response = session.get(f"{origin}/robots.txt", timeout=(5, 10))
+        except requests.exceptions.RequestException:
+            return RobotsRules(), min(self.robots_ttl, 300)
+        finally:
+            if self.session is None:
+                session.close()
+        if response.status_code == 200:
+            return RobotsRules.parse(response.text, self.user_agent), self.robots_ttl
+        # Missing robots.txt allows everything; retry server errors sooner
+        return RobotsRules(), self.robots_ttl if response.status_code < 500 else min(self.robots_ttl, 300)
+
+    def robots(self, url):
+        """Cached RobotsRules for url's origin, fetched on first use or after the TTL"""
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc.lower()}"
+        with self._lock:
+            cached = self._robots.get(origin)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+            origin_lock = self._robots_locks.setdefault(origin, threading.Lock())
+        # One fetch per origin even when many threads ask at once
+        with origin_lock:
+            with self._lock:
+                cached = self._robots.get(origin)
+                if cached and cached[0] > time.monotonic():
+                    return cached[1]
+            rules, ttl = self._fetch_robots(origin)
+            with self._lock:
+                self._robots[origin] = (time.monotonic() + ttl, rules)
+            return rules
+
+    def prefetch(self, urls, workers=8):
+        """Load robots.txt for every host in urls concurrently"""
+        origins = {}
+        for url in urls:
+            parsed = urlparse(url)
+            if self.rule_for(parsed.netloc.lower()).respect_robots:
+                origins.setdefault(f"{parsed.scheme}://{parsed.netloc.lower()}", url)
+        if origins:
+            with ThreadPoolExecutor(max_workers=min(workers, len(origins))) as executor:
+                list(executor.map(self.robots, origins.values()))
+
+    def allowed(self, url):
+        """False if the host's robots.txt disallows url for our user agent"""
+        if not self.rule_for(urlparse(url).netloc.lower()).respect_robots:
+            return True
+        return self.robots(url).allowed(url)
+
+    def _bucket(self, url):
+        host = urlparse(url).netloc.lower()
+        rule = self.rule_for(host)
+        rates = [rule.rate] if rule.rate else []
+        if rule.respect_robots:
+            robots_rate = self.robots(url).rate()
+            if robots_rate:
+                rates.append(robots_rate)
+        if not rates:
+            return None
+        rate = min(rates)
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(rate, rule.burst)
+            bucket.rate = rate
+            return bucket
+
+    def delay(self, url):
+        """Seconds before a request to url's host is allowed (0 if it may go now)"""
+        bucket = self._bucket(url)
+        if bucket is None:
+            return 0.0
+        with self._lock:
+            return bucket.delay()
+
+    def consume(self, url):
+        """Record a request to url's host"""
+        bucket = self._bucket(url)
+        if bucket is not None:
+            with self._lock:
+                bucket.consume()
+
+    def wait(self, url, should_continue=None):
+        """Block until url's host may be requested again, then take its token; False if cancelled"""
+        while True:
+            delay = self.delay(url)
+            if delay <= 0:
+                self.consume(url)
+                return True
+            if should_continue is not None and not should_continue():
+                return False
+            time.sleep(min(delay, 0.25))
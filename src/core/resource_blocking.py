@@ -0,0 +1,165 @@
+import threading
+from urllib.parse import urlparse
+
+try:
+    import trio
+except ImportError:  # Optional: ships with selenium, only resource-type blocking needs it
+    trio = None
+
+
+def suffix_patterns(extensions):
+    """Chrome URL patterns ('*' wildcard, matched against the whole URL) for paths ending in each extension.
+
+    Each extension is anchored to the end of the URL or to the start of its
+    query, so hosts such as gifts.com or movies.com are never matched.
+    """
+    patterns = []
+    for extension in extensions:
+        patterns.extend([f'*.{extension}', f'*.{extension}?*'])
+    return patterns
+
+
+IMAGE_PATTERNS = suffix_patterns(['jpg', 'jpeg', 'png', 'gif', 'webp', 'avif', 'bmp', 'svg'])
+FONT_PATTERNS = suffix_patterns(['woff', 'woff2', 'ttf', 'otf', 'eot'])
+MEDIA_PATTERNS = suffix_patterns(['mp4', 'webm', 'm3u8', 'mpd', 'mp3', 'ogg', 'mov', 'm4s'])
+TRACKER_PATTERNS = [
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*googlesyndication.com*', '*adservice.google.*', '*connect.facebook.net*',
+    '*facebook.com/tr*', '*hotjar.com*', '*segment.io*', '*segment.com/analytics*',
+    '*mparticle.com*', '*branch.io*', '*scorecardresearch.com*', '*criteo.*',
+    '*taboola.com*', '*outbrain.com*', '*amazon-adsystem.com*', '*newrelic.com*',
+]
+
+
+# Seconds apply() waits for request interception to start before navigating anyway
+INTERCEPT_START_TIMEOUT = 5
+
+
+class ResourceTypeInterceptor:
+    """Fails a browser's requests by DevTools resource type ('Image', 'Font', 'Media').
+
+    Catches what URL patterns can't, such as images served from
+    extensionless URLs. Paused requests arrive as events, which need the
+    DevTools websocket, so a trio loop listens on a background thread.
+    """
+
+    def __init__(self, driver, resource_types):
+        self.driver = driver
+        self.resource_types = list(resource_types)
+        self.ready = threading.Event()
+        self.error = None
+        self._cancel_scope = None
+        self._trio_token = None
+        self._stopped = False
+        self._thread = None
+
+    def start(self, timeout=INTERCEPT_START_TIMEOUT):
+        """Start intercepting; True once the browser is pausing matching requests"""
+        if trio is None or not self.resource_types:
+            return False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self.ready.wait(timeout) and self.error is None
+
+    def stop(self, timeout=5):
+        """Stop intercepting and close the DevTools connection"""
+        self._stopped = True
+        if self._trio_token is not None:
+            try:
+                trio.from_thread.run_sync(self._cancel_scope.cancel, trio_token=self._trio_token)
+            except Exception:
+                pass  # The loop already ended
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            trio.run(self._intercept)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.ready.set()
+
+    async def _intercept(self):
+        async with self.driver.bidi_connection() as connection:
+            session, devtools = connection.session, connection.devtools
+            patterns = [devtools.fetch.RequestPattern(url_pattern='*',
+                                                      resource_type=devtools.network.ResourceType(resource_type),
+                                                      request_stage=devtools.fetch.RequestStage.REQUEST)
+                        for resource_type in self.resource_types]
+            # A full channel drops events, which would leave their requests paused forever
+            paused = session.listen(devtools.fetch.RequestPaused, buffer_size=4096)
+            await session.execute(devtools.fetch.enable(patterns=patterns))
+            with trio.CancelScope() as scope:
+                self._cancel_scope = scope
+                self._trio_token = trio.lowlevel.current_trio_token()
+                self.ready.set()
+                if self._stopped:
+                    return
+                async for event in paused:
+                    try:
+                        await session.execute(devtools.fetch.fail_request(
+                            event.request_id, devtools.network.ErrorReason.BLOCKED_BY_CLIENT))
+                    except Exception:
+                        pass  # The page navigated away or the request was already gone
+            await session.execute(devtools.fetch.disable())
+
+
+class ResourceBlocker:
+    """Blocks bandwidth-heavy requests while a page is being scanned.
+
+    Requests are blocked by URL pattern (path suffixes and tracker hosts)
+    and, with block_by_type, by DevTools resource type as well, so images
+    on extensionless URLs are caught too. Blocked requests still show up in
+    the DevTools performance log, so image URLs are recorded without their
+    bytes being fetched. Pages on an allowlisted host are scanned without
+    any blocking.
+    """
+
+    def __init__(self, block_images=True, block_fonts=True, block_media=True, block_trackers=True,
+                 allowlist=None, block_by_type=True):
+        self.patterns = []
+        self.resource_types = []
+        if block_images:
+            self.patterns.extend(IMAGE_PATTERNS)
+            self.resource_types.append('Image')
+        if block_fonts:
+            self.patterns.extend(FONT_PATTERNS)
+            self.resource_types.append('Font')
+        if block_media:
+            self.patterns.extend(MEDIA_PATTERNS)
+            self.resource_types.append('Media')
+        if not block_by_type:
+            self.resource_types = []
+        if block_trackers:
+            self.patterns.extend(TRACKER_PATTERNS)
+        self.allowlist = set(host.lower().lstrip('.') for host in (allowlist or []))
+        self._interceptors = {}  # driver -> ResourceTypeInterceptor while a page is blocked
+
+    def is_allowlisted(self, url):
+        """True if url's host (or a parent domain) is on the allowlist"""
+        host = (urlparse(url).hostname or '').lower()
+        return any(host == allowed or host.endswith('.' + allowed) for allowed in self.allowlist)
+
+    def apply(self, driver, url):
+        """Start blocking for the page at url; returns False when the site is allowlisted"""
+        if self.is_allowlisted(url) or not self.patterns:
+            return False
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.patterns})
+        if self.resource_types:
+            interceptor = ResourceTypeInterceptor(driver, self.resource_types)
+            self._interceptors[driver] = interceptor
+            # Without a DevTools websocket the URL patterns still apply
+            interceptor.start()
+        return True
+
+    def clear(self, driver):
+        """Lift the block list so the pooled browser is clean for its next job"""
+        interceptor = self._interceptors.pop(driver, None)
+        if interceptor is not None:
+            interceptor.stop()
+        try:
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': []})
+        except Exception:
+            pass
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import re
+import requests
+from contextlib import nullcontext
+
+PART_SUFFIX = '.part'
+
+# Failures after which the rest of the body can be requested with Range
+RESUMABLE_ERRORS = (
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+)
+
+CONTENT_RANGE_RE = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)', re.IGNORECASE)
+
+
+def part_path(path):
+    """Temporary path a download is written to until it is complete"""
+    return path + PART_SUFFIX
+
+
+def range_validator(response):
+    """Value to send as If-Range when resuming this response, or None if it can't be resumed.
+
+    If-Range needs a strong ETag or a Last-Modified date, and byte offsets
+    only line up when the body isn't content-encoded.
+    """
+    if response.headers.get('Accept-Ranges', '').lower() == 'none':
+        return None
+    if response.headers.get('Content-Encoding', 'identity').lower() != 'identity':
+        return None
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response.headers.get('Last-Modified')
+
+
+def remove_part(path):
+    """Delete a leftover .part file, ignoring one that doesn't exist"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class SizeLimitExceeded(Exception):
+    """A streamed body ended below min_bytes or grew past max_bytes; nothing is left on disk"""
+
+
+def download_to_part(http, url, response, chunks, part, headers=None, timeout=10, max_resumes=3,
+                     should_continue=None, chunk_size=8192, hash_content=False, min_bytes=0, max_bytes=None,
+                     cancel_token=None):
+    """Write a streamed response body to part, resuming after dropped connections.
+
+    chunks iterates the body of response (it may replay bytes already read,
+    see content_sniffing.sniff_response). When the connection breaks, the rest
+    is requested with Range and If-Range; a server that answers 200 instead
+    (the file changed, or ranges aren't supported) restarts the file. Returns
+    the number of bytes written, or None if should_continue() turned False or
+    cancel_token (a CancelToken) was cancelled. The token also closes the
+    socket of the response being read, so cancelling doesn't wait for data.
+    With hash_content it returns (bytes written, hex SHA-256) instead, hashed
+    chunk by chunk as they are written.
+
+    The body is held in memory until it reaches min_bytes, so a too-small
+    image never touches the disk, and the transfer is dropped as soon as it
+    passes max_bytes; both raise SizeLimitExceeded. part may also be an open
+    binary file such as io.BytesIO, which is written to and left open.
+    """
+    validator = range_validator(response)
+    resumes = 0
+    written = 0
+    digest = hashlib.sha256() if hash_content else None
+    pending = []  # Chunks held back until min_bytes is reached
+    owns_file = isinstance(part, str)
+    f = None
+
+    def stopped():
+        return (should_continue is not None and not should_continue()) or \
+            (cancel_token is not None and cancel_token.cancelled)
+
+    watch = cancel_token.watch if cancel_token is not None else nullcontext
+    try:
+        while True:
+            try:
+                with watch(response):
+                    for chunk in chunks:
+                        if stopped():
+                            response.close()
+                            return None
+                        written += len(chunk)
+                        if max_bytes is not None and written > max_bytes:
+                            response.close()
+                            raise SizeLimitExceeded(f"Size filter while downloading (over {max_bytes/1024:.1f}KB)")
+                        if digest is not None:
+                            digest.update(chunk)
+                        if f is None:
+                            pending.append(chunk)
+                            if written >= min_bytes:
+                                f = open(part, 'wb') if owns_file else part
+                                f.writelines(pending)
+                                pending = []
+                        else:
+                            f.write(chunk)
+                if stopped():
+                    # The body may have been cut short by closing the socket
+                    return None
+                if f is None:
+                    if written < min_bytes:
+                        raise SizeLimitExceeded(f"Size filter while downloading ({written/1024:.1f}KB)")
+                    f = open(part, 'wb') if owns_file else part  # Empty body with no minimum
+                return (written, digest.hexdigest()) if digest is not None else written
+            except RESUMABLE_ERRORS:
+                response.close()
+                if stopped():
+                    return None
+                resumes += 1
+                if validator is None or resumes > max_resumes:
+                    raise
+            except Exception:
+                # Reading from a socket closed by cancel() fails in all sorts of ways
+                if stopped():
+                    return None
+                raise
+
+            # Ask for the rest of the same representation
+            if f is not None:
+                f.flush()
+            resume_headers = dict(headers or {})
+            resume_headers.update({'Range': f'bytes={written}-', 'If-Range': validator,
+                                   'Accept-Encoding': 'identity'})
+            response = http.get(url, headers=resume_headers, stream=True, timeout=timeout)
+            match = CONTENT_RANGE_RE.match(response.headers.get('Content-Range', ''))
+            if response.status_code == 206 and match and int(match.group(1)) == written:
+                pass
+            elif response.status_code == 200:
+                # Changed on the server or no range support: start over
+                if f is not None:
+                    f.seek(0)
+                    f.truncate()
+                pending = []
+                written = 0
+                digest = hashlib.sha256() if hash_content else None
+                validator = range_validator(response)
+            else:
+                response.close()
+                response.raise_for_status()
+                raise requests.exceptions.RequestException(
+                    f"Unexpected resume response {response.status_code} for url: {url}")
+            chunks = response.iter_content(chunk_size=chunk_size)
+    finally:
+        if f is not None and owns_file:
+            f.close()
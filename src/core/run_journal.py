@@ -0,0 +1,121 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+# Item states; pending, in_flight and failed items are retried when a run resumes
+PENDING = 'pending'
+IN_FLIGHT = 'in_flight'
+DONE = 'done'
+FAILED = 'failed'
+SKIPPED = 'skipped'  # Filtered out by type or size; final like done
+RESUMABLE_STATES = (PENDING, IN_FLIGHT, FAILED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    page_url TEXT,
+    save_location TEXT,
+    options TEXT,
+    created REAL
+);
+CREATE TABLE IF NOT EXISTS items (
+    run_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    state TEXT NOT NULL,
+    path TEXT,
+    sha256 TEXT,
+    reason TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated REAL,
+    PRIMARY KEY (run_id, url)
+);
+CREATE INDEX IF NOT EXISTS items_state ON items (run_id, state);
+"""
+
+
+class RunJournal:
+    """Crash-safe on-disk record of download runs.
+
+    Every run stores its candidate URLs and each URL's state in SQLite (WAL
+    mode), so a run interrupted by a crash or kill can be resumed by ID,
+    skipping what already finished.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # WAL + NORMAL survives process crashes; only a power loss can drop the last commits
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def create_run(self, urls, page_url=None, save_location=None, options=None):
+        """Record a new run with all its candidate URLs pending; returns the run ID"""
+        run_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.execute('INSERT INTO runs VALUES (?, ?, ?, ?, ?)',
+                                   (run_id, page_url, save_location, json.dumps(options or {}), now))
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO items (run_id, seq, url, state, updated) VALUES (?, ?, ?, ?, ?)',
+                    ((run_id, seq, url, PENDING, now) for seq, url in enumerate(urls)))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return run_id
+
+    def run_info(self, run_id):
+        """{run_id, page_url, save_location, options, created} or None for an unknown run"""
+        row = self._execute('SELECT run_id, page_url, save_location, options, created FROM runs WHERE run_id = ?',
+                            (run_id,)).fetchone()
+        if row is None:
+            return None
+        return {'run_id': row[0], 'page_url': row[1], 'save_location': row[2],
+                'options': json.loads(row[3] or '{}'), 'created': row[4]}
+
+    def resumable_urls(self, run_id):
+        """URLs still to do (pending, in flight when the run stopped, or failed) in original order"""
+        placeholders = ', '.join('?' for _ in RESUMABLE_STATES)
+        rows = self._execute(f'SELECT url FROM items WHERE run_id = ? AND state IN ({placeholders}) ORDER BY seq',
+                             (run_id,) + RESUMABLE_STATES).fetchall()
+        return [row[0] for row in rows]
+
+    def mark_in_flight(self, run_id, url):
+        self._execute('UPDATE items SET state = ?, attempts = attempts + 1, updated = ? WHERE run_id = ? AND url = ?',
+                      (IN_FLIGHT, time.time(), run_id, url))
+
+    def mark_pending(self, run_id, url):
+        self._execute('UPDATE items SET state = ?, updated = ? WHERE run_id = ? AND url = ?',
+                      (PENDING, time.time(), run_id, url))
+
+    def mark_done(self, run_id, url, path, sha256=None):
+        self._execute('UPDATE items SET state = ?, path = ?, sha256 = ?, reason = NULL, updated = ? '
+                      'WHERE run_id = ? AND url = ?', (DONE, path, sha256, time.time(), run_id, url))
+
+    def mark_failed(self, run_id, url, reason):
+        self._execute('UPDATE items SET state = ?, reason = ?, updated = ? WHERE run_id = ? AND url = ?',
+                      (FAILED, str(reason), time.time(), run_id, url))
+
+    def mark_skipped(self, run_id, url, reason):
+        self._execute('UPDATE items SET state = ?, reason = ?, updated = ? WHERE run_id = ? AND url = ?',
+                      (SKIPPED, str(reason), time.time(), run_id, url))
+
+    def summary(self, run_id):
+        """{state: count} for a run"""
+        rows = self._execute('SELECT state, COUNT(*) FROM items WHERE run_id = ? GROUP BY state', (run_id,)).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,248 @@
+import codecs
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+# Attributes on <img> that may hold an image URL
+IMG_URL_ATTRS = ('src', 'data-src', 'data-lazy-src')
+
+# Element ids used by common client-side frameworks as their mount point
+SPA_ROOT_IDS = {'root', 'app', '__next', '__nuxt', '___gatsby', 'svelte'}
+
+# Attributes that mark a client-side rendered root
+SPA_ROOT_ATTRS = {'data-reactroot', 'ng-version', 'data-server-rendered'}
+
+# Tags whose text content is not visible page text
+NON_TEXT_TAGS = {'script', 'style', 'noscript', 'template'}
+
+# Tags that never have a closing tag
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+             'meta', 'source', 'track', 'wbr'}
+
+# Heuristic thresholds for deciding a page needs a real browser
+MIN_BODY_TEXT = 200
+MIN_BODY_ELEMENTS = 10
+MIN_SPA_ROOT_ELEMENTS = 3
+
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)(.*?)\1\s*\)', re.IGNORECASE)
+
+# Charset declared in a Content-Type header or in a <meta charset> / http-equiv tag near the top of a page
+CHARSET_RE = re.compile(r'charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+META_PRESCAN_BYTES = 4096
+
+# Byte order marks, which override any declared charset
+BOMS = ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+
+
+def parse_srcset(value):
+    """Return the URLs listed in a srcset attribute value"""
+    urls = []
+    for candidate in value.split(','):
+        parts = candidate.strip().split()
+        if parts:
+            urls.append(parts[0])
+    return urls
+
+
+def parse_css_urls(value):
+    """Return the url(...) references in a CSS declaration"""
+    return [match.group(2) for match in CSS_URL_RE.finditer(value) if match.group(2)]
+
+
+class ImageSourceParser(HTMLParser):
+    """Streaming HTML parser that collects image candidates and JavaScript hints"""
+
+    def __init__(self, base_url):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.image_urls = {}  # Ordered set of resolved URLs
+        self.links = {}  # Ordered set of resolved <a href> targets
+        self.body_text_length = 0
+        self.body_elements = 0
+        self.noscript_images = 0
+        self.spa_roots = []  # [marker, element count] per SPA root seen
+        self._in_body = False
+        self._skip_depth = 0
+        self._noscript_depth = 0
+        self._open_spa_roots = []  # (tag, depth, record)
+        self._depth = 0
+
+    def _add(self, value):
+        if not value:
+            return
+        value = value.strip()
+        if not value or value.startswith('data:'):
+            return
+        resolved = urljoin(self.base_url, value)
+        if resolved.startswith(('http://', 'https://')):
+            self.image_urls[resolved] = None
+
+    def handle_starttag(self, tag, attrs):
+        self._open(tag, dict(attrs))
+        if tag in VOID_TAGS:
+            self._close(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._open(tag, dict(attrs))
+        self._close(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in VOID_TAGS:
+            self._close(tag)
+
+    def _open(self, tag, attrs):
+        self._depth += 1
+
+        if tag == 'base' and attrs.get('href'):
+            self.base_url = urljoin(self.base_url, attrs['href'])
+        elif tag == 'body':
+            self._in_body = True
+        elif tag in NON_TEXT_TAGS:
+            self._skip_depth += 1
+            if tag == 'noscript':
+                self._noscript_depth += 1
+
+        if self._in_body:
+            self.body_elements += 1
+        for _, _, record in self._open_spa_roots:
+            record[1] += 1
+
+        if attrs.get('id') in SPA_ROOT_IDS:
+            marker = f"#{attrs['id']}"
+        else:
+            marker = next((f"[{name}]" for name in SPA_ROOT_ATTRS if name in attrs), None)
+        if marker:
+            record = [marker, 0]
+            self.spa_roots.append(record)
+            self._open_spa_roots.append((tag, self._depth, record))
+
+        if tag == 'a' and attrs.get('href'):
+            link = urljoin(self.base_url, attrs['href'].strip())
+            if link.startswith(('http://', 'https://')):
+                self.links[link] = None
+        elif tag == 'img':
+            # 1x1 tracking pixels in <noscript> say nothing about lazy-loaded content
+            if self._noscript_depth and not (attrs.get('width') == '1' and attrs.get('height') == '1'):
+                self.noscript_images += 1
+            for attr in IMG_URL_ATTRS:
+                self._add(attrs.get(attr))
+            if attrs.get('srcset'):
+                for url in parse_srcset(attrs['srcset']):
+                    self._add(url)
+        elif tag == 'source':
+            if attrs.get('srcset'):
+                for url in parse_srcset(attrs['srcset']):
+                    self._add(url)
+            elif attrs.get('src') and attrs.get('type', 'image/').startswith('image/'):
+                self._add(attrs['src'])
+        elif tag == 'link':
+            rel = (attrs.get('rel') or '').lower().split()
+            if 'preload' in rel and (attrs.get('as') or '').lower() == 'image':
+                self._add(attrs.get('href'))
+                if attrs.get('imagesrcset'):
+                    for url in parse_srcset(attrs['imagesrcset']):
+                        self._add(url)
+
+        style = attrs.get('style')
+        if style and 'url(' in style:
+            for url in parse_css_urls(style):
+                self._add(url)
+
+    def _close(self, tag):
+        if tag in NON_TEXT_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+            if tag == 'noscript' and self._noscript_depth:
+                self._noscript_depth -= 1
+        while self._open_spa_roots and self._open_spa_roots[-1][1] >= self._depth:
+            self._open_spa_roots.pop()
+        self._depth = max(0, self._depth - 1)
+
+    def handle_data(self, data):
+        if self._in_body and not self._skip_depth:
+            self.body_text_length += len(data.strip())
+
+    def javascript_reason(self):
+        """Return why the page looks client-side rendered, or None if static HTML is enough"""
+        if self.noscript_images:
+            return f"{self.noscript_images} <noscript> image fallbacks"
+        for marker, elements in self.spa_roots:
+            if elements < MIN_SPA_ROOT_ELEMENTS:
+                return f"empty application root {marker}"
+        if self.body_text_length < MIN_BODY_TEXT and self.body_elements < MIN_BODY_ELEMENTS:
+            return "near-empty body"
+        if not self.image_urls:
+            return "no images in server-rendered HTML"
+        return None
+
+
+class StaticScanResult:
+    """Outcome of a browserless page scan"""
+
+    def __init__(self, image_urls, needs_javascript=None, links=None):
+        self.image_urls = image_urls
+        self.needs_javascript = needs_javascript
+        self.links = links if links is not None else []
+
+
+def parse_html(html, base_url, chunk_size=65536):
+    """Parse an HTML string in chunks and return a StaticScanResult"""
+    parser = ImageSourceParser(base_url)
+    for start in range(0, len(html), chunk_size):
+        parser.feed(html[start:start + chunk_size])
+    parser.close()
+    return StaticScanResult(list(parser.image_urls), parser.javascript_reason(), list(parser.links))
+
+
+def _known_encoding(name):
+    """Python codec name for a charset label, or None if there is no such codec"""
+    try:
+        return codecs.lookup(name.decode('ascii') if isinstance(name, bytes) else name).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+
+
+def page_encoding(content_type, head):
+    """Encoding of an HTML page from its BOM, Content-Type charset or <meta> charset, else UTF-8.
+
+    requests assumes ISO-8859-1 for text/html without a charset, which
+    garbles UTF-8 URLs, so only a charset the server or page declares counts.
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    for match in (CHARSET_RE.search(content_type or ''), META_CHARSET_RE.search(head[:META_PRESCAN_BYTES])):
+        encoding = match and _known_encoding(match.group(1))
+        if encoding:
+            return encoding
+    return 'utf-8'
+
+
+def scan_static(session, url, timeout=(5, 15), max_bytes=5 * 1024 * 1024):
+    """Fetch a page over HTTP and stream it through ImageSourceParser"""
+    headers = {'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.8'}
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '').lower()
+        if 'html' not in content_type:
+            return StaticScanResult([], f"unexpected content type {content_type or 'unknown'}")
+
+        parser = ImageSourceParser(response.url)
+        decoder = None
+        received = 0
+        for chunk in response.iter_content(chunk_size=65536):
+            if not chunk:
+                continue
+            if decoder is None:
+                # The first chunk holds the BOM and any <meta> charset
+                encoding = page_encoding(response.headers.get('Content-Type'), chunk)
+                decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+            parser.feed(decoder.decode(chunk))
+            received += len(chunk)
+            if received >= max_bytes:
+                break
+        if decoder is not None:
+            parser.feed(decoder.decode(b'', final=True))
+        parser.close()
+
+    return StaticScanResult(list(parser.image_urls), parser.javascript_reason(), list(parser.links))
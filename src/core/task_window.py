@@ -0,0 +1,33 @@
+import concurrent.futures
+
+
+def run_windowed(executor, fn, items, window, should_continue=None):
+    """Run fn(item) on executor for every item with at most window tasks submitted at once.
+
+    Items are pulled lazily as earlier tasks finish, so memory stays flat
+    however long items is. Yields (item, future) in completion order. Once
+    should_continue() turns False nothing new is submitted, tasks that haven't
+    started are cancelled, and the ones already running are still yielded.
+    """
+    items = iter(items)
+    in_flight = {}
+    stopped = False
+    while True:
+        while not stopped and len(in_flight) < window:
+            if should_continue is not None and not should_continue():
+                stopped = True
+                for future in in_flight:
+                    future.cancel()
+                break
+            try:
+                item = next(items)
+            except StopIteration:
+                break
+            in_flight[executor.submit(fn, item)] = item
+        if not in_flight:
+            return
+        done, _ = concurrent.futures.wait(in_flight, timeout=0.25, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            item = in_flight.pop(future)
+            if not future.cancelled():
+                yield item, future
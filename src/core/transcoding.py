@@ -0,0 +1,171 @@
+import io
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from .content_sniffing import TYPE_NAMES
+
+# Transcoding profiles: store the original bytes untouched, or re-encode as PNG
+# quickly (low zlib effort) or as small as Pillow can make it
+PASSTHROUGH = 'passthrough'
+FAST = 'fast'
+ARCHIVAL = 'archival'
+TRANSCODE_PROFILES = (PASSTHROUGH, FAST, ARCHIVAL)
+
+# Pillow save options per profile
+PROFILE_OPTIONS = {
+    FAST: {'compress_level': 1},
+    ARCHIVAL: {'compress_level': 9, 'optimize': True},
+}
+
+# Profile per format when none is given: WebP becomes PNG, everything else is stored as fetched
+DEFAULT_POLICY = {'image/webp': FAST}
+
+
+def normalize_policy(policy):
+    """{mime type: profile} from a policy given as one profile name or a dict keyed by type name or MIME type"""
+    if policy is None:
+        return dict(DEFAULT_POLICY)
+    if isinstance(policy, str):
+        policy = {mime_type: policy for mime_type in DEFAULT_POLICY}
+    normalized = {}
+    for name, profile in policy.items():
+        if profile not in TRANSCODE_PROFILES:
+            raise ValueError(f"Invalid transcode profile: {profile}")
+        name = name.lower().strip('.')
+        normalized[name if '/' in name else TYPE_NAMES.get(name, f"image/{name}")] = profile
+    return normalized
+
+
+def transcode_image(data, mime_type, profile=FAST):
+    """Re-encode image bytes as PNG in a worker process; returns (new bytes, extension, encode seconds)
+
+    Animated images keep all their frames (as APNG).
+    """
+    from PIL import Image
+
+    started = time.perf_counter()
+    with Image.open(io.BytesIO(data)) as img:
+        out = io.BytesIO()
+        if getattr(img, 'is_animated', False):
+            img.save(out, 'PNG', save_all=True, **PROFILE_OPTIONS[profile])
+        else:
+            # Keep transparency where there is any
+            if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+                img = img.convert('RGBA')
+            else:
+                img = img.convert('RGB')
+            img.save(out, 'PNG', **PROFILE_OPTIONS[profile])
+    return out.getvalue(), '.png', time.perf_counter() - started
+
+
+def when_done(job, callback):
+    """Future of callback(job), run on whichever thread finishes job.
+
+    Lets a download thread hand its image to the stage and move on: the
+    callback writes the file once the conversion is done. The returned
+    future can't be cancelled, and an exception from callback is set on it.
+    """
+    finished = Future()
+    finished.set_running_or_notify_cancel()
+
+    def run(job):
+        try:
+            finished.set_result(callback(job))
+        except Exception as e:
+            finished.set_exception(e)
+
+    job.add_done_callback(run)
+    return finished
+
+
+class TranscodeStage:
+    """CPU-bound image conversion on its own process pool, off the download threads.
+
+    policy picks a profile per format (see normalize_policy); formats set to
+    passthrough, or not listed, are never decoded. Jobs go in as in-memory
+    bytes and come back as futures, so a download thread hands its image over
+    and moves on. At most queue_size jobs are queued or running at once;
+    submit() blocks past that, which throttles the downloaders feeding the
+    stage. The pool starts on the first job.
+    """
+
+    def __init__(self, workers=None, queue_size=32, policy=None):
+        self.policy = normalize_policy(policy)
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._lock = threading.Lock()
+        self.queue_depth = 0
+        self.peak_queue_depth = 0
+        self._formats = {}  # mime type -> [jobs, failures, encode seconds, bytes in, bytes out]
+
+    def handles(self, mime_type):
+        """True if mime_type gets re-encoded rather than stored as fetched"""
+        return self.policy.get(mime_type, PASSTHROUGH) != PASSTHROUGH
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def submit(self, data, mime_type):
+        """Future of (converted bytes, extension) for data, which fails if the image can't be converted.
+
+        Returns as soon as the job is queued, so the caller's thread is free
+        while the image is encoded; only a full queue makes it wait.
+        """
+        self._slots.acquire()
+        with self._lock:
+            self.queue_depth += 1
+            self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth)
+        try:
+            job = self._pool().submit(transcode_image, data, mime_type, self.policy[mime_type])
+        except BaseException:
+            self._job_done(mime_type, len(data), None)
+            raise
+        job.add_done_callback(lambda job: self._job_done(mime_type, len(data), job))
+        # Hand back (bytes, extension) without the encode time, which only the stats keep
+        return when_done(job, lambda job: job.result()[:2])
+
+    def _job_done(self, mime_type, bytes_in, job):
+        """Count a finished job and free its queue slot"""
+        with self._lock:
+            self.queue_depth -= 1
+            totals = self._formats.setdefault(mime_type, [0, 0, 0.0, 0, 0])
+            if job is None or job.cancelled() or job.exception() is not None:
+                totals[1] += 1
+            else:
+                converted, _, seconds = job.result()
+                totals[0] += 1
+                totals[2] += seconds
+                totals[3] += bytes_in
+                totals[4] += len(converted)
+        self._slots.release()
+
+    def stats(self):
+        """{queue_depth, peak_queue_depth, formats: {mime type: {jobs, failures, encode_ms_avg, bytes_in, bytes_out}}}"""
+        with self._lock:
+            return {
+                'queue_depth': self.queue_depth,
+                'peak_queue_depth': self.peak_queue_depth,
+                'formats': {
+                    mime_type: {
+                        'jobs': jobs,
+                        'failures': failures,
+                        'encode_ms_avg': round(seconds / jobs * 1000, 1) if jobs else None,
+                        'bytes_in': bytes_in,
+                        'bytes_out': bytes_out,
+                    }
+                    for mime_type, (jobs, failures, seconds, bytes_in, bytes_out) in self._formats.items()
+                },
+            }
+
+    def close(self):
+        """Wait for queued jobs and stop the pool"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        # Outside the lock: finishing jobs take it to update the stats
+        if executor is not None:
+            executor.shutdown()
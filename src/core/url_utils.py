@@ -0,0 +1,40 @@
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Query parameters that never change the resource being served
+TRACKING_PARAMS = {'fbclid', 'gclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga'}
+
+
+def normalize_url(url):
+    """Canonical form of a URL for deduplication.
+
+    Lowercases the scheme and host, drops default ports, fragments and
+    tracking parameters, and sorts the remaining query parameters.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    netloc = host
+    if parsed.port and parsed.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parsed.port}"
+    if parsed.username:
+        netloc = f"{parsed.username}@{netloc}"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key not in TRACKING_PARAMS and not key.startswith('utm_')
+    )
+    return urlunparse((scheme, netloc, parsed.path or '/', parsed.params, urlencode(query), ''))
+
+
+def url_fingerprint(url):
+    """Compact 8-byte digest of the normalized URL for large seen-sets"""
+    return hashlib.blake2b(normalize_url(url).encode('utf-8'), digest_size=8).digest()
+
+
+def same_origin(url, other):
+    """True if both URLs share scheme, host and port"""
+    a, b = urlparse(url), urlparse(other)
+    return (a.scheme.lower(), (a.hostname or '').lower(), a.port or DEFAULT_PORTS.get(a.scheme.lower())) == \
+           (b.scheme.lower(), (b.hostname or '').lower(), b.port or DEFAULT_PORTS.get(b.scheme.lower()))
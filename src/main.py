@@ -14,7 +14,7 @@ class ImageScraperApp:
         self.root.state('zoomed')
         
         # Initialize the image scraper
-        self.scraper = ImageScraper(self.log_message)
+        self.scraper = ImageScraper(self.log_message, self._report_progress)
         
         # Configure styles and UI elements
         self.setup_styles()
@@ -134,6 +134,12 @@ class ImageScraperApp:
                                     width=12)
         self.check_button.pack(side=tk.RIGHT)
         
+        self.scan_download_button = tk.Button(entry_frame,
+                                            text="Scan & Download",
+                                            command=self.scan_and_download,
+                                            width=15)
+        self.scan_download_button.pack(side=tk.RIGHT, padx=(0, 10))
+        
     def create_size_filter(self, parent):
         size_frame = ttk.Frame(parent)
         size_frame.pack(fill=tk.X, padx=15, pady=(0, 15))
@@ -288,8 +294,7 @@ class ImageScraperApp:
         """Handle UI updates after scan completes"""
         if image_count > 0:
             self.start_button.config(state='normal')
-            self.filter_frame.pack(fill=tk.X, padx=15, pady=(0, 15))
-            self.save_frame.pack(fill=tk.X, padx=15, pady=(0, 15))
+            self._show_download_options()
         else:
             self.start_button.config(state='disabled')
             
@@ -297,6 +302,99 @@ class ImageScraperApp:
         self.progress_bar.set_progress(100)
         self.check_button.config(state='normal')
 
+    def _selected_types(self):
+        """File extensions picked in the type filter"""
+        allowed_types = []
+        for file_type, var in self.file_types.items():
+            if var.get():
+                if file_type == 'JPG/JPEG':
+                    allowed_types.extend(['jpg', 'jpeg'])
+                else:
+                    allowed_types.append(file_type.lower())
+        return allowed_types
+        
+    def _size_limits(self):
+        """Min and max size in bytes from the size filter"""
+        min_kb = self.min_size.get()
+        max_kb = self.max_size.get()
+        try:
+            min_bytes = float(min_kb) * 1024 if min_kb and min_kb != self.min_size.placeholder else 0
+        except ValueError:
+            min_bytes = 0
+        try:
+            max_bytes = float(max_kb) * 1024 if max_kb and max_kb != self.max_size.placeholder else float('inf')
+        except ValueError:
+            max_bytes = float('inf')
+        return min_bytes, max_bytes
+        
+    def _show_download_options(self):
+        """Show the image type and save location sections; returns False if they were hidden"""
+        if self.filter_frame.winfo_manager():
+            return True
+        self.filter_frame.pack(fill=tk.X, padx=15, pady=(0, 15))
+        self.save_frame.pack(fill=tk.X, padx=15, pady=(0, 15))
+        return False
+        
+    def scan_and_download(self):
+        """Scan the page and download images while the scan is still running"""
+        if self.scraper.is_downloading:
+            self.scraper.is_downloading = False
+            self.scan_download_button.config(text="Scan & Download")
+            return
+            
+        url = self.url_entry.get()
+        if url == self.url_entry.placeholder:
+            self.log_message("Please enter a valid URL", "error")
+            return
+            
+        # Never start with filters the user hasn't seen
+        if not self._show_download_options():
+            self.log_message("Choose image types and a save location, then press Scan & Download again", "info")
+            return
+            
+        save_location = self.save_input.get()
+        if not save_location or save_location == self.save_input.placeholder:
+            self.browse_folder()
+            save_location = self.save_input.get()
+            if not save_location or save_location == self.save_input.placeholder:
+                self.log_message("Please select a save location", "error")
+                return
+                
+        allowed_types = self._selected_types()
+        if not allowed_types:
+            self.log_message("Please select at least one file type to download", "error")
+            return
+        min_bytes, max_bytes = self._size_limits()
+            
+        self.status_label.config(text="Scanning and downloading...")
+        self.progress_bar.set_progress(0)
+        self.scan_download_button.config(text="Stop")
+        self.check_button.config(state='disabled')
+        self.start_button.config(state='disabled')
+        
+        def run_thread():
+            try:
+                self.scraper.scan_and_download(url, save_location, allowed_types, min_bytes, max_bytes)
+            except Exception as e:
+                message = f"Error during download: {str(e)}"  # e is unbound once the except block ends
+                self.root.after(0, lambda: self.log_message(message, "error"))
+            finally:
+                self.root.after(0, self._after_scan_and_download)
+                
+        threading.Thread(target=run_thread, daemon=True).start()
+        
+    def _after_scan_and_download(self):
+        """Handle UI updates after a combined run completes"""
+        self.status_label.config(text="Ready")
+        self.scan_download_button.config(text="Scan & Download")
+        self.check_button.config(state='normal')
+        if self.scraper.image_urls:
+            self.start_button.config(state='normal')
+        
+    def _report_progress(self, value):
+        """Forward scraper progress from worker threads to the main thread"""
+        self.root.after(0, lambda: self._update_download_progress(value))
+        
     def browse_folder(self):
         folder = filedialog.askdirectory()
         if folder:
@@ -315,27 +413,20 @@ class ImageScraperApp:
             return
             
         # Get selected file types
-        allowed_types = []
-        for file_type, var in self.file_types.items():
-            if var.get():
-                if file_type == 'JPG/JPEG':
-                    allowed_types.extend(['jpg', 'jpeg'])
-                else:
-                    allowed_types.append(file_type.lower())
-        
+        allowed_types = self._selected_types()
         if not allowed_types:
             self.log_message("Please select at least one file type to download", "error")
             return
             
+        url = self.url_entry.get()
+        min_bytes, max_bytes = self._size_limits()
         self.start_button.config(text="Stop Download")
         self.check_button.config(state='disabled')
         
         def download_thread():
             try:
-                def update_progress(value):
-                    self.root.after(0, lambda: self._update_download_progress(value))
-                    
-                self.scraper.download_images(save_location, allowed_types, update_progress)
+                # Progress reaches the UI through the scraper's progress callback
+                self.scraper.start_download(url, save_location, allowed_types, min_bytes, max_bytes)
             except Exception as e:
                 self.root.after(0, lambda: self.log_message(f"Error during download: {str(e)}", "error"))
             finally:
@@ -149,7 +149,15 @@ class ModernImageScraperApp:
             height=40,
             state="disabled"
         )
-        self.download_button.pack(side="left")
+        self.download_button.pack(side="left", padx=(0, 10))
+        
+        self.scan_download_button = ctk.CTkButton(
+            button_frame,
+            text="Scan & Download",
+            command=self.scan_and_download,
+            height=40
+        )
+        self.scan_download_button.pack(side="left")
         
         # Download Location Section
         location_label = ctk.CTkLabel(
@@ -319,24 +327,25 @@ class ModernImageScraperApp:
         # Start check in separate thread
         threading.Thread(target=check_thread, daemon=True).start()
         
-    def start_download(self):
+    def get_download_options(self):
+        """Validate the form; returns (url, save_location, allowed_types, min_size, max_size) or None"""
         url = self.url_entry.get().strip()
         save_location = self.location_entry.get().strip()
         
         if not url:
             self.log_message("Please enter a website URL", "error")
-            return
+            return None
             
         if not save_location:
             self.log_message("Please select a save location", "error")
-            return
+            return None
             
         if not os.path.exists(save_location):
             try:
                 os.makedirs(save_location)
             except Exception as e:
                 self.log_message(f"Error creating save directory: {str(e)}", "error")
-                return
+                return None
         
         # Get selected file types
         allowed_types = []
@@ -349,7 +358,7 @@ class ModernImageScraperApp:
                     
         if not allowed_types:
             self.log_message("Please select at least one file type", "error")
-            return
+            return None
             
         # Get size filters
         try:
@@ -359,7 +368,15 @@ class ModernImageScraperApp:
                 max_size = float('inf')
         except ValueError:
             self.log_message("Please enter valid numbers for size filters", "error")
+            return None
+        
+        return url, save_location, allowed_types, min_size, max_size
+        
+    def start_download(self):
+        options = self.get_download_options()
+        if options is None:
             return
+        url, save_location, allowed_types, min_size, max_size = options
         
         # Update UI
         self.download_button.configure(state="disabled")
@@ -393,6 +410,51 @@ class ModernImageScraperApp:
         # Start download in separate thread
         threading.Thread(target=download_thread, daemon=True).start()
         
+    def scan_and_download(self):
+        """Scan the page and start downloading images before the scan finishes"""
+        if self.scraper.is_downloading:
+            self.scraper.is_downloading = False
+            return
+            
+        options = self.get_download_options()
+        if options is None:
+            return
+        url, save_location, allowed_types, min_size, max_size = options
+        
+        # Update UI
+        self.download_button.configure(state="disabled")
+        self.check_button.configure(state="disabled")
+        self.url_entry.configure(state="disabled")
+        self.location_entry.configure(state="disabled")
+        self.scan_download_button.configure(text="Stop")
+        self.progress_label.configure(text="Scanning and downloading...")
+        self.progress_bar.set(0)
+        
+        def run_thread():
+            try:
+                self.scraper.scan_and_download(
+                    url=url,
+                    save_location=save_location,
+                    allowed_types=allowed_types,
+                    min_size=min_size,
+                    max_size=max_size
+                )
+                self.total_images = len(self.scraper.image_urls)
+                self.last_url = url
+            except Exception as e:
+                self.log_message(f"Error during download: {str(e)}", "error")
+            finally:
+                # Reset UI
+                self.download_button.configure(state="normal" if self.scraper.image_urls else "disabled")
+                self.check_button.configure(state="normal")
+                self.url_entry.configure(state="normal")
+                self.location_entry.configure(state="normal")
+                self.scan_download_button.configure(text="Scan & Download")
+                self.progress_label.configure(text="")
+                self.progress_bar.set(0)
+        
+        threading.Thread(target=run_thread, daemon=True).start()
+        
     def log_message(self, message, level="info"):
         color_map = {
             "error": "red",
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_cli(*args):
+    return subprocess.run([sys.executable, '-m', 'src.core', *args], cwd=ROOT, capture_output=True,
+                          text=True, timeout=60)
+
+
+class MissingInputTest(unittest.TestCase):
+    """A URL file that can't be read is a usage error that still ends with a summary event"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.missing = os.path.join(self.tmp.name, 'no-such-pages.txt')
+        self.output = os.path.join(self.tmp.name, 'downloads')
+
+    def assert_usage_error(self, result):
+        self.assertEqual(result.returncode, 2, result.stderr)
+        self.assertNotIn('Traceback', result.stderr)
+        self.assertIn(self.missing, result.stderr)
+        summary = json.loads(result.stdout.splitlines()[-1])
+        self.assertEqual(summary['event'], 'summary')
+        self.assertEqual(summary['exit_code'], 2)
+        self.assertEqual(summary['pages'], 0)
+
+    def test_missing_input_file(self):
+        self.assert_usage_error(run_cli('-i', self.missing, '-o', self.output))
+
+    def test_missing_input_file_after_urls(self):
+        # The file is checked before the URL on the command line is scanned
+        self.assert_usage_error(run_cli('http://127.0.0.1:9/', '-i', self.missing, '-o', self.output, '-q'))
+
+
+if __name__ == '__main__':
+    unittest.main()